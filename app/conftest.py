@@ -1,4 +1,5 @@
 import pytest
+from django.core.cache import cache
 
 from app.users.models import User
 from app.users.tests.factories import UserFactory
@@ -9,6 +10,11 @@ def media_storage(settings, tmpdir):
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
 @pytest.fixture
 def user() -> User:
     return UserFactory()
@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib import admin
 from django.contrib.admin.widgets import FilteredSelectMultiple
+from django.utils.html import format_html_join, strip_tags
+from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
 from ckeditor_uploader.widgets import CKEditorUploadingWidget
@@ -8,12 +10,15 @@ from ckeditor_uploader.widgets import CKEditorUploadingWidget
 from .models import (
     Answer,
     Category,
+    CategoryScore,
     EssayQuestion,
     Question,
+    QuestionHistory,
     Quiz,
     MCQuestion,
     OpenQuestion,
     Progress,
+    QuizScore,
     Sitting,
     SubCategory,
     TFQuestion,
@@ -153,10 +158,17 @@ class MCQuestionAdminForm(forms.ModelForm):
 
 
 class MCQuestionAdmin(admin.ModelAdmin):
-    list_display = ("content", "created_at", "updated_at")
+    list_display = (
+        "content",
+        "created_at",
+        "updated_at",
+        "p_value",
+        "discrimination",
+    )
     list_filter = ("category", "created_at", "updated_at")
     form = MCQuestionAdminForm
     filter_vertical = ("category",)
+    readonly_fields = ("selection_rates",)
     fieldsets = (
         (
             None,
@@ -182,8 +194,52 @@ class MCQuestionAdmin(admin.ModelAdmin):
                 )
             },
         ),
+        (
+            _("Statistics"),
+            {
+                "classes": ("collapse",),
+                "fields": ("selection_rates",),
+            },
+        ),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("stats")
+
+    def _stats(self, obj):
+        return getattr(obj, "stats", None)
+
+    def p_value(self, obj):
+        stats = self._stats(obj)
+        return None if stats is None else stats.p_value
+
+    p_value.short_description = _("P-value")
+    p_value.admin_order_field = "stats__p_value"
+
+    def discrimination(self, obj):
+        stats = self._stats(obj)
+        return None if stats is None else stats.discrimination
+
+    discrimination.short_description = _("Discrimination")
+    discrimination.admin_order_field = "stats__discrimination"
+
+    def selection_rates(self, obj):
+        """Proportion of the answers to the question that chose each answer"""
+        stats = self._stats(obj)
+        if stats is None:
+            return "-"
+        rates = stats.get_selection_rates()
+        return format_html_join(
+            mark_safe("<br>"),
+            "{}: {}",
+            (
+                (strip_tags(answer.content), "{:.0%}".format(rates.get(answer.id, 0)))
+                for answer in obj.answer_set.all()
+            ),
+        )
+
+    selection_rates.short_description = _("Selection rates")
+
     search_fields = ("content", "explanation")
     filter_horizontal = ("quiz",)
 
@@ -236,10 +292,26 @@ class ProgressAdmin(admin.ModelAdmin):
             create a user section
     """
 
-    search_fields = (
-        "user",
-        "score",
-    )
+    list_display = ("user", "sittings", "score", "possible")
+    search_fields = ("user__email",)
+
+
+class CategoryScoreAdmin(admin.ModelAdmin):
+    list_display = ("user", "category", "score", "possible")
+    list_filter = ("category",)
+    search_fields = ("user__email",)
+
+
+class QuizScoreAdmin(admin.ModelAdmin):
+    list_display = ("user", "quiz", "sittings", "score", "possible")
+    list_filter = ("quiz",)
+    search_fields = ("user__email",)
+
+
+class QuestionHistoryAdmin(admin.ModelAdmin):
+    list_display = ("user", "question", "last_seen", "due", "streak", "ease")
+    search_fields = ("user__email",)
+    raw_id_fields = ("user", "question")
 
 
 class TFQuestionAdminForm(forms.ModelForm):
@@ -323,6 +395,7 @@ class SittingAdmin(admin.ModelAdmin):
         "start",
         "end",
         "complete",
+        "archived",
         "get_percent_correct",
     )
     inlines = [UserAnswerInline]
@@ -334,5 +407,8 @@ admin.site.register(Category, CategoryAdmin)
 admin.site.register(MCQuestion, MCQuestionAdmin)
 admin.site.register(OpenQuestion, OpenQuestionAdmin)
 admin.site.register(Progress, ProgressAdmin)
+admin.site.register(CategoryScore, CategoryScoreAdmin)
+admin.site.register(QuizScore, QuizScoreAdmin)
+admin.site.register(QuestionHistory, QuestionHistoryAdmin)
 admin.site.register(TFQuestion, TFQuestionAdmin)
 admin.site.register(EssayQuestion, EssayQuestionAdmin)
@@ -0,0 +1,557 @@
+"""
+Export and import of the quizzes and questions of the question bank, used by
+the download_quiz and upload_quiz management commands.
+
+Quizzes and questions are read by chunks, with their categories, answers
+and quizzes prefetched, so every chunk costs a fixed number of queries and
+the output is written as it is produced. Two formats are supported:
+
+- json: a JSON array of quizzes with their nested questions, as rendered by
+  QuizSerializer, or a single quiz object when exporting one quiz. The whole
+  bank is an object with the list of the quizzes (without their questions)
+  and the list of all the questions, including the ones of no quiz
+- ndjson: one JSON object per line, first the quizzes (without their
+  questions), then the questions with the ids of their quizzes. Each line
+  has a "model" key, "quiz" or "question"
+
+Both formats can be imported, as well as CSV files with one question per
+line, see read_csv. Imported questions are matched on their natural key, so
+importing a file twice does not duplicate them.
+"""
+import csv
+import hashlib
+import json
+
+from django.db import connection, transaction
+from django.db.models import Prefetch
+
+from .bundles import QUESTION_TYPES
+from .signals import invalidate_question_ids
+from .models import Answer, Category, MCQuestion, Question, Quiz
+from .serializers import QuestionSerializer, QuizSerializer, prefetch_questions
+
+CHUNK_SIZE = 500
+
+FORMATS = ("json", "ndjson")
+
+IMPORT_FORMATS = ("json", "ndjson", "csv")
+
+IMPORT_CHUNK_SIZE = 1000
+
+# rows inserted by each statement of bulk_create
+BATCH_SIZE = 500
+
+# separator of the lists in the cells of CSV files
+CSV_SEPARATOR = ";"
+
+# fields of the quizzes that are not copied from the imported records
+QUIZ_SKIPPED_FIELDS = ("id", "url", "category", "created_at", "updated_at")
+
+
+# through models of the links of the questions to their quizzes and categories
+QuizLink = Question.quiz.through
+CategoryLink = Question.category.through
+
+
+class QuizRecordSerializer(QuizSerializer):
+    """Quiz without its questions, which have their own NDJSON records"""
+
+    questions = None
+
+
+def question_queryset():
+    return Question.objects.select_subclasses()
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Yield the objects of a queryset by lists of chunk_size objects, read
+    in primary key order, one query per chunk"""
+    last_pk = None
+    while True:
+        chunk = queryset.order_by("pk")
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def iter_quizzes(quizzes, chunk_size=CHUNK_SIZE):
+    """Yield the serialized quizzes, with their nested questions"""
+    quizzes = quizzes.select_related("category").prefetch_related(
+        Prefetch("question_set", queryset=question_queryset())
+    )
+    # serializers are built once, building their fields is costly
+    serializer = QuizSerializer()
+    for chunk in iter_chunks(quizzes, chunk_size):
+        prefetch_questions(
+            [question for quiz in chunk for question in quiz.question_set.all()]
+        )
+        for quiz in chunk:
+            yield serializer.to_representation(quiz)
+
+
+def iter_records(quizzes, questions, chunk_size=CHUNK_SIZE):
+    """Yield the NDJSON records of the quizzes, then of the questions"""
+    # serializers are built once, building their fields is costly
+    quiz_serializer = QuizRecordSerializer()
+    for chunk in iter_chunks(quizzes.select_related("category"), chunk_size):
+        for quiz in chunk:
+            yield {"model": "quiz", **quiz_serializer.to_representation(quiz)}
+
+    question_serializer = QuestionSerializer()
+    for chunk in iter_chunks(questions.select_subclasses(), chunk_size):
+        prefetch_questions(chunk)
+        for question in chunk:
+            data = question_serializer.to_representation(question)
+            yield {"model": "question", **data}
+
+
+def dump_bank(records, file):
+    """Write the records of iter_records as a JSON object with the list of
+    the quizzes and the list of the questions"""
+    file.write('{"quizzes":[')
+    model, first = "quiz", True
+    for record in records:
+        if record.pop("model") != model:
+            # the questions follow the quizzes
+            file.write('],\n"questions":[')
+            model, first = "question", True
+        if not first:
+            file.write(",\n")
+        first = False
+        file.write(json.dumps(record, separators=(",", ":")))
+    if model == "quiz":
+        file.write('],\n"questions":[')
+    file.write("]}\n")
+
+
+def dump(lines, file, output_format, single=False):
+    """Write the serialized objects to a text file"""
+    if output_format == "ndjson":
+        for data in lines:
+            file.write(json.dumps(data, separators=(",", ":")))
+            file.write("\n")
+        return
+
+    if single:
+        for data in lines:
+            file.write(json.dumps(data, separators=(",", ":")))
+        return
+
+    file.write("[")
+    for i, data in enumerate(lines):
+        if i:
+            file.write(",\n")
+        file.write(json.dumps(data, separators=(",", ":")))
+    file.write("]\n")
+
+
+def export(file, quiz_ids=None, output_format="json", chunk_size=CHUNK_SIZE):
+    """Export quizzes to a text file.
+
+    Args:
+        file: text file to write to
+        quiz_ids (list): ids of the exported quizzes, all the quizzes and
+            questions of the bank if None
+        output_format (str): json or ndjson
+
+    Returns:
+        int: number of exported quizzes
+
+    """
+    quizzes = Quiz.objects.all()
+    questions = Question.objects.all()
+    if quiz_ids is not None:
+        quizzes = quizzes.filter(pk__in=quiz_ids)
+        questions = questions.filter(
+            pk__in=Question.quiz.through.objects.filter(quiz_id__in=quiz_ids).values(
+                "question_id"
+            )
+        )
+    nb_quizzes = quizzes.count()
+
+    if output_format == "json" and quiz_ids is None:
+        dump_bank(iter_records(quizzes, questions, chunk_size), file)
+        return nb_quizzes
+
+    if output_format == "ndjson":
+        lines = iter_records(quizzes, questions, chunk_size)
+    else:
+        lines = iter_quizzes(quizzes, chunk_size)
+    single = quiz_ids is not None and len(quiz_ids) == 1
+    dump(lines, file, output_format, single=single)
+    return nb_quizzes
+
+
+def question_key(record: dict) -> str:
+    """Natural key of an imported question: the key of the record, or a
+    digest of its type, content and answers"""
+    if record.get("key"):
+        return record["key"]
+    content = [
+        record["type"],
+        record["content"],
+        record["explanation"],
+        record["fields"],
+        record["answers"],
+    ]
+    return hashlib.sha1(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def question_record(data: dict, quiz_urls: list) -> dict:
+    """Build the import record of a question serialized by download_quiz"""
+    model = QUESTION_TYPES.get(data.get("type", "Question"))
+    if model is None:
+        raise ValueError("Unknown question type: %s" % data["type"])
+    categories = data.get("category") or []
+    if isinstance(categories, str):
+        categories = [categories]
+    record = {
+        "model": "question",
+        "type": model.__name__,
+        "key": data.get("key"),
+        "content": data["content"],
+        "explanation": data.get("explanation") or "",
+        "quizzes": quiz_urls,
+        "categories": categories,
+        "fields": {
+            field.name: data[field.name]
+            for field in model._meta.local_concrete_fields
+            if model is not Question and not field.primary_key and field.name in data
+        },
+        "answers": [
+            {"content": answer["content"], "correct": answer["correct"]}
+            for answer in (data.get("answers") or [] if model is MCQuestion else [])
+        ],
+    }
+    record["key"] = question_key(record)
+    return record
+
+
+def read_json(file):
+    """Read a quiz, a list of quizzes or the whole bank, written by
+    download_quiz"""
+    quizzes = json.load(file)
+    if isinstance(quizzes, dict) and "quizzes" in quizzes:
+        yield from read_records(
+            [{**quiz, "model": "quiz"} for quiz in quizzes["quizzes"]]
+            + [{**question, "model": "question"} for question in quizzes["questions"]]
+        )
+        return
+    if isinstance(quizzes, dict):
+        quizzes = [quizzes]
+    for quiz in quizzes:
+        questions = quiz.pop("questions", [])
+        yield {**quiz, "model": "quiz"}
+        for question in questions:
+            yield question_record(question, [quiz["url"]])
+
+
+def read_records(records):
+    """Read the quiz and question records written by download_quiz, the
+    quizzes first.
+
+    Questions are only added to the quizzes of the file: the export of some
+    quizzes lists all the quizzes of their questions.
+    """
+    quiz_urls = {}
+    for data in records:
+        if data["model"] == "quiz":
+            quiz_urls[data.get("id")] = data["url"]
+            yield data
+        else:
+            urls = [
+                quiz_urls[quiz_id]
+                for quiz_id in data.get("quiz", [])
+                if quiz_id in quiz_urls
+            ]
+            yield question_record(data, urls)
+
+
+def read_ndjson(file):
+    """Read the records of an NDJSON file written by download_quiz"""
+    return read_records(json.loads(line) for line in file if line.strip())
+
+
+def read_csv(file):
+    """Read questions from a CSV file with a header line and the columns:
+
+    - type: MCQuestion, TFQuestion, OpenQuestion or EssayQuestion
+    - quiz and category: urls of the quizzes and names of the categories of
+      the question, separated with semicolons
+    - content, explanation and key (optional)
+    - answer: True or False for TFQuestion, the answer for OpenQuestion, and
+      the answers separated with semicolons for MCQuestion, the correct ones
+      starting with a star
+    - answer_type: number or string for OpenQuestion
+    """
+
+    def split(value):
+        return [item.strip() for item in (value or "").split(CSV_SEPARATOR) if item]
+
+    for row in csv.DictReader(file):
+        data = {
+            "type": row.get("type") or "MCQuestion",
+            "key": row.get("key"),
+            "content": row["content"],
+            "explanation": row.get("explanation"),
+            "category": split(row.get("category")),
+        }
+        answer = row.get("answer") or ""
+        if data["type"] == "TFQuestion":
+            data["correct"] = answer.strip().lower() in ("true", "1", "yes")
+        elif data["type"] == "OpenQuestion":
+            data["answer"] = answer
+            data["answer_type"] = row.get("answer_type") or "number"
+        elif data["type"] == "MCQuestion":
+            data["answers"] = [
+                {"content": choice.lstrip("*").strip(), "correct": choice[0] == "*"}
+                for choice in split(answer)
+            ]
+            data["allow_multiple_answers"] = (
+                sum(choice["correct"] for choice in data["answers"]) > 1
+            )
+        yield question_record(data, split(row.get("quiz")))
+
+
+READERS = {"json": read_json, "ndjson": read_ndjson, "csv": read_csv}
+
+
+def keyless_question_keys(chunk_size=CHUNK_SIZE) -> dict:
+    """Natural keys of the questions that have no key, created in the admin
+    or before the key was added, computed from their serialized content like
+    the keys of the exported questions: {key: question id}"""
+    keys = {}
+    # serializers are built once, building their fields is costly
+    serializer = QuestionSerializer()
+    for chunk in iter_chunks(question_queryset().filter(key=None), chunk_size):
+        prefetch_questions(chunk)
+        for question in chunk:
+            record = question_record(serializer.to_representation(question), [])
+            keys.setdefault(record["key"], question.pk)
+    return keys
+
+
+def insert_subclass_rows(model, rows):
+    """Insert the rows of the table of a question subclass, whose Question
+    rows exist, with one statement executed for all the rows.
+
+    QuerySet.bulk_create does not support the tables of multi-table
+    inheritance subclasses. Fields missing from the rows take their default
+    value.
+    """
+    quote_name = connection.ops.quote_name
+    fields = model._meta.local_concrete_fields
+    sql = "INSERT INTO %s (%s) VALUES (%s)" % (
+        quote_name(model._meta.db_table),
+        ", ".join(quote_name(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            sql,
+            [
+                [
+                    field.get_db_prep_save(
+                        row.get(field.name, field.get_default()), connection
+                    )
+                    for field in fields
+                ]
+                for row in rows
+            ],
+        )
+
+
+class Importer:
+    """Import quiz and question records by chunks of questions.
+
+    Each chunk is imported in its own transaction, with a fixed number of
+    bulk queries: questions are inserted with their subclass rows and their
+    answers, then linked to their quizzes and categories, which are created
+    when they don't exist. Questions are matched on their natural key, see
+    question_key: existing questions are not modified, only linked to the
+    quizzes and categories of the record. Questions without key are matched
+    on the digest of their content, and get it as key.
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.quiz_ids = {}
+        self.category_ids = {}
+        self.quizzes = {}
+        self.nb_created = 0
+        self.nb_existing = 0
+        self.nb_quizzes = 0
+        self.keyless_ids = {}
+
+    def run(self, records):
+        self.keyless_ids = keyless_question_keys()
+        chunk = []
+        for record in records:
+            if record["model"] == "quiz":
+                self.quizzes[record["url"]] = record
+                continue
+            chunk.append(record)
+            if len(chunk) == self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        self.import_chunk(chunk)
+
+    def save_categories(self, names):
+        names = set(names) - set(self.category_ids)
+        if not names:
+            return
+        self.category_ids.update(
+            Category.objects.filter(name__in=names).values_list("name", "pk")
+        )
+        new_names = [name for name in names if name not in self.category_ids]
+        if new_names:
+            Category.objects.bulk_create(
+                [Category(name=name) for name in new_names], ignore_conflicts=True
+            )
+            self.category_ids.update(
+                Category.objects.filter(name__in=new_names).values_list("name", "pk")
+            )
+
+    def save_quizzes(self, urls):
+        urls = set(urls) - set(self.quiz_ids)
+        if not urls:
+            return
+        clean_urls = {url: Quiz.clean_url(url) for url in urls}
+        existing = dict(
+            Quiz.objects.filter(url__in=clean_urls.values()).values_list("url", "pk")
+        )
+        for url in urls:
+            if clean_urls[url] in existing:
+                self.quiz_ids[url] = existing[clean_urls[url]]
+                continue
+            # quizzes are few, they are saved one by one to go through the
+            # validation of Quiz.save
+            record = self.quizzes.get(url, {})
+            fields = {
+                field.name: record[field.name]
+                for field in Quiz._meta.concrete_fields
+                if field.name in record and field.name not in QUIZ_SKIPPED_FIELDS
+            }
+            fields.setdefault("title", url[:60])
+            if record.get("category"):
+                self.save_categories([record["category"]])
+                fields["category_id"] = self.category_ids[record["category"]]
+            quiz = Quiz.objects.create(url=url, **fields)
+            self.quiz_ids[url] = quiz.pk
+            self.nb_quizzes += 1
+
+    def import_chunk(self, records):
+        with transaction.atomic():
+            # quizzes without questions
+            self.save_quizzes(
+                set(self.quizzes).union(*(record["quizzes"] for record in records))
+            )
+            self.quizzes = {}
+            if not records:
+                return
+            self.save_categories(
+                name for record in records for name in record["categories"]
+            )
+
+            records = {record["key"]: record for record in records}
+            question_ids = dict(
+                Question.objects.filter(key__in=records).values_list("key", "pk")
+            )
+            self.match_keyless_questions(records, question_ids)
+            new_records = [
+                record for key, record in records.items() if key not in question_ids
+            ]
+            self.create_questions(new_records, question_ids)
+            self.nb_created += len(new_records)
+            self.nb_existing += len(records) - len(new_records)
+
+            self.link_questions(records.values(), question_ids)
+
+    def match_keyless_questions(self, keys, question_ids: dict):
+        """Set the key of the questions without key that match the records
+        and add them to the question ids"""
+        matched = {
+            key: self.keyless_ids.pop(key)
+            for key in keys
+            if key not in question_ids and key in self.keyless_ids
+        }
+        if not matched:
+            return
+        Question.objects.bulk_update(
+            [Question(pk=pk, key=key) for key, pk in matched.items()],
+            ["key"],
+            batch_size=BATCH_SIZE,
+        )
+        question_ids.update(matched)
+
+    def create_questions(self, records: list, question_ids: dict):
+        """Insert the questions of the records and set their ids"""
+        Question.objects.bulk_create(
+            [
+                Question(
+                    key=record["key"],
+                    content=record["content"],
+                    explanation=record["explanation"],
+                )
+                for record in records
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        question_ids.update(
+            Question.objects.filter(
+                key__in=[record["key"] for record in records]
+            ).values_list("key", "pk")
+        )
+
+        subclasses = {}
+        answers = []
+        for record in records:
+            pk = question_ids[record["key"]]
+            model = QUESTION_TYPES[record["type"]]
+            if model is not Question:
+                subclasses.setdefault(model, []).append(
+                    {"question_ptr": pk, **record["fields"]}
+                )
+            answers.extend(
+                Answer(
+                    question_id=pk, content=answer["content"], correct=answer["correct"]
+                )
+                for answer in record["answers"]
+            )
+        for model, rows in subclasses.items():
+            insert_subclass_rows(model, rows)
+        Answer.objects.bulk_create(answers, batch_size=BATCH_SIZE)
+
+    def link_questions(self, records, question_ids: dict):
+        """Add the questions to their quizzes and categories"""
+        quiz_links, category_links = [], []
+        for record in records:
+            pk = question_ids[record["key"]]
+            quiz_links.extend(
+                QuizLink(question_id=pk, quiz_id=self.quiz_ids[url])
+                for url in record["quizzes"]
+            )
+            category_links.extend(
+                CategoryLink(question_id=pk, category_id=self.category_ids[name])
+                for name in record["categories"]
+            )
+        QuizLink.objects.bulk_create(
+            quiz_links, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+        CategoryLink.objects.bulk_create(
+            category_links, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+        # the links are not added through the related managers, which send
+        # the signals that invalidate the cached question ids of the quizzes
+        invalidate_question_ids({link.quiz_id for link in quiz_links})
+
+
+def import_file(file, input_format, chunk_size=IMPORT_CHUNK_SIZE) -> Importer:
+    """Import the quizzes and questions of a text file"""
+    importer = Importer(chunk_size)
+    importer.run(READERS[input_format](file))
+    return importer
@@ -0,0 +1,90 @@
+"""
+Write-behind buffer of the answers of in-progress sittings.
+
+When settings.QUIZ_ANSWER_BUFFER is set, the answers of the users are written
+to a Redis hash per sitting instead of the Sitting and UserAnswer rows. The
+buffered answers are applied to the database in one batch when the sitting is
+completed, when all the answers are submitted at once, and periodically by
+the flush_sitting_buffers management command.
+
+Buffers are stored without expiry, so that Redis never evicts them with a
+volatile-* maxmemory policy. The Redis server must not use an allkeys-*
+policy while buffering is enabled.
+"""
+import json
+
+from django.db import transaction
+from django_redis import get_redis_connection
+
+# hash of the buffered answers of a sitting, indexed by question order
+ANSWERS_KEY = "quiz:sitting:%s:answers"
+
+# set of the ids of the sittings with buffered answers
+SITTINGS_KEY = "quiz:sitting:buffered"
+
+# remove the flushed answers that were not changed since they were read,
+# and the sitting from the set of buffered sittings once it has none left
+DISCARD_SCRIPT = """
+for i = 2, #ARGV, 2 do
+    if redis.call("hget", KEYS[1], ARGV[i]) == ARGV[i + 1] then
+        redis.call("hdel", KEYS[1], ARGV[i])
+    end
+end
+if redis.call("hlen", KEYS[1]) == 0 then
+    redis.call("srem", KEYS[2], ARGV[1])
+end
+"""
+
+
+def get_connection():
+    return get_redis_connection("default")
+
+
+def _encode(answer, is_correct) -> str:
+    return json.dumps([answer, is_correct])
+
+
+def add_answer(sitting_id, question_order, answer, is_correct):
+    pipeline = get_connection().pipeline()
+    pipeline.hset(ANSWERS_KEY % sitting_id, question_order, _encode(answer, is_correct))
+    pipeline.sadd(SITTINGS_KEY, sitting_id)
+    pipeline.execute()
+
+
+def get_answers(sitting_id) -> dict:
+    """Return the buffered answers of a sitting as (answer, is_correct) tuples
+    indexed by question order"""
+    return {
+        int(order): tuple(json.loads(value))
+        for order, value in get_connection().hgetall(ANSWERS_KEY % sitting_id).items()
+    }
+
+
+def discard_answers(sitting_id, answers: dict):
+    """Remove flushed answers from the buffer once the current transaction
+    is committed. Answers changed in the meantime are kept."""
+    args = [sitting_id]
+    for order, (answer, is_correct) in answers.items():
+        args += [order, _encode(answer, is_correct)]
+
+    def discard():
+        connection = get_connection()
+        script = connection.register_script(DISCARD_SCRIPT)
+        script(keys=[ANSWERS_KEY % sitting_id, SITTINGS_KEY], args=args)
+
+    transaction.on_commit(discard)
+
+
+def get_buffered_sittings() -> list:
+    return [int(sitting_id) for sitting_id in get_connection().smembers(SITTINGS_KEY)]
+
+
+def forget_sittings(sitting_ids):
+    """Drop the buffers of the given sittings"""
+    sitting_ids = list(sitting_ids)
+    if not sitting_ids:
+        return
+    pipeline = get_connection().pipeline()
+    pipeline.delete(*[ANSWERS_KEY % sitting_id for sitting_id in sitting_ids])
+    pipeline.srem(SITTINGS_KEY, *sitting_ids)
+    pipeline.execute()
@@ -0,0 +1,142 @@
+"""
+Cache of the content of the questions.
+
+A question bundle is a compact snapshot of a question: the values of the
+fields of its subclass and, for multiple choice questions, its answers with
+their correct flags. Bundles are stored under a key that contains the
+updated_at timestamp of the question, so a stored bundle never changes.
+A second key points to the current timestamp of each question; the signals
+in app.quiz.signals drop it when a question or one of its answers changes.
+"""
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import prefetch_related_objects
+
+from .models.essay import EssayQuestion
+from .models.multichoice import Answer, MCQuestion
+from .models.open import OpenQuestion
+from .models.question import Question
+from .models.true_false import TFQuestion
+
+# bump when the layout of the bundles changes
+BUNDLE_VERSION = 2
+
+BUNDLE_TIMEOUT = 60 * 60 * 24 * 7
+
+QUESTION_TYPES = {
+    model.__name__: model
+    for model in (Question, EssayQuestion, MCQuestion, OpenQuestion, TFQuestion)
+}
+
+ANSWER_FIELDS = ["id", "question_id", "content", "correct"]
+
+
+def _timestamp(updated_at) -> int:
+    return int(updated_at.timestamp() * 1000000)
+
+
+def version_key(question_id) -> str:
+    return "quiz:question:v%d:%s:updated_at" % (BUNDLE_VERSION, question_id)
+
+
+def bundle_key(question_id, updated_at) -> str:
+    return "quiz:question:v%d:%s:%d" % (
+        BUNDLE_VERSION,
+        question_id,
+        _timestamp(updated_at),
+    )
+
+
+def serialize(question) -> tuple:
+    """Return the bundle of a question subclass instance"""
+    fields = question._meta.concrete_fields
+    values = tuple(field.value_from_object(question) for field in fields)
+    answers = None
+    if isinstance(question, MCQuestion):
+        answers = tuple(
+            (answer.id, answer.question_id, answer.content, answer.correct)
+            for answer in question.answer_choices
+        )
+    return question.type(), values, answers
+
+
+def deserialize(bundle):
+    """Build a question instance from its bundle, without any query"""
+    type_name, values, answers = bundle
+    model = QUESTION_TYPES[type_name]
+    field_names = [field.attname for field in model._meta.concrete_fields]
+    question = model.from_db(DEFAULT_DB_ALIAS, field_names, values)
+    if answers is not None:
+        question.answer_choices = [
+            Answer.from_db(DEFAULT_DB_ALIAS, ANSWER_FIELDS, answer)
+            for answer in answers
+        ]
+    return question
+
+
+def get_cached_question(question_id):
+    """Return the question from the cache, or None if it is not cached"""
+    updated_at = cache.get(version_key(question_id))
+    if updated_at is None:
+        return None
+    bundle = cache.get(bundle_key(question_id, updated_at))
+    if bundle is None:
+        return None
+    return deserialize(bundle)
+
+
+def cache_question(question):
+    """Store the bundle of a question subclass instance"""
+    cache_questions([question])
+
+
+def cache_questions(questions):
+    data = {}
+    for question in questions:
+        data[version_key(question.pk)] = question.updated_at
+        data[bundle_key(question.pk, question.updated_at)] = serialize(question)
+    cache.set_many(data, BUNDLE_TIMEOUT)
+
+
+def get_question(question_id):
+    """Return the question with the given id, from the cache if possible"""
+    question = get_cached_question(question_id)
+    if question is None:
+        question = Question.objects.get_subclass(pk=question_id)
+        cache_question(question)
+    return question
+
+
+def get_questions(question_ids) -> dict:
+    """Return the questions with the given ids, indexed by id.
+
+    Cached questions are read with two cache round trips whatever their
+    number, and the missing ones are loaded with two queries at most.
+    Ids of questions that do not exist are not in the result.
+    """
+    question_ids = set(question_ids)
+    versions = cache.get_many([version_key(pk) for pk in question_ids])
+    keys = {
+        bundle_key(pk, versions[version_key(pk)]): pk
+        for pk in question_ids
+        if version_key(pk) in versions
+    }
+    questions = {
+        keys[key]: deserialize(bundle)
+        for key, bundle in cache.get_many(list(keys)).items()
+    }
+
+    missing = question_ids - questions.keys()
+    if missing:
+        loaded = list(Question.objects.filter(pk__in=missing).select_subclasses())
+        prefetch_related_objects(
+            [question for question in loaded if isinstance(question, MCQuestion)],
+            "answer_set",
+        )
+        cache_questions(loaded)
+        questions.update((question.pk, question) for question in loaded)
+    return questions
+
+
+def invalidate_questions(question_ids):
+    cache.delete_many([version_key(question_id) for question_id in question_ids])
@@ -0,0 +1,139 @@
+"""
+Streaming export of the answers of the completed sittings, for external
+grading.
+
+The export has one row per answer, with the sitting it belongs to. Rows are
+read with server-side cursors (QuerySet.iterator) and written to CSV or
+NDJSON as they come, so memory does not grow with the number of rows.
+Answers of archived sittings are read from their archive.
+"""
+import csv
+import json
+
+from .models import Sitting, SittingArchive, SittingState, UserAnswer
+
+CHUNK_SIZE = 2000
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+FIELDS = (
+    "sitting_id",
+    "user_id",
+    "user_email",
+    "quiz_id",
+    "quiz",
+    "mode",
+    "start",
+    "end",
+    "score",
+    "percent",
+    "order",
+    "question_id",
+    "answer",
+    "is_correct",
+)
+
+# fields of the sitting, in the order of FIELDS
+SITTING_FIELDS = (
+    "id",
+    "user_id",
+    "user__email",
+    "quiz_id",
+    "quiz__url",
+    "mode",
+    "start",
+    "end",
+    "current_score",
+    "percent",
+)
+
+
+def sitting_filters(quiz=None, mode=None, since=None, until=None) -> dict:
+    """Lookups of the exported sittings: the completed sittings of a quiz, of
+    a mode, completed in a date range"""
+    filters = {"complete": True}
+    if quiz is not None:
+        filters["quiz"] = quiz
+    if mode:
+        filters["mode"] = mode
+    if since is not None:
+        filters["end__gte"] = since
+    if until is not None:
+        filters["end__lt"] = until
+    return filters
+
+
+def _format_sitting(values):
+    values = list(values)
+    # start and end
+    for index in (6, 7):
+        if values[index] is not None:
+            values[index] = values[index].isoformat()
+    return values
+
+
+def iter_rows(filters: dict, chunk_size=CHUNK_SIZE):
+    """Yield the exported rows as tuples, in the order of FIELDS"""
+    answers = (
+        UserAnswer.objects.filter(
+            sitting__archived=False,
+            **{"sitting__%s" % lookup: value for lookup, value in filters.items()},
+        )
+        .order_by("sitting_id", "order")
+        .values_list(
+            *("sitting__%s" % field for field in SITTING_FIELDS),
+            "order",
+            "question_id",
+            "answer",
+            "is_correct",
+        )
+    )
+    nb_fields = len(SITTING_FIELDS)
+    for row in answers.iterator(chunk_size=chunk_size):
+        yield tuple(_format_sitting(row[:nb_fields])) + row[nb_fields:]
+
+    archived = (
+        Sitting.objects.filter(archived=True, **filters)
+        .order_by("pk")
+        .values_list(*SITTING_FIELDS, "question_ids", "results", "archive__data")
+    )
+    for row in archived.iterator(chunk_size=chunk_size):
+        sitting = tuple(_format_sitting(row[:nb_fields]))
+        question_ids, results, data = row[nb_fields:]
+        state = SittingState.decode(question_ids, results)
+        answers = SittingArchive(data=data).get_answers()
+        for order, (answer, is_correct) in sorted(answers.items()):
+            yield sitting + (order, state.question_id(order), answer, is_correct)
+
+
+class Echo:
+    """File-like object returning what is written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(FIELDS, row)), separators=(",", ":")) + "\n"
+
+
+def stream(filters: dict, output_format="csv", chunk_size=CHUNK_SIZE):
+    """Yield the export in the given format, in pieces of chunk_size rows"""
+    rows = iter_rows(filters, chunk_size)
+    lines = iter_csv(rows) if output_format == "csv" else iter_ndjson(rows)
+    piece = []
+    for line in lines:
+        piece.append(line)
+        if len(piece) == chunk_size:
+            yield "".join(piece)
+            piece = []
+    if piece:
+        yield "".join(piece)
@@ -3,9 +3,24 @@ import ast
 from django import forms
 from django.forms.widgets import RadioSelect, Textarea, CheckboxSelectMultiple
 
+from .export import FORMATS, sitting_filters
+from .models import EssayQuestion, OpenQuestion, Quiz, Sitting
+
+
+def get_question_form_class(question):
+    """Return the form used to answer the given question"""
+    if isinstance(question, EssayQuestion):
+        return EssayForm
+    elif isinstance(question, OpenQuestion):
+        return OpenQuestionForm
+    else:
+        return MCQuestionForm
+
 
 class EssayForm(forms.Form):
-    def __init__(self, question, *args, **kwargs):
+    def __init__(
+        self, question, selected_answers=None, answer_seed=None, *args, **kwargs
+    ):
         super().__init__(*args, **kwargs)
         self.fields["answers"] = forms.CharField(
             widget=Textarea(attrs={"style": "width:100%"})
@@ -13,9 +28,11 @@ class EssayForm(forms.Form):
 
 
 class MCQuestionForm(forms.Form):
-    def __init__(self, question, selected_answers=None, *args, **kwargs):
+    def __init__(
+        self, question, selected_answers=None, answer_seed=None, *args, **kwargs
+    ):
         super().__init__(*args, **kwargs)
-        choice_list = [x for x in question.get_answers_list()]
+        choice_list = [x for x in question.get_answers_list(answer_seed)]
         if selected_answers:
             selected_answers = ast.literal_eval(selected_answers)
 
@@ -39,7 +56,9 @@ class MCQuestionForm(forms.Form):
 
 
 class OpenQuestionForm(forms.Form):
-    def __init__(self, question, selected_answers=None, *args, **kwargs):
+    def __init__(
+        self, question, selected_answers=None, answer_seed=None, *args, **kwargs
+    ):
         super().__init__(*args, **kwargs)
         initial_value = selected_answers
         if question.answer_type == "number":
@@ -55,3 +74,28 @@ class OpenQuestionForm(forms.Form):
                 max_length=50,
                 widget=forms.TextInput(attrs={"class": "form-control"}),
             )
+
+
+class SittingExportForm(forms.Form):
+    """Filters and format of the export of the completed sittings"""
+
+    quiz = forms.ModelChoiceField(
+        Quiz.objects.all(), to_field_name="url", required=False
+    )
+    mode = forms.ChoiceField(choices=Sitting.MODES, required=False)
+    since = forms.DateTimeField(required=False)
+    until = forms.DateTimeField(required=False)
+    format = forms.ChoiceField(
+        choices=[(name, name) for name in FORMATS], required=False
+    )
+
+    def get_filters(self) -> dict:
+        return sitting_filters(
+            quiz=self.cleaned_data["quiz"],
+            mode=self.cleaned_data["mode"],
+            since=self.cleaned_data["since"],
+            until=self.cleaned_data["until"],
+        )
+
+    def get_format(self) -> str:
+        return self.cleaned_data["format"] or "csv"
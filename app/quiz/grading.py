@@ -0,0 +1,25 @@
+"""
+Grading of user answers from the question bundle cache, without any query
+on the answers of the questions.
+"""
+from . import bundles
+
+
+def check_many(guesses) -> dict:
+    """Grade several answers in one pass.
+
+    Args:
+        guesses (dict): answer of the user indexed by question id, in the
+            format expected by the check_if_correct method of the question
+
+    Returns:
+        dict: True or False for each question id, False for the questions
+            that do not exist anymore
+
+    """
+    questions = bundles.get_questions(guesses.keys())
+    return {
+        question_id: question_id in questions
+        and questions[question_id].check_if_correct(guess)
+        for question_id, guess in guesses.items()
+    }
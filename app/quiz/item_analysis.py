@@ -0,0 +1,225 @@
+"""
+Item analysis of the questions, from the graded answers of the users.
+
+For every question, the analysis computes:
+
+- the p-value: proportion of correct answers, the difficulty of the question
+- the discrimination: point-biserial correlation between the result of the
+  users at the question and their rest score, the proportion of correct
+  answers to the other questions they answered
+- the selection rate of each answer choice of multiple choice questions
+
+The user answers are streamed ordered by user, and processed in chunks of
+users whose dense user x question response matrix has at most
+``chunk_cells`` cells. Only sums per question and per answer choice are kept
+from one chunk to the next, so memory does not grow with the number of
+answers. When a user answered a question several times, their last answer
+is used. Answers of archived sittings are not analysed.
+"""
+import json
+import re
+
+import numpy as np
+from django.db import transaction
+
+from .models import Answer, Question, QuestionStats, UserAnswer
+
+CHUNK_CELLS = 1000000
+
+# answer ids in the stored answer of multiple choice questions, such as
+# "456" or "['456', '789']"
+ANSWER_ID = re.compile(r"\d+")
+
+
+class ItemAnalysis:
+    def __init__(self, question_ids, answer_ids, answer_question_ids):
+        """
+        Args:
+            question_ids: sorted ids of the analysed questions
+            answer_ids: sorted ids of the answer choices
+            answer_question_ids: question id of each answer choice
+
+        """
+        self.question_ids = np.asarray(question_ids, dtype=np.int64)
+        self.answer_ids = np.asarray(answer_ids, dtype=np.int64)
+        self.answer_questions = self._columns(
+            np.asarray(answer_question_ids, dtype=np.int64)
+        )
+        nb_questions = len(self.question_ids)
+
+        self.responses = np.zeros(nb_questions)
+        self.correct = np.zeros(nb_questions)
+        self.selections = np.zeros(len(self.answer_ids))
+        # sums over the answers of the users with a rest score
+        self.n = np.zeros(nb_questions)
+        self.sum_x = np.zeros(nb_questions)
+        self.sum_r = np.zeros(nb_questions)
+        self.sum_rr = np.zeros(nb_questions)
+        self.sum_xr = np.zeros(nb_questions)
+
+    @classmethod
+    def from_database(cls):
+        answers = np.array(
+            Answer.objects.order_by("pk").values_list("pk", "question_id"),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        return cls(
+            Question.objects.order_by("pk").values_list("pk", flat=True),
+            answers[:, 0],
+            answers[:, 1],
+        )
+
+    @staticmethod
+    def _lookup(ids, values):
+        """Index of each value in the sorted ids, -1 for the missing ones"""
+        indexes = np.searchsorted(ids, values)
+        found = indexes < len(ids)
+        found[found] = ids[indexes[found]] == values[found]
+        return np.where(found, indexes, -1)
+
+    def _columns(self, question_ids):
+        return self._lookup(self.question_ids, question_ids)
+
+    def add_chunk(self, user_ids, question_ids, answers, correct):
+        """Add the answers of a chunk of users, in the order they were given"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        columns = self._columns(np.asarray(question_ids, dtype=np.int64))
+        correct = np.asarray(correct, dtype=np.float64)
+        users, rows = np.unique(user_ids, return_inverse=True)
+        nb_questions = len(self.question_ids)
+
+        # keep the last answer of each user to each question
+        cells = rows * nb_questions + columns
+        valid = np.flatnonzero(columns >= 0)
+        _, last = np.unique(cells[valid][::-1], return_index=True)
+        keep = valid[len(valid) - 1 - last]
+
+        shape = (len(users), nb_questions)
+        answered = np.zeros(shape, dtype=bool)
+        scores = np.zeros(shape)
+        answered[rows[keep], columns[keep]] = True
+        scores[rows[keep], columns[keep]] = correct[keep]
+
+        self.responses += answered.sum(axis=0)
+        self.correct += scores.sum(axis=0)
+
+        # rest score of the users at the other questions they answered
+        nb_answered = answered.sum(axis=1)
+        has_rest = answered & (nb_answered > 1)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rest = (scores.sum(axis=1)[:, None] - scores) / (nb_answered[:, None] - 1)
+        rest = np.where(has_rest, rest, 0.0)
+        x = np.where(has_rest, scores, 0.0)
+        self.n += has_rest.sum(axis=0)
+        self.sum_x += x.sum(axis=0)
+        self.sum_r += rest.sum(axis=0)
+        self.sum_rr += (rest * rest).sum(axis=0)
+        self.sum_xr += (x * rest).sum(axis=0)
+
+        self._add_selections(
+            [answers[i] for i in keep], np.asarray(question_ids, dtype=np.int64)[keep]
+        )
+
+    def _add_selections(self, answers, question_ids):
+        chosen, chosen_questions = [], []
+        for answer, question_id in zip(answers, question_ids):
+            for answer_id in ANSWER_ID.findall(answer or ""):
+                chosen.append(int(answer_id))
+                chosen_questions.append(question_id)
+        if not chosen:
+            return
+        indexes = self._lookup(self.answer_ids, np.array(chosen, dtype=np.int64))
+        columns = self._columns(np.array(chosen_questions, dtype=np.int64))
+        # ignore numbers that are not answer choices of the question
+        valid = indexes >= 0
+        valid[valid] = self.answer_questions[indexes[valid]] == columns[valid]
+        self.selections += np.bincount(indexes[valid], minlength=len(self.answer_ids))
+
+    def results(self):
+        """Return the statistics of the answered questions, as
+        (question id, responses, p-value, discrimination) tuples and the
+        selection rates of the answer choices indexed by question id"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p_values = self.correct / self.responses
+            mean_x = self.sum_x / self.n
+            mean_r = self.sum_r / self.n
+            covariance = self.sum_xr / self.n - mean_x * mean_r
+            variance = mean_x * (1 - mean_x) * (self.sum_rr / self.n - mean_r ** 2)
+            discrimination = covariance / np.sqrt(variance)
+        # undefined when all the answers are correct, or all incorrect
+        discrimination[~(variance > 1e-12)] = np.nan
+
+        rates = {}
+        for answer_id, column, selections in zip(
+            self.answer_ids, self.answer_questions, self.selections
+        ):
+            if column >= 0 and self.responses[column]:
+                question_id = int(self.question_ids[column])
+                rates.setdefault(question_id, {})[int(answer_id)] = round(
+                    float(selections / self.responses[column]), 4
+                )
+
+        stats = [
+            (
+                int(question_id),
+                int(responses),
+                float(p_value),
+                None if np.isnan(value) else float(value),
+            )
+            for question_id, responses, p_value, value in zip(
+                self.question_ids, self.responses, p_values, discrimination
+            )
+            if responses
+        ]
+        return stats, rates
+
+
+def analyse(chunk_cells=CHUNK_CELLS) -> ItemAnalysis:
+    """Stream the graded user answers and analyse them by chunks of users"""
+    analysis = ItemAnalysis.from_database()
+    users_per_chunk = max(1, chunk_cells // max(1, len(analysis.question_ids)))
+
+    rows = (
+        UserAnswer.objects.filter(is_correct__isnull=False)
+        .order_by("user_id", "pk")
+        .values_list("user_id", "question_id", "answer", "is_correct")
+    )
+    chunk = []
+    nb_users, last_user_id = 0, None
+    for row in rows.iterator(chunk_size=2000):
+        if row[0] != last_user_id:
+            if nb_users == users_per_chunk:
+                analysis.add_chunk(*zip(*chunk))
+                chunk, nb_users = [], 0
+            nb_users += 1
+            last_user_id = row[0]
+        chunk.append(row)
+    if chunk:
+        analysis.add_chunk(*zip(*chunk))
+    return analysis
+
+
+def save_stats(analysis: ItemAnalysis) -> int:
+    """Replace the stored question statistics with the analysis results
+
+    Returns:
+        int: number of analysed questions
+
+    """
+    stats, rates = analysis.results()
+    with transaction.atomic():
+        QuestionStats.objects.all().delete()
+        QuestionStats.objects.bulk_create(
+            [
+                QuestionStats(
+                    question_id=question_id,
+                    responses=responses,
+                    p_value=p_value,
+                    discrimination=discrimination,
+                    selection_rates=json.dumps(rates.get(question_id, {})),
+                )
+                for question_id, responses, p_value, discrimination in stats
+            ],
+            batch_size=500,
+        )
+    return len(stats)
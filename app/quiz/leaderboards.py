@@ -0,0 +1,200 @@
+"""
+Leaderboards of the users, per quiz and per category, in Redis sorted sets.
+
+When settings.QUIZ_LEADERBOARDS is set, the leaderboards are updated when a
+sitting is completed, once the transaction is committed:
+
+- the leaderboard of a quiz ranks the users by the best score of their
+  completed sittings of the quiz
+- the leaderboard of a category ranks the users by their number of correct
+  answers to the questions of the category, as in CategoryScore
+
+Ranks are read with ZREVRANK and pages with ZREVRANGE, both O(log n) in the
+size of the leaderboard. The rebuild_leaderboards management command fills
+them from the database.
+
+Members are user ids. A rebuild fills keys with the REBUILD_SUFFIX suffix,
+then renames them over the current leaderboards. While a rebuild runs, the
+completed sittings are held in a pending list instead of updating the
+leaderboards, and the ones the rebuild did not read from the database are
+replayed on the rebuilt leaderboards, so that no update is lost or counted
+twice.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django_redis import get_redis_connection
+
+QUIZ_KEY = "quiz:leaderboard:quiz:%s"
+
+CATEGORY_KEY = "quiz:leaderboard:category:%s"
+
+# suffix of the keys filled by a rebuild, renamed once complete
+REBUILD_SUFFIX = ":rebuild"
+
+# set while a rebuild runs, expires if the rebuild dies
+REBUILD_KEY = "quiz:leaderboard:rebuilding"
+REBUILD_TIMEOUT = 3600
+
+# list of the sittings completed while a rebuild runs
+PENDING_KEY = "quiz:leaderboard:pending"
+
+# set the score of a member if it is higher than its current score
+MAX_SCRIPT = """
+local score = redis.call("zscore", KEYS[1], ARGV[2])
+if not score or tonumber(score) < tonumber(ARGV[1]) then
+    redis.call("zadd", KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+# add a sitting to the leaderboards, or to the pending list while a rebuild
+# runs: KEYS are the rebuild flag, the pending list, the quiz leaderboard and
+# the category leaderboards, ARGV the sitting, the expiry of the pending
+# list, the score, the user and the category scores
+UPDATE_SCRIPT = """
+if redis.call("exists", KEYS[1]) == 1 then
+    redis.call("rpush", KEYS[2], ARGV[1])
+    redis.call("expire", KEYS[2], ARGV[2])
+    return
+end
+local score = redis.call("zscore", KEYS[3], ARGV[4])
+if not score or tonumber(score) < tonumber(ARGV[3]) then
+    redis.call("zadd", KEYS[3], ARGV[3], ARGV[4])
+end
+for i = 4, #KEYS do
+    redis.call("zincrby", KEYS[i], ARGV[i + 1], ARGV[4])
+end
+"""
+
+
+def get_connection():
+    return get_redis_connection("default")
+
+
+def add_sitting(sitting, category_scores: dict):
+    """Add the results of a completed sitting to the leaderboards, once the
+    current transaction is committed.
+
+    Args:
+        sitting (Sitting): completed sitting
+        category_scores (dict): number of correct answers of the sitting
+            indexed by category id
+
+    """
+    entry = {
+        "sitting": sitting.pk,
+        "user": sitting.user_id,
+        "quiz": sitting.quiz_id,
+        "score": sitting.current_score,
+        "categories": category_scores,
+    }
+
+    transaction.on_commit(lambda: replay([entry]))
+
+
+def start_rebuild():
+    """Hold the sittings completed from now on in the pending list"""
+    pipeline = get_connection().pipeline()
+    pipeline.delete(PENDING_KEY)
+    pipeline.set(REBUILD_KEY, 1, ex=REBUILD_TIMEOUT)
+    pipeline.execute()
+
+
+def cancel_rebuild():
+    get_connection().delete(REBUILD_KEY, PENDING_KEY)
+
+
+def finish_rebuild(keys, stale_keys) -> list:
+    """Rename the rebuilt leaderboards over the current ones and delete the
+    stale ones, in one transaction.
+
+    Returns:
+        list: the sittings completed during the rebuild, as pushed by
+            add_sitting
+
+    """
+    pipeline = get_connection().pipeline()
+    for key in keys:
+        pipeline.rename(key + REBUILD_SUFFIX, key)
+    if stale_keys:
+        pipeline.delete(*stale_keys)
+    pipeline.lrange(PENDING_KEY, 0, -1)
+    pipeline.delete(REBUILD_KEY, PENDING_KEY)
+    pending = pipeline.execute()[-2]
+    return [json.loads(entry) for entry in pending]
+
+
+def replay(entries: list):
+    """Add completed sittings to the leaderboards, as returned by
+    finish_rebuild or built by add_sitting"""
+    if not entries:
+        return
+    connection = get_connection()
+    update = connection.register_script(UPDATE_SCRIPT)
+    pipeline = connection.pipeline()
+    for entry in entries:
+        categories = [
+            (category_id, score)
+            for category_id, score in entry["categories"].items()
+            if score
+        ]
+        update(
+            keys=[REBUILD_KEY, PENDING_KEY, QUIZ_KEY % entry["quiz"]]
+            + [CATEGORY_KEY % category_id for category_id, _score in categories],
+            args=[json.dumps(entry), REBUILD_TIMEOUT, entry["score"], entry["user"]]
+            + [score for _category_id, score in categories],
+            client=pipeline,
+        )
+    pipeline.execute()
+
+
+class Leaderboard:
+    """Users of a leaderboard from the best to the worst, as a sequence of
+    {"rank", "user", "score"} dicts that Django paginators can slice"""
+
+    def __init__(self, key):
+        self.key = key
+
+    @classmethod
+    def for_quiz(cls, quiz_id):
+        return cls(QUIZ_KEY % quiz_id)
+
+    @classmethod
+    def for_category(cls, category_id):
+        return cls(CATEGORY_KEY % category_id)
+
+    def __len__(self):
+        return get_connection().zcard(self.key)
+
+    def count(self):
+        return len(self)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError("Leaderboards only support slicing")
+        start, stop = index.start or 0, index.stop
+        if start < 0 or (stop is not None and stop < 0):
+            start, stop, _step = index.indices(len(self))
+        if stop is not None and stop <= start:
+            return []
+        # the stop of ZREVRANGE is inclusive, -1 for the last member
+        end = -1 if stop is None else stop - 1
+        entries = get_connection().zrevrange(self.key, start, end, withscores=True)
+        users = get_user_model().objects.in_bulk(
+            [int(user_id) for user_id, _score in entries]
+        )
+        return [
+            {"rank": rank, "user": users.get(int(user_id)), "score": int(score)}
+            for rank, (user_id, score) in enumerate(entries, start + 1)
+        ]
+
+    def get_position(self, user_id):
+        """Return the rank and score of a user, or None if they are not ranked"""
+        pipeline = get_connection().pipeline()
+        pipeline.zrevrank(self.key, user_id)
+        pipeline.zscore(self.key, user_id)
+        rank, score = pipeline.execute()
+        if rank is None:
+            return None
+        return {"rank": rank + 1, "score": int(score)}
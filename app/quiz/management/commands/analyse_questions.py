@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app.quiz import item_analysis
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the difficulty, discrimination and answer selection rates "
+        "of the questions from the answers of the users"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-cells",
+            type=int,
+            default=item_analysis.CHUNK_CELLS,
+            help="Maximum size of the user x question matrix of a chunk of users",
+        )
+
+    def handle(self, *args, **options):
+        analysis = item_analysis.analyse(options["chunk_cells"])
+        nb_questions = item_analysis.save_stats(analysis)
+        self.stdout.write(self.style.SUCCESS("Analysed %d questions" % nb_questions))
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from app.quiz.models import SittingArchive
+
+
+class Command(BaseCommand):
+    help = "Archive the answers of old completed sittings, or restore them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.QUIZ_ARCHIVE_SITTINGS_AFTER_DAYS,
+            help="Archive the sittings completed more than this number of days ago",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--restore",
+            nargs="+",
+            type=int,
+            metavar="SITTING_ID",
+            help="Write the archived answers of these sittings back to the database",
+        )
+
+    def handle(self, *args, **options):
+        if options["restore"]:
+            archives = SittingArchive.objects.filter(sitting_id__in=options["restore"])
+            restored = 0
+            for archive in archives.select_related("sitting"):
+                archive.restore()
+                restored += 1
+            if restored < len(set(options["restore"])):
+                raise CommandError("Some of the sittings are not archived")
+            self.stdout.write(self.style.SUCCESS("Restored %d sittings" % restored))
+            return
+
+        before = now() - timedelta(days=options["days"])
+        archived = SittingArchive.objects.archive(before, options["batch_size"])
+        self.stdout.write(self.style.SUCCESS("Archived %d sittings" % archived))
@@ -1,31 +1,57 @@
-from django.core.management.base import BaseCommand, CommandError
+import gzip
 
-from rest_framework.renderers import JSONRenderer
+from django.core.management.base import BaseCommand, CommandError
 
+from app.quiz import bank
 from app.quiz.models import Quiz
-from app.quiz.serializers import QuizSerializer
 
 
 class Command(BaseCommand):
-    help = "Export a quiz to JSON"
+    help = "Export quizzes, or the whole question bank, to JSON or NDJSON"
 
     def add_arguments(self, parser):
-        parser.add_argument("id", nargs="?", type=int)
+        parser.add_argument("id", nargs="*", type=int)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Export all the quizzes and questions of the bank",
+        )
         parser.add_argument(
             "--filepath", "-f", nargs="?", type=str, default="quiz.json"
         )
+        parser.add_argument("--format", choices=bank.FORMATS, default="json")
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Compress the output, the default for file paths ending with .gz",
+        )
+        parser.add_argument("--chunk-size", type=int, default=bank.CHUNK_SIZE)
 
     def handle(self, *args, **options):
-        quiz_id = options["id"]
+        quiz_ids = options["id"]
         filepath = options["filepath"]
-        try:
-            quiz = Quiz.objects.get(pk=quiz_id)
-            serializer = QuizSerializer(quiz)
-            json = JSONRenderer().render(serializer.data)
-            with open(filepath, "w") as file:
-                file.write(json.decode())
-            self.stdout.write(
-                self.style.SUCCESS("Downloaded quiz %d to %s" % (quiz_id, filepath))
+        if options["all"]:
+            quiz_ids = None
+        elif not quiz_ids:
+            raise CommandError("Give the ids of the quizzes to export, or --all")
+        else:
+            missing = set(quiz_ids) - set(
+                Quiz.objects.filter(pk__in=quiz_ids).values_list("pk", flat=True)
+            )
+            if missing:
+                raise CommandError(
+                    'Quiz "%s" does not exist'
+                    % ", ".join(str(quiz_id) for quiz_id in sorted(missing))
+                )
+
+        if options["gzip"] or filepath.endswith(".gz"):
+            file = gzip.open(filepath, "wt", encoding="utf-8")
+        else:
+            file = open(filepath, "w", encoding="utf-8")
+        with file:
+            nb_quizzes = bank.export(
+                file, quiz_ids, options["format"], options["chunk_size"]
             )
-        except Quiz.DoesNotExist:
-            raise CommandError('Quiz "%s" does not exist' % quiz_id)
+        self.stdout.write(
+            self.style.SUCCESS("Downloaded %d quizzes to %s" % (nb_quizzes, filepath))
+        )
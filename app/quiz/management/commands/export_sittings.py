@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.quiz import export
+from app.quiz.forms import SittingExportForm
+
+
+class Command(BaseCommand):
+    help = "Export the answers of the completed sittings to CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--quiz", help="URL of the quiz")
+        parser.add_argument("--mode", help="Mode of the sittings: study or exam")
+        parser.add_argument("--since", help="Sittings completed from this date")
+        parser.add_argument("--until", help="Sittings completed before this date")
+        parser.add_argument("--format", choices=list(export.FORMATS), default="csv")
+        parser.add_argument(
+            "--output", "-o", help="File to write, the standard output by default"
+        )
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        form = SittingExportForm(
+            {
+                key: options[key]
+                for key in ("quiz", "mode", "since", "until", "format")
+                if options[key] is not None
+            }
+        )
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        pieces = export.stream(
+            form.get_filters(), form.get_format(), options["chunk_size"]
+        )
+        if options["output"] is None:
+            for piece in pieces:
+                self.stdout.write(piece, ending="")
+            return
+
+        with open(options["output"], "w", newline="") as file:
+            for piece in pieces:
+                file.write(piece)
+        self.stdout.write(
+            self.style.SUCCESS("Exported the sittings to %s" % options["output"])
+        )
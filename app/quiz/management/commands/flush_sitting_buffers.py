@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from app.quiz import buffer
+from app.quiz.models import Sitting
+
+
+class Command(BaseCommand):
+    help = "Write the buffered answers of in-progress sittings to the database"
+
+    def handle(self, *args, **options):
+        sitting_ids = buffer.get_buffered_sittings()
+        sittings = Sitting.objects.filter(pk__in=sitting_ids, complete=False)
+        flushed = set()
+        for sitting in sittings.iterator():
+            # the sitting may have been completed since it was read
+            if sitting.flush_answers():
+                flushed.add(sitting.pk)
+
+        # sittings deleted or completed while their answers were buffered
+        buffer.forget_sittings(set(sitting_ids) - flushed)
+
+        self.stdout.write(
+            self.style.SUCCESS("Flushed the answers of %d sittings" % len(flushed))
+        )
@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from app.quiz import leaderboards
+from app.quiz.models import CategoryScore, Sitting
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the leaderboards of the quizzes and the categories from "
+        "the completed sittings and the category scores"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # read all the tables in the same snapshot, the first statement of
+        # the transaction sets its isolation level
+        snapshot = connection.vendor == "postgresql" and not connection.in_atomic_block
+        # the sittings completed from now on are replayed once rebuilt
+        leaderboards.start_rebuild()
+        try:
+            with transaction.atomic():
+                if snapshot:
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"
+                        )
+                keys, pending = self.rebuild(options["chunk_size"])
+                # the pending sittings already read by the rebuild
+                completed = set(
+                    Sitting.objects.filter(
+                        pk__in=[entry["sitting"] for entry in pending], complete=True
+                    ).values_list("pk", flat=True)
+                )
+        except BaseException:
+            leaderboards.cancel_rebuild()
+            raise
+        leaderboards.replay(
+            [entry for entry in pending if entry["sitting"] not in completed]
+        )
+
+        self.stdout.write(self.style.SUCCESS("Rebuilt %d leaderboards" % len(keys)))
+
+    def rebuild(self, chunk_size):
+        """Fill the leaderboards from the database and swap them in, return
+        their keys and the sittings completed meanwhile"""
+        connection = leaderboards.get_connection()
+        set_max = connection.register_script(leaderboards.MAX_SCRIPT)
+        suffix = leaderboards.REBUILD_SUFFIX
+        keys = set()
+
+        def write(rows, best_score):
+            pipeline = connection.pipeline()
+            for key, score, user_id in rows:
+                if key not in keys:
+                    pipeline.delete(key + suffix)
+                    keys.add(key)
+                if best_score:
+                    set_max(keys=[key + suffix], args=[score, user_id], client=pipeline)
+                else:
+                    pipeline.zadd(key + suffix, {user_id: score})
+            pipeline.execute()
+
+        sources = (
+            (
+                Sitting.objects.filter(complete=True),
+                "quiz_id",
+                "current_score",
+                leaderboards.QUIZ_KEY,
+                True,
+            ),
+            (
+                CategoryScore.objects.filter(score__gt=0),
+                "category_id",
+                "score",
+                leaderboards.CATEGORY_KEY,
+                False,
+            ),
+        )
+        for queryset, key_field, score_field, key_format, best_score in sources:
+            rows = []
+            values = queryset.values_list(key_field, score_field, "user_id")
+            for object_id, score, user_id in values.iterator(chunk_size=chunk_size):
+                rows.append((key_format % object_id, score, user_id))
+                if len(rows) == chunk_size:
+                    write(rows, best_score)
+                    rows = []
+            write(rows, best_score)
+
+        # swap the rebuilt leaderboards in, and drop the ones left empty
+        stale_keys = {
+            key.decode()
+            for key_format in (leaderboards.QUIZ_KEY, leaderboards.CATEGORY_KEY)
+            for key in connection.scan_iter(match=key_format % "*")
+            if not key.decode().endswith(suffix)
+        } - keys
+        return keys, leaderboards.finish_rebuild(keys, stale_keys)
@@ -0,0 +1,45 @@
+import gzip
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from app.quiz import bank
+
+
+class Command(BaseCommand):
+    help = "Import quizzes and questions from JSON, NDJSON or CSV files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("filepath", type=str)
+        parser.add_argument(
+            "--format",
+            choices=bank.IMPORT_FORMATS,
+            help="Format of the file, guessed from its extension by default",
+        )
+        parser.add_argument("--chunk-size", type=int, default=bank.IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        filepath = options["filepath"]
+        name = filepath[:-3] if filepath.endswith(".gz") else filepath
+        input_format = options["format"] or os.path.splitext(name)[1][1:].lower()
+        if input_format not in bank.IMPORT_FORMATS:
+            raise CommandError("Unknown format, use --format")
+        if not os.path.exists(filepath):
+            raise CommandError('File "%s" does not exist' % filepath)
+
+        if filepath.endswith(".gz"):
+            file = gzip.open(filepath, "rt", encoding="utf-8", newline="")
+        else:
+            file = open(filepath, encoding="utf-8", newline="")
+        with file:
+            try:
+                importer = bank.import_file(file, input_format, options["chunk_size"])
+            except (KeyError, ValueError, ValidationError) as error:
+                raise CommandError("Invalid file: %s" % error)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Created %d questions and %d quizzes, %d questions already existed"
+                % (importer.nb_created, importer.nb_quizzes, importer.nb_existing)
+            )
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.11 on 2026-10-18 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0021_auto_20210121_0249'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='useranswer',
+            constraint=models.UniqueConstraint(fields=('sitting', 'order'), name='unique_sitting_answer_order'),
+        ),
+    ]
@@ -0,0 +1,107 @@
+import json
+import sys
+from array import array
+
+import django.core.validators
+from django.db import migrations, models
+
+UNANSWERED = 2
+BATCH_SIZE = 500
+
+
+def pack_ids(question_ids):
+    ids = array("I", question_ids)
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids.tobytes()
+
+
+def unpack_ids(question_ids):
+    ids = array("I")
+    ids.frombytes(question_ids)
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids.tolist()
+
+
+def csv_to_packed(apps, schema_editor):
+    """Convert the comma separated question order and the json user answers"""
+    Sitting = apps.get_model("quiz", "Sitting")
+    batch = []
+    for sitting in Sitting.objects.only("question_order", "user_answers").iterator():
+        question_ids = [int(n) for n in sitting.question_order.split(",") if n]
+        results = bytearray([UNANSWERED]) * len(question_ids)
+        for order, answer in json.loads(sitting.user_answers or "{}").items():
+            index = int(order) - 1
+            if answer != "?" and 0 <= index < len(results):
+                results[index] = 1 if answer else 0
+
+        sitting.question_ids = pack_ids(question_ids)
+        sitting.results = bytes(results)
+        batch.append(sitting)
+        if len(batch) == BATCH_SIZE:
+            Sitting.objects.bulk_update(batch, ["question_ids", "results"])
+            batch = []
+    Sitting.objects.bulk_update(batch, ["question_ids", "results"])
+
+
+def packed_to_csv(apps, schema_editor):
+    Sitting = apps.get_model("quiz", "Sitting")
+    batch = []
+    for sitting in Sitting.objects.only("question_ids", "results").iterator():
+        question_ids = unpack_ids(sitting.question_ids)
+        sitting.question_order = ",".join(map(str, question_ids)) + ","
+        sitting.user_answers = json.dumps(
+            {
+                order: "?" if status == UNANSWERED else status
+                for order, status in enumerate(bytes(sitting.results), 1)
+            }
+        )
+        batch.append(sitting)
+        if len(batch) == BATCH_SIZE:
+            Sitting.objects.bulk_update(batch, ["question_order", "user_answers"])
+            batch = []
+    Sitting.objects.bulk_update(batch, ["question_order", "user_answers"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0022_useranswer_unique_order"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitting",
+            name="question_ids",
+            field=models.BinaryField(default=bytes, verbose_name="Question Order"),
+        ),
+        migrations.AddField(
+            model_name="sitting",
+            name="results",
+            field=models.BinaryField(default=bytes, verbose_name="User Answers"),
+        ),
+        # give the legacy field a default so that it can be added back when
+        # the migration is reversed
+        migrations.AlterField(
+            model_name="sitting",
+            name="question_order",
+            field=models.CharField(
+                default="",
+                max_length=1024,
+                validators=[
+                    django.core.validators.validate_comma_separated_integer_list
+                ],
+                verbose_name="Question Order",
+            ),
+        ),
+        migrations.RunPython(csv_to_packed, packed_to_csv),
+        migrations.RemoveField(
+            model_name="sitting",
+            name="question_order",
+        ),
+        migrations.RemoveField(
+            model_name="sitting",
+            name="user_answers",
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.0.11 on 2026-10-18 17:42
+
+import random
+
+import app.quiz.models.sitting
+from django.db import migrations, models
+
+
+def set_seeds(apps, schema_editor):
+    """The default of the field is evaluated once for all the existing rows:
+    give each sitting its own seed"""
+    Sitting = apps.get_model("quiz", "Sitting")
+    rng = random.SystemRandom()
+    ids = list(Sitting.objects.values_list("id", flat=True))
+    for start in range(0, len(ids), 1000):
+        Sitting.objects.bulk_update(
+            # fits the seed field on every database backend, see new_seed
+            [
+                Sitting(id=sitting_id, seed=rng.getrandbits(31))
+                for sitting_id in ids[start : start + 1000]
+            ],
+            ["seed"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0023_sitting_packed_question_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitting',
+            name='seed',
+            field=models.PositiveIntegerField(default=app.quiz.models.sitting.new_seed, verbose_name='Seed'),
+        ),
+        migrations.RunPython(set_seeds, migrations.RunPython.noop),
+    ]
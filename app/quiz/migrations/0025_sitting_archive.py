@@ -0,0 +1,31 @@
+# Generated by Django 3.0.11 on 2026-10-18 17:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0024_sitting_seed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SittingArchive',
+            fields=[
+                ('sitting', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='quiz.Sitting', verbose_name='Sitting')),
+                ('data', models.BinaryField(verbose_name='Data')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived')),
+            ],
+            options={
+                'verbose_name': 'Sitting archive',
+                'verbose_name_plural': 'Sitting archives',
+            },
+        ),
+        migrations.AddField(
+            model_name='sitting',
+            name='archived',
+            field=models.BooleanField(default=False, help_text='The answers of the user are in the sitting archive', verbose_name='Archived'),
+        ),
+    ]
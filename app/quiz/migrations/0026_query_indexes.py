@@ -0,0 +1,49 @@
+# Generated by Django 3.0.11 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+def rename_duplicate_urls(apps, schema_editor):
+    """Keep the url of the oldest quiz of each url, and suffix the others
+    with their id"""
+    Quiz = apps.get_model("quiz", "Quiz")
+    max_length = Quiz._meta.get_field("url").max_length
+    # no ordering, the default ordering would be added to the GROUP BY
+    duplicates = (
+        Quiz.objects.order_by()
+        .values("url")
+        .annotate(first_id=models.Min("id"), count=models.Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        quizzes = Quiz.objects.filter(
+            url=duplicate["url"], id__gt=duplicate["first_id"]
+        ).order_by("id")
+        for quiz in quizzes:
+            suffix, counter = "-%d" % quiz.id, 1
+            while True:
+                url = quiz.url[: max_length - len(suffix)] + suffix
+                if not Quiz.objects.filter(url=url).exists():
+                    break
+                suffix, counter = "-%d-%d" % (quiz.id, counter), counter + 1
+            Quiz.objects.filter(id=quiz.id).update(url=url)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0025_sitting_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_urls, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='quiz',
+            name='url',
+            field=models.SlugField(help_text='a user friendly url', max_length=60, unique=True, verbose_name='user friendly url'),
+        ),
+        migrations.AddIndex(
+            model_name='sitting',
+            index=models.Index(fields=['user', 'quiz', 'mode', 'complete'], name='quiz_sitting_user_quiz_idx'),
+        ),
+    ]
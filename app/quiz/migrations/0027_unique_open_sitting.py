@@ -0,0 +1,48 @@
+# Generated by Django 3.0.11 on 2026-10-18 18:01
+
+from django.db import migrations, models
+from django.utils.timezone import now
+
+
+def close_duplicate_sittings(apps, schema_editor):
+    """Keep the open sitting with the most answers of each user, quiz and
+    mode open, and close the others: they are not deleted, so that the
+    answers of the users are kept"""
+    Sitting = apps.get_model("quiz", "Sitting")
+    open_sittings = Sitting.objects.filter(complete=False)
+    # no ordering, a default ordering would be added to the GROUP BY
+    duplicates = (
+        open_sittings.order_by()
+        .values("user", "quiz", "mode")
+        .annotate(count=models.Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        sittings = (
+            open_sittings.filter(
+                user=duplicate["user"], quiz=duplicate["quiz"], mode=duplicate["mode"]
+            )
+            .annotate(
+                nb_answers=models.Count(
+                    "answers", filter=models.Q(answers__answer__isnull=False)
+                )
+            )
+            .order_by("-nb_answers", "id")
+        )
+        closed_ids = list(sittings.values_list("id", flat=True))[1:]
+        Sitting.objects.filter(id__in=closed_ids).update(complete=True, end=now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0026_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_sittings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='sitting',
+            constraint=models.UniqueConstraint(condition=models.Q(complete=False), fields=('user', 'quiz', 'mode'), name='unique_open_sitting'),
+        ),
+    ]
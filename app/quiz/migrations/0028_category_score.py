@@ -0,0 +1,114 @@
+# Generated by Django 3.0.11 on 2026-10-18 18:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.core.validators
+import django.db.models.deletion
+
+BATCH_SIZE = 500
+
+
+def csv_to_rows(apps, schema_editor):
+    """Convert the "category,score,possible," progress scores to rows"""
+    Category = apps.get_model("quiz", "Category")
+    CategoryScore = apps.get_model("quiz", "CategoryScore")
+    Progress = apps.get_model("quiz", "Progress")
+
+    # the csv scores were matched case insensitively
+    categories = {
+        name.lower(): pk
+        for pk, name in Category.objects.values_list("pk", "name")
+        if name is not None
+    }
+    batch = []
+    for user_id, score in Progress.objects.values_list("user_id", "score").iterator():
+        values = score.split(",")
+        scores = {}
+        for i in range(0, len(values) - 2, 3):
+            category_id = categories.get(values[i].lower())
+            if category_id is None or category_id in scores:
+                continue
+            try:
+                scores[category_id] = (int(values[i + 1]), int(values[i + 2]))
+            except ValueError:
+                continue
+
+        for category_id, (score, possible) in scores.items():
+            if score or possible:
+                batch.append(
+                    CategoryScore(
+                        user_id=user_id,
+                        category_id=category_id,
+                        score=score,
+                        possible=possible,
+                    )
+                )
+        if len(batch) >= BATCH_SIZE:
+            CategoryScore.objects.bulk_create(batch)
+            batch = []
+    CategoryScore.objects.bulk_create(batch)
+
+
+def rows_to_csv(apps, schema_editor):
+    CategoryScore = apps.get_model("quiz", "CategoryScore")
+    Progress = apps.get_model("quiz", "Progress")
+
+    scores = {}
+    rows = CategoryScore.objects.values_list(
+        "user_id", "category__name", "score", "possible"
+    )
+    for user_id, name, score, possible in rows.order_by("user_id", "category__name"):
+        scores[user_id] = scores.get(user_id, "") + "%s,%d,%d," % (
+            name,
+            score,
+            possible,
+        )
+
+    batch = []
+    for progress in Progress.objects.filter(user_id__in=scores).iterator():
+        progress.score = scores[progress.user_id]
+        batch.append(progress)
+        if len(batch) == BATCH_SIZE:
+            Progress.objects.bulk_update(batch, ["score"])
+            batch = []
+    Progress.objects.bulk_update(batch, ["score"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0027_unique_open_sitting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(default=0, verbose_name='Score')),
+                ('possible', models.PositiveIntegerField(default=0, verbose_name='Possible score')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='quiz.Category', verbose_name='Category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_scores', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Category score',
+                'verbose_name_plural': 'Category scores',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='categoryscore',
+            constraint=models.UniqueConstraint(fields=('user', 'category'), name='unique_user_category_score'),
+        ),
+        migrations.RunPython(csv_to_rows, rows_to_csv),
+        # lets the field be added back with an empty score when reverting
+        migrations.AlterField(
+            model_name='progress',
+            name='score',
+            field=models.CharField(default='', max_length=1024, validators=[django.core.validators.validate_comma_separated_integer_list], verbose_name='Score'),
+        ),
+        migrations.RemoveField(
+            model_name='progress',
+            name='score',
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.0.11 on 2026-10-18 18:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0028_category_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progress',
+            name='possible',
+            field=models.PositiveIntegerField(default=0, verbose_name='Possible score'),
+        ),
+        migrations.AddField(
+            model_name='progress',
+            name='score',
+            field=models.PositiveIntegerField(default=0, verbose_name='Score'),
+        ),
+        migrations.AddField(
+            model_name='progress',
+            name='sittings',
+            field=models.PositiveIntegerField(default=0, verbose_name='Sittings'),
+        ),
+        migrations.CreateModel(
+            name='QuizScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sittings', models.PositiveIntegerField(default=0, verbose_name='Sittings')),
+                ('score', models.PositiveIntegerField(default=0, verbose_name='Score')),
+                ('possible', models.PositiveIntegerField(default=0, verbose_name='Possible score')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='quiz.Quiz', verbose_name='Quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_scores', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Quiz score',
+                'verbose_name_plural': 'Quiz scores',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='quizscore',
+            constraint=models.UniqueConstraint(fields=('user', 'quiz'), name='unique_user_quiz_score'),
+        ),
+    ]
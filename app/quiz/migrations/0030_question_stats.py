@@ -0,0 +1,29 @@
+# Generated by Django 3.0.11 on 2026-10-18 18:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0029_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='quiz.Question', verbose_name='Question')),
+                ('responses', models.PositiveIntegerField(default=0, verbose_name='Responses')),
+                ('p_value', models.FloatField(null=True, verbose_name='P-value')),
+                ('discrimination', models.FloatField(null=True, verbose_name='Discrimination')),
+                ('selection_rates', models.TextField(default='{}', verbose_name='Selection rates')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated')),
+            ],
+            options={
+                'verbose_name': 'Question statistics',
+                'verbose_name_plural': 'Question statistics',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.0.11 on 2026-10-18 18:22
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0030_question_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionHistory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_seen', models.DateTimeField(verbose_name='Last seen')),
+                ('due', models.DateTimeField(verbose_name='Due')),
+                ('interval', models.DurationField(default=datetime.timedelta(0), verbose_name='Interval')),
+                ('streak', models.PositiveIntegerField(default=0, verbose_name='Streak')),
+                ('ease', models.FloatField(default=2.5, verbose_name='Ease')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='quiz.Question', verbose_name='Question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_history', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Question history',
+                'verbose_name_plural': 'Question histories',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='questionhistory',
+            index=models.Index(fields=['user', 'due'], name='quiz_history_user_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='questionhistory',
+            constraint=models.UniqueConstraint(fields=('user', 'question'), name='unique_user_question_history'),
+        ),
+    ]
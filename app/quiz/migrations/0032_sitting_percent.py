@@ -0,0 +1,51 @@
+# Generated by Django 3.0.11 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+def store_percent(apps, schema_editor):
+    """Store the percentage of the completed sittings, and give an end time
+    to the ones completed without it"""
+    Sitting = apps.get_model("quiz", "Sitting")
+    sittings = Sitting.objects.filter(complete=True).only(
+        "question_ids", "current_score", "start", "end"
+    )
+    last_id = 0
+    while True:
+        batch = list(sittings.filter(id__gt=last_id).order_by("id")[:2000])
+        if not batch:
+            break
+        for sitting in batch:
+            # question ids are packed as 32 bits integers
+            nb_questions = len(sitting.question_ids) // 4
+            percent = 0
+            if nb_questions:
+                percent = int(round(sitting.current_score * 100 / nb_questions))
+            sitting.percent = min(max(percent, 0), 100)
+            sitting.end = sitting.end or sitting.start
+        Sitting.objects.bulk_update(batch, ["percent", "end"])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0031_question_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitting',
+            name='percent',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Stored when the sitting is completed', null=True, verbose_name='Percent correct'),
+        ),
+        migrations.RunPython(store_percent, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='sitting',
+            index=models.Index(fields=['user', 'complete', '-end', '-id'], name='quiz_sitting_user_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitting',
+            index=models.Index(fields=['complete', '-end', '-id'], name='quiz_sitting_end_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.11 on 2026-10-18 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0032_sitting_percent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='key',
+            field=models.CharField(blank=True, help_text='Natural key of the question, used by the upload_quiz command', max_length=64, null=True, unique=True, verbose_name='Key'),
+        ),
+    ]
@@ -1,9 +1,12 @@
+from .archive import SittingArchive
 from .category import Category, SubCategory
 from .essay import EssayQuestion
+from .history import QuestionHistory
 from .multichoice import Answer, MCQuestion
 from .question import Question
 from .quiz import Quiz
 from .open import OpenQuestion
-from .progress import Progress
-from .sitting import Sitting, SittingMode, UserAnswer
+from .progress import CategoryScore, Progress, QuizScore
+from .sitting import Sitting, SittingMode, SittingState, SlotStatus, UserAnswer
+from .stats import QuestionStats
 from .true_false import TFQuestion
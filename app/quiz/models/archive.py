@@ -0,0 +1,129 @@
+import json
+import zlib
+
+from django.db import models, transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+
+from .sitting import Sitting, UserAnswer
+
+
+class SittingArchiveManager(models.Manager):
+    def archive(self, before, batch_size=500) -> int:
+        """Archive the completed sittings that ended before the given date.
+
+        The user answers of each sitting are packed into a compressed
+        SittingArchive row, and the UserAnswer rows are deleted, one
+        transaction per batch of sittings.
+
+        Returns:
+            int: number of archived sittings
+
+        """
+        sittings = Sitting.objects.filter(
+            complete=True, archived=False, end__lt=before
+        ).order_by("pk")
+        nb_archived = 0
+        while True:
+            with transaction.atomic():
+                batch = {
+                    sitting.pk: sitting
+                    for sitting in sittings.only("pk", "start", "end")[:batch_size]
+                }
+                if not batch:
+                    break
+
+                answers = {pk: [] for pk in batch}
+                user_answers = UserAnswer.objects.filter(sitting_id__in=batch)
+                rows = user_answers.order_by("order").values_list(
+                    "sitting_id", "order", "answer", "is_correct"
+                )
+                for sitting_id, order, answer, is_correct in rows:
+                    answers[sitting_id].append([order, answer, is_correct])
+
+                self.bulk_create(
+                    [
+                        SittingArchive(
+                            sitting_id=pk,
+                            data=SittingArchive.pack(sitting, answers[pk]),
+                        )
+                        for pk, sitting in batch.items()
+                    ]
+                )
+                user_answers.delete()
+                Sitting.objects.filter(pk__in=batch).update(archived=True)
+            nb_archived += len(batch)
+        return nb_archived
+
+
+class SittingArchive(models.Model):
+    """
+    Compressed summary of an archived sitting: the answers of the user with
+    their correctness, and the start and end dates of the sitting.
+    The UserAnswer rows of the sitting are deleted once it is archived.
+    """
+
+    sitting = models.OneToOneField(
+        Sitting,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="archive",
+        verbose_name=_("Sitting"),
+    )
+
+    data = models.BinaryField(verbose_name=_("Data"))
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Archived"))
+
+    objects = SittingArchiveManager()
+
+    class Meta:
+        verbose_name = _("Sitting archive")
+        verbose_name_plural = _("Sitting archives")
+
+    @staticmethod
+    def pack(sitting: Sitting, answers: list) -> bytes:
+        """Pack a list of [order, answer, is_correct] answers"""
+        summary = {
+            "start": sitting.start.isoformat() if sitting.start else None,
+            "end": sitting.end.isoformat() if sitting.end else None,
+            "answers": answers,
+        }
+        return zlib.compress(json.dumps(summary, separators=(",", ":")).encode())
+
+    def unpack(self) -> dict:
+        summary = json.loads(zlib.decompress(self.data))
+        for key in ("start", "end"):
+            if summary[key] is not None:
+                summary[key] = parse_datetime(summary[key])
+        return summary
+
+    def get_answers(self) -> dict:
+        """Return the archived answers as (answer, is_correct) tuples indexed
+        by question order"""
+        return {
+            order: (answer, is_correct)
+            for order, answer, is_correct in self.unpack()["answers"]
+        }
+
+    def restore(self):
+        """Write the archived answers back to UserAnswer rows and delete
+        the archive"""
+        sitting = self.sitting
+        with transaction.atomic():
+            UserAnswer.objects.bulk_create(
+                [
+                    UserAnswer(
+                        sitting=sitting,
+                        user_id=sitting.user_id,
+                        order=order,
+                        question_id=sitting.state.question_id(order),
+                        answer=answer,
+                        is_correct=is_correct,
+                    )
+                    for order, (answer, is_correct) in self.get_answers().items()
+                ]
+            )
+            Sitting.objects.filter(pk=sitting.pk).update(archived=False)
+            self.delete()
+        sitting.archived = False
@@ -7,10 +7,10 @@ class EssayQuestion(Question):
     def check_if_correct(self, guess):
         return False
 
-    def get_answers(self):
+    def get_answers(self, seed=None):
         return False
 
-    def get_answers_list(self):
+    def get_answers_list(self, seed=None):
         return False
 
     def answer_choice_to_string(self, guess):
@@ -0,0 +1,136 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils.timezone import now
+from django.utils.translation import gettext_lazy as _
+
+from .question import Question
+
+# ease of a question the user never answered, and the lowest ease
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+# intervals after the first and the second correct answers in a row
+FIRST_INTERVAL = timedelta(days=1)
+SECOND_INTERVAL = timedelta(days=6)
+
+# a question answered incorrectly is due again after this delay
+RETRY_INTERVAL = timedelta(minutes=10)
+
+
+class QuestionHistoryManager(models.Manager):
+    def record(self, user_id, results: dict, when=None):
+        """Update the history of the user with the results of their answers.
+
+        The missing history rows are inserted first, ignoring the rows
+        inserted meanwhile by a concurrent answer of the user, so that all
+        the rows exist and are locked when they are read. The results are
+        then applied with one bulk update.
+
+        Args:
+            user_id (int): id of the user
+            results (dict): True or False for each answered question id
+            when (datetime): time of the answers, defaults to now
+
+        """
+        if not results:
+            return
+        when = when or now()
+        self.bulk_create(
+            [
+                QuestionHistory(
+                    user_id=user_id, question_id=question_id, last_seen=when, due=when
+                )
+                for question_id in results
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+        histories = list(
+            self.select_for_update().filter(
+                user_id=user_id, question_id__in=list(results)
+            )
+        )
+        for history in histories:
+            history.add_result(results[history.question_id], when)
+
+        self.bulk_update(
+            histories,
+            ["last_seen", "due", "interval", "streak", "ease", "attempts"],
+            batch_size=500,
+        )
+
+
+class QuestionHistory(models.Model):
+    """
+    Spaced repetition history of a user at a question, updated on each
+    answer of the user.
+
+    Every correct answer in a row multiplies the interval before the question
+    is due again by the ease of the question, an incorrect answer resets the
+    streak, lowers the ease and makes the question due again shortly.
+    Study sittings pick the questions that are due first, see app.quiz.study.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="question_history",
+        verbose_name=_("User"),
+    )
+
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.CASCADE,
+        related_name="history",
+        verbose_name=_("Question"),
+    )
+
+    last_seen = models.DateTimeField(verbose_name=_("Last seen"))
+
+    due = models.DateTimeField(verbose_name=_("Due"))
+
+    interval = models.DurationField(default=timedelta(), verbose_name=_("Interval"))
+
+    streak = models.PositiveIntegerField(default=0, verbose_name=_("Streak"))
+
+    ease = models.FloatField(default=DEFAULT_EASE, verbose_name=_("Ease"))
+
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Attempts"))
+
+    objects = QuestionHistoryManager()
+
+    class Meta:
+        verbose_name = _("Question history")
+        verbose_name_plural = _("Question histories")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "question"], name="unique_user_question_history"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["user", "due"], name="quiz_history_user_due_idx")
+        ]
+
+    def __str__(self):
+        return "%s - %s" % (self.user, self.question)
+
+    def add_result(self, is_correct: bool, when):
+        """Schedule the next review of the question after an answer"""
+        self.attempts += 1
+        self.last_seen = when
+        if is_correct:
+            self.streak += 1
+            if self.streak == 1:
+                self.interval = FIRST_INTERVAL
+            elif self.streak == 2:
+                self.interval = SECOND_INTERVAL
+            else:
+                self.interval = self.interval * self.ease
+            self.ease += 0.1
+        else:
+            self.streak = 0
+            self.interval = RETRY_INTERVAL
+            self.ease = max(MIN_EASE, self.ease - 0.2)
+        self.due = when + self.interval
@@ -1,4 +1,7 @@
+import random
+
 from django.db import models
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from .question import Question
@@ -32,38 +35,53 @@ class MCQuestion(Question):
         help_text=_("If true, the user can select several answers"),
     )
 
+    @cached_property
+    def answer_choices(self) -> list:
+        """Answers of the question, loaded once per instance.
+
+        Uses the answers prefetched with ``prefetch_related("answer_set")``
+        if any, and is set directly on the questions built from the cache.
+        """
+        return list(self.answer_set.all())
+
+    @cached_property
+    def correct_answer_ids(self) -> frozenset:
+        """Ids of the correct answers, as strings like the submitted choices"""
+        return frozenset(
+            str(answer.id) for answer in self.answer_choices if answer.correct
+        )
+
     def check_if_correct(self, guess):
+        """A single choice must be one of the correct answers; with multiple
+        answers allowed, all the correct answers and only them must be chosen"""
         if self.allow_multiple_answers:
-            answers = Answer.objects.filter(id__in=guess)
-        else:
-            answers = [Answer.objects.get(id=guess)]
+            return {str(item) for item in guess} == self.correct_answer_ids
+        return str(guess) in self.correct_answer_ids
 
-        for answer in answers:
-            if not answer.correct:
-                return False
+    def order_answers(self, answers, seed=None):
+        """Order the answers in Python, so that the loaded answers are reused.
 
-        return True
-
-    def order_answers(self, queryset):
+        Random orders are drawn from ``seed`` when it is given, so that the
+        same seed always gives the same order.
+        """
+        answers = list(answers)
         if self.answer_order == "content":
-            return queryset.order_by("content")
-        if self.answer_order == "random":
-            return queryset.order_by("?")
-        if self.answer_order == "none":
-            return queryset.order_by()
-        return queryset
-
-    def get_answers(self):
-        return self.order_answers(Answer.objects.filter(question=self))
-
-    def get_answers_list(self):
-        return [
-            (answer.id, answer.content)
-            for answer in self.order_answers(Answer.objects.filter(question=self))
-        ]
+            answers.sort(key=lambda answer: answer.content)
+        elif self.answer_order == "random":
+            random.Random(seed).shuffle(answers)
+        return answers
+
+    def get_answers(self, seed=None):
+        return self.order_answers(self.answer_choices, seed)
+
+    def get_answers_list(self, seed=None):
+        return [(answer.id, answer.content) for answer in self.get_answers(seed)]
 
     def answer_choice_to_string(self, guess):
-        return Answer.objects.get(id=guess).content
+        for answer in self.answer_choices:
+            if str(answer.id) == str(guess):
+                return answer.content
+        return ""
 
     class Meta:
         verbose_name = _("Multiple Choice Question")
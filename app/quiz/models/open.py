@@ -45,12 +45,12 @@ class OpenQuestion(Question):
         except:
             return False
 
-    def get_answers(self) -> List[Dict]:
+    def get_answers(self, seed=None) -> List[Dict]:
         return [
             {"correct": True, "content": self.answer},
         ]
 
-    def get_answers_list(self):
+    def get_answers_list(self, seed=None):
         return False
 
     def answer_choice_to_string(self, guess):
@@ -1,19 +1,136 @@
-import re
-
 from django.conf import settings
-from django.core.validators import (
-    validate_comma_separated_integer_list,
-)
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, FilteredRelation, Q
 from django.utils.translation import gettext_lazy as _
 
 from .category import Category
-from .sitting import Sitting
+from .quiz import Quiz
+
+
+class ScoreManager(models.Manager):
+    def increment(self, lookup: dict, **values):
+        """Add the given values to the fields of the row matching lookup.
+
+        The row is incremented in the database, so concurrent updates don't
+        overwrite each other. It is created on the first update, or
+        incremented again if a concurrent request created it first.
+        """
+        rows = self.filter(**lookup)
+        increments = {field: F(field) + value for field, value in values.items()}
+        if rows.update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                self.create(**lookup, **values)
+        except IntegrityError:
+            rows.update(**increments)
+
+
+class CategoryScoreManager(ScoreManager):
+    def add(self, user, category_id, score=0, possible=0):
+        """Add to the score of the user in the category"""
+        self.increment(
+            {"user": user, "category_id": category_id}, score=score, possible=possible
+        )
+
+    def user_scores(self, user) -> dict:
+        """
+        Returns a dict in which the key is the category name and the item is
+        a list of three integers: the number of questions correct, the
+        possible best score and the percentage correct.
+
+        The dict has one key for every category, read with a single query.
+        """
+        categories = Category.objects.annotate(
+            user_score=FilteredRelation("scores", condition=Q(scores__user=user))
+        ).values_list("name", "user_score__score", "user_score__possible")
+
+        output = {}
+        for name, score, possible in categories:
+            score, possible = score or 0, possible or 0
+            percent = int(round(score * 100 / possible)) if possible else 0
+            output[name] = [score, possible, percent]
+        return output
+
+
+class CategoryScore(models.Model):
+    """Score of a user in a category"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="category_scores",
+        verbose_name=_("User"),
+    )
+
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="scores",
+        verbose_name=_("Category"),
+    )
+
+    score = models.PositiveIntegerField(default=0, verbose_name=_("Score"))
+
+    possible = models.PositiveIntegerField(default=0, verbose_name=_("Possible score"))
+
+    objects = CategoryScoreManager()
+
+    class Meta:
+        verbose_name = _("Category score")
+        verbose_name_plural = _("Category scores")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "category"], name="unique_user_category_score"
+            )
+        ]
+
+    def __str__(self):
+        return "%s - %s" % (self.user, self.category)
+
+
+class QuizScore(models.Model):
+    """Results of the completed sittings of a user at a quiz"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="quiz_scores",
+        verbose_name=_("User"),
+    )
+
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name="scores", verbose_name=_("Quiz")
+    )
+
+    sittings = models.PositiveIntegerField(default=0, verbose_name=_("Sittings"))
 
+    score = models.PositiveIntegerField(default=0, verbose_name=_("Score"))
 
-class ProgressManager(models.Manager):
+    possible = models.PositiveIntegerField(default=0, verbose_name=_("Possible score"))
+
+    objects = ScoreManager()
+
+    class Meta:
+        verbose_name = _("Quiz score")
+        verbose_name_plural = _("Quiz scores")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "quiz"], name="unique_user_quiz_score"
+            )
+        ]
+
+    def __str__(self):
+        return "%s - %s" % (self.user, self.quiz)
+
+    @property
+    def percent(self):
+        return int(round(self.score * 100 / self.possible)) if self.possible else 0
+
+
+class ProgressManager(ScoreManager):
     def new_progress(self, user):
-        new_progress = self.create(user=user, score="")
+        new_progress = self.create(user=user)
         new_progress.save()
         return new_progress
 
@@ -23,19 +140,20 @@ class Progress(models.Model):
     Progress is used to track an individual signed in users score on different
     quiz's and categories
 
-    Data stored in csv using the format:
-        category, score, possible, category, score, possible, ...
+    The totals of the completed sittings of the user are stored on the
+    progress record, the scores per category in CategoryScore rows and the
+    scores per quiz in QuizScore rows.
     """
 
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, verbose_name=_("User"), on_delete=models.CASCADE
     )
 
-    score = models.CharField(
-        max_length=1024,
-        verbose_name=_("Score"),
-        validators=[validate_comma_separated_integer_list],
-    )
+    sittings = models.PositiveIntegerField(default=0, verbose_name=_("Sittings"))
+
+    score = models.PositiveIntegerField(default=0, verbose_name=_("Score"))
+
+    possible = models.PositiveIntegerField(default=0, verbose_name=_("Possible score"))
 
     objects = ProgressManager()
 
@@ -43,6 +161,10 @@ class Progress(models.Model):
         verbose_name = _("User Progress")
         verbose_name_plural = _("User progress records")
 
+    @property
+    def percent(self):
+        return int(round(self.score * 100 / self.possible)) if self.possible else 0
+
     @property
     def list_all_cat_scores(self):
         """
@@ -55,50 +177,23 @@ class Progress(models.Model):
 
         The dict will have one key for every category that you have defined
         """
-        score_before = self.score
-        output = {}
-
-        for cat in Category.objects.all():
-            to_find = re.escape(cat.name) + r",(\d+),(\d+),"
-            #  group 1 is score, group 2 is highest possible
-
-            match = re.search(to_find, self.score, re.IGNORECASE)
-
-            if match:
-                score = int(match.group(1))
-                possible = int(match.group(2))
-
-                try:
-                    percent = int(round((float(score) / float(possible)) * 100))
-                except:
-                    percent = 0
-
-                output[cat.name] = [score, possible, percent]
-
-            else:  # if category has not been added yet, add it.
-                self.score += cat.name + ",0,0,"
-                output[cat.name] = [0, 0]
-
-        if len(self.score) > len(score_before):
-            # If a new category has been added, save changes.
-            self.save()
-
-        return output
+        return CategoryScore.objects.user_scores(self.user)
 
     def update_score(self, question, score_to_add=0, possible_to_add=0):
         """
         Pass in question object, amount to increase score
         and max possible.
 
+        The score is added to every category of the question.
+
         Does not return anything.
         """
-        category_test = Category.objects.filter(category=question.category).exists()
-
+        category_ids = list(question.category.values_list("pk", flat=True))
         if any(
             [
                 item is False
                 for item in [
-                    category_test,
+                    len(category_ids) > 0,
                     score_to_add,
                     possible_to_add,
                     isinstance(score_to_add, int),
@@ -108,34 +203,18 @@ class Progress(models.Model):
         ):
             return _("error"), _("category does not exist or invalid score")
 
-        to_find = (
-            re.escape(str(question.category)) + r",(?P<score>\d+),(?P<possible>\d+),"
-        )
-
-        match = re.search(to_find, self.score, re.IGNORECASE)
-
-        if match:
-            updated_score = int(match.group("score")) + abs(score_to_add)
-            updated_possible = int(match.group("possible")) + abs(possible_to_add)
-
-            new_score = ",".join(
-                [str(question.category), str(updated_score), str(updated_possible), ""]
-            )
-
-            # swap old score for the new one
-            self.score = self.score.replace(match.group(), new_score)
-            self.save()
-
-        else:
-            #  if not present but existing, add with the points passed in
-            self.score += ",".join(
-                [str(question.category), str(score_to_add), str(possible_to_add), ""]
+        for category_id in category_ids:
+            CategoryScore.objects.add(
+                self.user,
+                category_id,
+                score=abs(score_to_add),
+                possible=abs(possible_to_add),
             )
-            self.save()
 
     def show_exams(self):
         """
         Finds the previous quizzes marked as 'exam papers'.
-        Returns a queryset of complete exams.
+        Returns a queryset of complete exams, to paginate with
+        app.quiz.pagination.paginate_sittings.
         """
-        return Sitting.objects.filter(user=self.user, complete=True)
+        return self.user.sitting_set.filter(complete=True).select_related("quiz")
@@ -35,6 +35,15 @@ class Question(models.Model):
         verbose_name=_("Explanation"),
     )
 
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name=_("Key"),
+        help_text=_("Natural key of the question, used by the upload_quiz command"),
+    )
+
     created_at = models.DateTimeField(
         auto_now_add=True, help_text=_("Date of creation")
     )
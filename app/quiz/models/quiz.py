@@ -1,5 +1,6 @@
 import re
 
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator
 from django.db import models
@@ -20,6 +21,9 @@ class QuizType:
 
 class Quiz(models.Model):
 
+    # how long the list of question ids of a quiz is kept in the cache
+    QUESTION_IDS_TIMEOUT = 60 * 60 * 24
+
     TYPES = (
         (QuizType.GENERAL, _("General")),
         (QuizType.TOPIC, _("Topic")),
@@ -41,6 +45,7 @@ class Quiz(models.Model):
     url = models.SlugField(
         max_length=60,
         blank=False,
+        unique=True,
         help_text=_("a user friendly url"),
         verbose_name=_("user friendly url"),
     )
@@ -133,12 +138,13 @@ class Quiz(models.Model):
                 {"category": _('A "topic" quiz should have a category')}
             )
 
-    def save(self, force_insert=False, force_update=False, *args, **kwargs):
-        self.url = re.sub(r"\s+", "-", self.url).lower()
+    @staticmethod
+    def clean_url(url: str) -> str:
+        url = re.sub(r"\s+", "-", url).lower()
+        return "".join(letter for letter in url if letter.isalnum() or letter == "-")
 
-        self.url = "".join(
-            letter for letter in self.url if letter.isalnum() or letter == "-"
-        )
+    def save(self, force_insert=False, force_update=False, *args, **kwargs):
+        self.url = self.clean_url(self.url)
 
         if self.single_attempt is True:
             self.exam_paper = True
@@ -159,6 +165,27 @@ class Quiz(models.Model):
     def get_questions(self):
         return self.question_set.all().select_subclasses()
 
+    @staticmethod
+    def question_ids_cache_key(quiz_id) -> str:
+        return "quiz:%s:question_ids" % quiz_id
+
+    def get_question_ids(self) -> list:
+        """Return the ids of the questions of this quiz, in their default order.
+
+        The list is kept in the cache and invalidated by the signals in
+        app.quiz.signals whenever the question set of the quiz changes.
+        """
+        key = self.question_ids_cache_key(self.pk)
+        question_ids = cache.get(key)
+        if question_ids is None:
+            question_ids = list(self.question_set.values_list("id", flat=True))
+            cache.set(key, question_ids, self.QUESTION_IDS_TIMEOUT)
+        return question_ids
+
+    @classmethod
+    def invalidate_question_ids(cls, quiz_ids):
+        cache.delete_many([cls.question_ids_cache_key(quiz_id) for quiz_id in quiz_ids])
+
     @property
     def get_max_score(self):
         return self.get_questions().count()
@@ -1,14 +1,17 @@
-import json
+import random
+import sys
+from array import array
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-from django.core.validators import (
-    validate_comma_separated_integer_list,
-)
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Func, Subquery, Value
+from django.utils.functional import cached_property
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
+from .. import buffer, bundles, grading, rollups, study
+from .history import QuestionHistory
 from .quiz import Quiz
 from .question import Question
 
@@ -22,68 +25,208 @@ class SittingMode:
         return value in [SittingMode.STUDY, SittingMode.EXAM]
 
 
-class SittingManager(models.Manager):
-    def new_sitting(self, user, quiz, mode=SittingMode.STUDY):
-        if quiz.random_order is True:
-            question_set = quiz.question_set.all().select_subclasses().order_by("?")
-        else:
-            question_set = quiz.question_set.all().select_subclasses()
+class SlotStatus:
+    INCORRECT = 0
+    CORRECT = 1
+    UNANSWERED = 2
+
+
+class SittingState:
+    """
+    Decoded view of the question order and user answers of a sitting.
+
+    Question ids are kept in a compact integer array and the status of each
+    question slot in a bytearray (one SlotStatus value per slot), so that the
+    stored representation is decoded once per sitting instance.
+    Slots are numbered from 1, like UserAnswer.order.
+
+    In database, the question ids are packed as little-endian unsigned 32 bits
+    integers and the results as one byte per slot, so that decoding is a
+    plain copy of the buffers.
+    """
+
+    __slots__ = ("question_ids", "results", "dirty")
+
+    def __init__(self, question_ids, results=None):
+        self.question_ids = array("I", question_ids)
+        if results is None:
+            results = bytes([SlotStatus.UNANSWERED]) * len(self.question_ids)
+        self.results = bytearray(results)
+        self.dirty = False
+
+    @classmethod
+    def decode(cls, question_ids, results) -> "SittingState":
+        ids = array("I")
+        ids.frombytes(question_ids)
+        if sys.byteorder == "big":
+            ids.byteswap()
+        return cls(ids, results)
+
+    def encode(self):
+        """Return the (question_ids, results) buffers stored on the sitting"""
+        ids = array("I", self.question_ids)
+        if sys.byteorder == "big":
+            ids.byteswap()
+        return ids.tobytes(), bytes(self.results)
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    def question_id(self, order: int) -> int:
+        return self.question_ids[order - 1]
+
+    def status(self, order: int) -> int:
+        return self.results[order - 1]
+
+    def set_result(self, order: int, is_correct: bool):
+        self.results[int(order) - 1] = (
+            SlotStatus.CORRECT if is_correct else SlotStatus.INCORRECT
+        )
+        self.dirty = True
+
+    def nb_answered(self) -> int:
+        return len(self.results) - self.results.count(SlotStatus.UNANSWERED)
+
+    def nb_correct(self) -> int:
+        return self.results.count(SlotStatus.CORRECT)
+
+    def unanswered(self) -> list:
+        return [
+            i + 1
+            for i, status in enumerate(self.results)
+            if status == SlotStatus.UNANSWERED
+        ]
+
+    def score_list(self) -> list:
+        return [
+            (i + 1, "?" if status == SlotStatus.UNANSWERED else status)
+            for i, status in enumerate(self.results)
+        ]
 
-        if quiz.max_questions and quiz.max_questions < question_set.count():
-            question_set = question_set[: quiz.max_questions]
 
-        if len(question_set) == 0:
+class SetByte(Func):
+    """Binary value with the byte at the given offset (from 0) replaced.
+
+    get_byte and set_byte are native on PostgreSQL, and registered on SQLite
+    connections by app.quiz.signals.
+    """
+
+    function = "set_byte"
+    output_field = models.BinaryField()
+
+
+class SlotScore(Func):
+    """1 if the slot at the given offset of packed results is correct, else 0"""
+
+    template = "CASE WHEN get_byte(%%(expressions)s) = %d THEN 1 ELSE 0 END" % (
+        SlotStatus.CORRECT
+    )
+    output_field = models.IntegerField()
+
+
+def new_seed() -> int:
+    # fits the seed field on every database backend
+    return random.SystemRandom().getrandbits(31)
+
+
+class SittingManager(models.Manager):
+    def new_sitting(self, user, quiz, mode=SittingMode.STUDY, seed=None):
+        """Create a sitting for the given quiz.
+
+        Questions are picked from the cached list of question ids of the quiz,
+        and shuffled in Python with a random generator initialised with
+        ``seed`` when the quiz is in random order. The seed is stored on the
+        sitting, which also draws the order of the answers from it.
+        With settings.QUIZ_ADAPTIVE_STUDY, the questions of study sittings
+        are picked from the question history of the user, see app.quiz.study.
+        """
+        question_ids = quiz.get_question_ids()
+
+        if len(question_ids) == 0:
             raise ImproperlyConfigured(
                 "This quiz does not contain any question. "
                 "Please configure questions properly"
             )
 
-        question_ids = [item.id for item in question_set]
-        questions = ",".join(map(str, question_ids)) + ","
+        nb_questions = len(question_ids)
+        if quiz.max_questions and quiz.max_questions < nb_questions:
+            nb_questions = quiz.max_questions
 
-        user_progress = {order: "?" for order in range(1, len(question_ids) + 1)}
+        if seed is None:
+            seed = new_seed()
+
+        if mode == SittingMode.STUDY and settings.QUIZ_ADAPTIVE_STUDY:
+            if quiz.random_order is True:
+                question_ids = random.Random(seed).sample(
+                    question_ids, len(question_ids)
+                )
+            question_ids = study.select_questions(user, question_ids, nb_questions)
+        elif quiz.random_order is True:
+            question_ids = random.Random(seed).sample(question_ids, nb_questions)
+        else:
+            question_ids = question_ids[:nb_questions]
+
+        state = SittingState(question_ids)
+        packed_ids, results = state.encode()
 
         new_sitting = self.create(
             user=user,
             quiz=quiz,
             mode=mode,
-            question_order=questions,
-            # question_list=questions,
-            # incorrect_questions="",
+            question_ids=packed_ids,
             current_score=0,
             complete=False,
-            user_answers=json.dumps(user_progress),
+            results=results,
+            seed=seed,
         )
+        new_sitting.state = state
+
+        if settings.QUIZ_LAZY_USER_ANSWERS:
+            # answers are created when the user answers each question
+            return new_sitting
 
         # generate default user answers
         UserAnswer.objects.bulk_create(
             [
                 UserAnswer(
-                    question=question, user=user, sitting=new_sitting, order=i + 1
+                    question_id=question_id,
+                    user=user,
+                    sitting=new_sitting,
+                    order=i + 1,
                 )
-                for i, question in enumerate(question_set)
+                for i, question_id in enumerate(question_ids)
             ]
         )
 
         return new_sitting
 
     def user_sitting(self, user, quiz, mode=SittingMode.STUDY):
-        """Retrieve an existing sitting for the current quiz
-        or start a new one
+        """Retrieve the open sitting of the user for the quiz or start a new one.
+
+        The open sitting, or the completed one that forbids a new attempt at a
+        single attempt quiz, is read with a single query. A user has at most
+        one open sitting per quiz and mode: when concurrent requests both
+        start one, the insert of the second fails on the unique_open_sitting
+        constraint and the sitting of the first is returned.
+
+        Returns:
+            Sitting, or False if the user already completed a single attempt
+            quiz
+
         """
-        if (
-            quiz.single_attempt is True
-            and self.filter(user=user, quiz=quiz, mode=mode, complete=True).exists()
-        ):
-            return False
+        sittings = self.filter(user=user, quiz=quiz, mode=mode)
+        if not quiz.single_attempt:
+            sittings = sittings.filter(complete=False)
+        # a completed sitting comes first
+        sitting = sittings.order_by("-complete").first()
+        if sitting is not None:
+            return False if sitting.complete else sitting
 
         try:
-            sitting = self.get(user=user, quiz=quiz, mode=mode, complete=False)
-        except Sitting.DoesNotExist:
-            sitting = self.new_sitting(user, quiz, mode=mode)
-        except Sitting.MultipleObjectsReturned:
-            sitting = self.filter(user=user, quiz=quiz, mode=mode, complete=False)[0]
-        return sitting
+            with transaction.atomic():
+                return self.new_sitting(user, quiz, mode=mode)
+        except IntegrityError:
+            return self.get(user=user, quiz=quiz, mode=mode, complete=False)
 
 
 class Sitting(models.Model):
@@ -91,16 +234,13 @@ class Sitting(models.Model):
     Used to store the progress of logged in users sitting a quiz.
     Replaces the session system used by anon users.
 
-    Question_order is a list of integer pks of all the questions in the
-    quiz, in order.
-
-    Question_list is a list of integers which represent id's of
-    the unanswered questions in csv format.
+    Question_ids is the packed list of integer pks of all the questions in
+    the sitting, in order.
 
-    Sitting deleted when quiz finished unless quiz.exam_paper is true.
+    Results stores one byte per question of the sitting, with the SlotStatus
+    of the question: unanswered, correct or incorrect.
 
-    User_answers is a json object in which the question order id is stored
-    with 0 or 1 based on the fact that the user was correct or not
+    See SittingState for the decoded representation of both fields.
     """
 
     MODES = ((SittingMode.STUDY, _("Study")), (SittingMode.EXAM, _("Exam")))
@@ -115,24 +255,7 @@ class Sitting(models.Model):
         _("Mode"), max_length=10, choices=MODES, default=SittingMode.STUDY
     )
 
-    question_order = models.CharField(
-        max_length=1024,
-        verbose_name=_("Question Order"),
-        validators=[validate_comma_separated_integer_list],
-    )
-
-    # question_list = models.CharField(
-    #     max_length=1024,
-    #     verbose_name=_("Question List"),
-    #     validators=[validate_comma_separated_integer_list],
-    # )
-
-    # incorrect_questions = models.CharField(
-    #     max_length=1024,
-    #     blank=True,
-    #     verbose_name=_("Incorrect questions"),
-    #     validators=[validate_comma_separated_integer_list],
-    # )
+    question_ids = models.BinaryField(default=bytes, verbose_name=_("Question Order"))
 
     current_score = models.IntegerField(verbose_name=_("Current Score"))
 
@@ -140,18 +263,96 @@ class Sitting(models.Model):
         default=False, blank=False, verbose_name=_("Complete")
     )
 
-    user_answers = models.TextField(
-        blank=True, default="{}", verbose_name=_("User Answers")
-    )
+    results = models.BinaryField(default=bytes, verbose_name=_("User Answers"))
 
     start = models.DateTimeField(auto_now_add=True, verbose_name=_("Start"))
 
     end = models.DateTimeField(null=True, blank=True, verbose_name=_("End"))
 
+    percent = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Percent correct"),
+        help_text=_("Stored when the sitting is completed"),
+    )
+
+    seed = models.PositiveIntegerField(default=new_seed, verbose_name=_("Seed"))
+
+    archived = models.BooleanField(
+        default=False,
+        verbose_name=_("Archived"),
+        help_text=_("The answers of the user are in the sitting archive"),
+    )
+
     objects = SittingManager()
 
     class Meta:
         permissions = (("view_sittings", _("Can see completed exams.")),)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "quiz", "mode"],
+                condition=models.Q(complete=False),
+                name="unique_open_sitting",
+            )
+        ]
+        indexes = [
+            # lookup of the open sitting of a user in SittingManager.user_sitting
+            models.Index(
+                fields=["user", "quiz", "mode", "complete"],
+                name="quiz_sitting_user_quiz_idx",
+            ),
+            # keyset pagination of the completed sittings, see app.quiz.pagination
+            models.Index(
+                fields=["user", "complete", "-end", "-id"],
+                name="quiz_sitting_user_end_idx",
+            ),
+            models.Index(
+                fields=["complete", "-end", "-id"], name="quiz_sitting_end_idx"
+            ),
+        ]
+
+    @cached_property
+    def state(self) -> SittingState:
+        """Question order and user answers, decoded once per instance.
+
+        Answers waiting in the write-behind buffer are applied on top of the
+        stored ones, and the score is computed from the resulting state.
+        """
+        state = SittingState.decode(self.question_ids, self.results)
+        if self.buffered_answers:
+            for order, (answer, is_correct) in self.buffered_answers.items():
+                state.set_result(order, is_correct)
+            self.current_score = state.nb_correct()
+        return state
+
+    @cached_property
+    def buffered_answers(self) -> dict:
+        """Answers of the user not written to the database yet, as
+        (answer, is_correct) tuples indexed by question order"""
+        if not settings.QUIZ_ANSWER_BUFFER or self.pk is None or self.complete:
+            return {}
+        return buffer.get_answers(self.pk)
+
+    @cached_property
+    def archived_answers(self) -> dict:
+        """Answers of the user read from the sitting archive, as
+        (answer, is_correct) tuples indexed by question order"""
+        if not self.archived:
+            return {}
+        return self.archive.get_answers()
+
+    def save(self, *args, **kwargs):
+        state = self.__dict__.get("state")
+        if state is not None and state.dirty:
+            self.question_ids, self.results = state.encode()
+            state.dirty = False
+        super().save(*args, **kwargs)
+
+    def refresh_from_db(self, *args, **kwargs):
+        self.__dict__.pop("state", None)
+        self.__dict__.pop("buffered_answers", None)
+        self.__dict__.pop("archived_answers", None)
+        super().refresh_from_db(*args, **kwargs)
 
     def add_to_score(self, points):
         self.current_score += int(points)
@@ -160,13 +361,15 @@ class Sitting(models.Model):
     def get_current_score(self):
         return self.current_score
 
-    def _question_ids(self):
-        return [int(n) for n in self.question_order.split(",") if n]
+    def get_question_ids(self) -> list:
+        return self.state.question_ids.tolist()
 
     @property
     def get_percent_correct(self):
+        if self.complete and self.percent is not None:
+            return self.percent
         dividend = float(self.current_score)
-        divisor = len(self._question_ids())
+        divisor = len(self.state)
         if divisor < 1:
             return 0  # prevent divide by zero error
 
@@ -181,8 +384,22 @@ class Sitting(models.Model):
             return 0
 
     def mark_quiz_complete(self):
+        """Complete the sitting and add its results to the rollups of the user.
+
+        The sitting is flagged as complete in the database right away, with
+        its percentage of correct answers, and only the request that flags it
+        applies the rollups, so that they count every sitting once. The
+        sitting must be saved by the caller.
+        """
+        self.flush_answers()
+        self.percent = self.get_percent_correct
         self.complete = True
         self.end = now()
+        completed = Sitting.objects.filter(pk=self.pk, complete=False).update(
+            complete=True, end=self.end, percent=self.percent
+        )
+        if completed:
+            rollups.add_sitting(self)
 
     # def add_incorrect_question(self, question):
     #     """
@@ -223,9 +440,7 @@ class Sitting(models.Model):
             return self.quiz.fail_text
 
     def add_user_progress(self, question_order, is_correct):
-        current = json.loads(self.user_answers)
-        current[question_order] = 1 if is_correct else 0
-        self.user_answers = json.dumps(current)
+        self.state.set_result(question_order, is_correct)
 
     # def get_questions(self, with_answers=False):
     #     question_ids = self._question_ids()
@@ -247,21 +462,318 @@ class Sitting(models.Model):
 
     @property
     def get_max_score(self):
-        return len(self._question_ids())
+        return len(self.state)
 
     def progress(self):
         """
         Returns the number of questions answered so far and the total number of
         questions.
         """
-        answers = json.loads(self.user_answers)
-        answered = len([i for i, answer in answers.items() if answer != "?"])
-        print("Answered: ", answered)
-        total = self.get_max_score
-        return answered, total
+        return self.state.nb_answered(), len(self.state)
 
     def get_nb_questions(self) -> int:
-        return len(self._question_ids())
+        return len(self.state)
+
+    def submit_answers(self, answers: dict):
+        """Record the answers of the user to several questions at once.
+
+        Answers are graded in one pass, user answers are written with one
+        bulk update (and one bulk insert for the ones not created yet), and
+        the sitting is saved once, marked as complete if all the questions
+        are answered. The row of the sitting is locked and its results read
+        again before they are updated, so that the answers recorded
+        concurrently by record_answer are kept.
+
+        Args:
+            answers (dict): answer of the user indexed by question order
+
+        """
+        question_ids = {order: self.state.question_id(order) for order in answers}
+        results = grading.check_many(
+            {question_ids[order]: answer for order, answer in answers.items()}
+        )
+        with transaction.atomic():
+            self.results, self.current_score = (
+                Sitting.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values_list("results", "current_score")
+                .get()
+            )
+            self.__dict__.pop("state", None)
+            self.write_answers(
+                {
+                    order: (answer, results[question_ids[order]])
+                    for order, answer in answers.items()
+                }
+            )
+
+            self.current_score = self.state.nb_correct()
+            update_fields = ["results", "current_score"]
+            if self.state.nb_answered() == len(self.state):
+                self.mark_quiz_complete()
+                update_fields += ["complete", "end", "percent"]
+            self.save(update_fields=update_fields)
+
+    def write_answers(self, answers: dict):
+        """Write graded answers to the UserAnswer rows of the sitting, along
+        with the answers waiting in the write-behind buffer.
+
+        The user answers are written with one bulk update, plus one bulk
+        insert for the ones not created yet. The results of the sitting are
+        updated in memory, the sitting must be saved by the caller.
+        With settings.QUIZ_ADAPTIVE_STUDY, the first answers to the questions
+        are added to the question history of the user.
+
+        Args:
+            answers (dict): (answer, is_correct) tuples indexed by question order
+
+        """
+        buffered_answers = self.buffered_answers
+        answers = {**buffered_answers, **answers}
+        if not answers:
+            return
+
+        user_answers = {
+            user_answer.order: user_answer
+            for user_answer in self.answers.filter(order__in=list(answers))
+        }
+        # the first answers to each question, from the stored results
+        stored = SittingState.decode(self.question_ids, self.results)
+        history = {}
+        new_answers = []
+        for order, (answer, is_correct) in answers.items():
+            if stored.status(order) == SlotStatus.UNANSWERED:
+                history[stored.question_id(order)] = is_correct
+            self.state.set_result(order, is_correct)
+            user_answer = user_answers.get(order)
+            if user_answer is None:
+                new_answers.append(
+                    UserAnswer(
+                        sitting=self,
+                        user_id=self.user_id,
+                        order=order,
+                        question_id=self.state.question_id(order),
+                        answer=answer,
+                        is_correct=is_correct,
+                    )
+                )
+            else:
+                user_answer.answer = answer
+                user_answer.is_correct = is_correct
+
+        UserAnswer.objects.bulk_update(
+            user_answers.values(), ["answer", "is_correct"], batch_size=500
+        )
+        UserAnswer.objects.bulk_create(new_answers, batch_size=500)
+        if settings.QUIZ_ADAPTIVE_STUDY:
+            QuestionHistory.objects.record(self.user_id, history)
+
+        if buffered_answers:
+            buffer.discard_answers(self.pk, buffered_answers)
+            self.buffered_answers = {}
+
+    def answer_question(self, user_answer: "UserAnswer", is_correct: bool):
+        """Record the answer of the user to a question, in the write-behind
+        buffer when it is enabled, and complete study sittings once all the
+        questions are answered"""
+        if settings.QUIZ_ANSWER_BUFFER:
+            user_answer.is_correct = is_correct
+            self.buffer_answer(user_answer.order, user_answer.answer, is_correct)
+            # the buffered answers are flushed with the sitting
+            update_fields = None
+        else:
+            self.record_answer(user_answer, is_correct)
+            update_fields = ["complete", "end"]
+
+        answered, total = self.progress()
+        if self.mode == SittingMode.STUDY and answered == total:
+            self.mark_quiz_complete()
+            self.save(update_fields=update_fields)
+
+    def record_answer(self, user_answer: "UserAnswer", is_correct: bool):
+        """Save the answer of the user and update the results and the score of
+        the sitting.
+
+        The sitting is updated by a single UPDATE statement computed by the
+        database from the current row, instead of saving the values computed
+        in Python, so that concurrent answers to the same sitting are neither
+        lost nor counted twice. The results and the score are then reloaded.
+        """
+        if settings.QUIZ_ADAPTIVE_STUDY and (
+            self.state.status(user_answer.order) == SlotStatus.UNANSWERED
+        ):
+            QuestionHistory.objects.record(
+                self.user_id, {user_answer.question_id: is_correct}
+            )
+
+        user_answer.is_correct = is_correct
+        if user_answer._state.adding:
+            try:
+                with transaction.atomic():
+                    user_answer.save()
+            except IntegrityError:
+                # created by a concurrent request since it was loaded
+                user_answer._state.adding = False
+        if not user_answer._state.adding:
+            UserAnswer.objects.filter(sitting=self, order=user_answer.order).update(
+                answer=user_answer.answer, is_correct=is_correct
+            )
+
+        offset = Value(user_answer.order - 1)
+        status = SlotStatus.CORRECT if is_correct else SlotStatus.INCORRECT
+        Sitting.objects.filter(pk=self.pk).update(
+            results=SetByte("results", offset, Value(status)),
+            current_score=F("current_score")
+            + int(is_correct)
+            - SlotScore("results", offset),
+        )
+        self.results, self.current_score = (
+            Sitting.objects.filter(pk=self.pk)
+            .values_list("results", "current_score")
+            .get()
+        )
+        self.__dict__.pop("state", None)
+
+    def buffer_answer(self, question_order: int, answer, is_correct: bool):
+        """Record the answer of the user in the write-behind buffer, it is
+        written to the database when the buffer is flushed"""
+        buffer.add_answer(self.pk, question_order, answer, is_correct)
+        self.buffered_answers[question_order] = (answer, is_correct)
+        self.state.set_result(question_order, is_correct)
+        self.current_score = self.state.nb_correct()
+
+    def flush_answers(self) -> bool:
+        """Write the buffered answers to the database and save the results and
+        the score of the sitting.
+
+        The row of the sitting is locked and read again first, along with the
+        buffer, so that concurrent flushes, such as the flush_sitting_buffers
+        command, write each buffered answer once over the current results.
+
+        Returns:
+            bool: False if the sitting was completed or deleted since it was read
+
+        """
+        if not self.buffered_answers:
+            return True
+        with transaction.atomic():
+            row = (
+                Sitting.objects.select_for_update()
+                .filter(pk=self.pk, complete=False)
+                .values_list("results", "current_score")
+                .first()
+            )
+            if row is None:
+                return False
+            self.results, self.current_score = row
+            self.__dict__.pop("state", None)
+            self.__dict__.pop("buffered_answers", None)
+            if self.buffered_answers:
+                self.write_answers({})
+                self.current_score = self.state.nb_correct()
+                self.save(update_fields=["results", "current_score"])
+        return True
+
+    def get_answer_seed(self, question_id: int) -> int:
+        """Return the seed of the order of the answers to the given question,
+        so that the answers are shown in the same order on every request"""
+        return (self.seed << 32) | question_id
+
+    def get_user_answer(self, question_order: int) -> "UserAnswer":
+        """Return the answer of the user to the question at the given order.
+
+        If the answer was not created yet, an unsaved UserAnswer is returned,
+        so that it is only written to the database once the user answers.
+        The answers of archived sittings are rebuilt from the archive.
+        """
+        try:
+            if self.archived:
+                raise UserAnswer.DoesNotExist
+            user_answer = self.answers.get(order=question_order)
+        except UserAnswer.DoesNotExist:
+            user_answer = UserAnswer(
+                sitting=self,
+                user_id=self.user_id,
+                order=question_order,
+                question_id=self.state.question_id(question_order),
+            )
+        return self._apply_detached_answer(user_answer)
+
+    def get_saved_answers(self) -> dict:
+        """Return the answers of the user indexed by question order, including
+        the ones waiting in the write-behind buffer or in the archive"""
+        if self.archived:
+            answers = {}
+        else:
+            answers = dict(
+                self.answers.exclude(answer=None).values_list("order", "answer")
+            )
+        for order, (answer, is_correct) in self.detached_answers.items():
+            if answer is not None:
+                answers[order] = answer
+        return answers
+
+    @property
+    def detached_answers(self) -> dict:
+        """Answers of the user kept outside of the UserAnswer table"""
+        if self.archived:
+            return self.archived_answers
+        return self.buffered_answers
+
+    def _apply_detached_answer(self, user_answer: "UserAnswer") -> "UserAnswer":
+        if user_answer.order in self.detached_answers:
+            user_answer.answer, user_answer.is_correct = self.detached_answers[
+                user_answer.order
+            ]
+        return user_answer
+
+    def get_question(self, question_order: int):
+        """Return the question at the given order and the answer of the user.
+
+        The question is read from the question bundle cache. On a cache miss,
+        the question subclass and the user answer are fetched in a single
+        query and the question is added to the cache. As for get_user_answer,
+        the user answer is not saved in database if the question was not
+        answered yet.
+
+        Returns:
+            tuple: (question, user_answer)
+
+        """
+        question_id = self.state.question_id(question_order)
+        question = bundles.get_cached_question(question_id)
+        if question is not None:
+            user_answer = self.get_user_answer(question_order)
+            user_answer.question = question
+            return question, user_answer
+
+        user_answers = UserAnswer.objects.filter(sitting=self, order=question_order)
+        question = (
+            Question.objects.filter(pk=question_id)
+            .annotate(
+                user_answer_id=Subquery(user_answers.values("pk")[:1]),
+                user_answer_value=Subquery(user_answers.values("answer")[:1]),
+                user_answer_is_correct=Subquery(user_answers.values("is_correct")[:1]),
+            )
+            .select_subclasses()
+            .get()
+        )
+        bundles.cache_question(question)
+
+        user_answer = UserAnswer(
+            pk=question.user_answer_id,
+            sitting=self,
+            user_id=self.user_id,
+            order=question_order,
+            question=question,
+            answer=question.user_answer_value,
+            is_correct=question.user_answer_is_correct,
+        )
+        user_answer._state.adding = question.user_answer_id is None
+        return question, self._apply_detached_answer(user_answer)
+
+    def has_question(self, question_order: int) -> bool:
+        return 1 <= question_order <= len(self.state)
 
     def get_unanswered_questions(self) -> list:
         """Return the list of unanswered questions
@@ -270,9 +782,7 @@ class Sitting(models.Model):
             list: all question order ids that don't have an answer
 
         """
-        answers = json.loads(self.user_answers)
-        unanswered = [i for i, answer in answers.items() if answer == "?"]
-        return unanswered
+        return self.state.unanswered()
 
     def get_nb_unanswered_questions(self) -> int:
         """Get the number of unanswered questions
@@ -281,14 +791,12 @@ class Sitting(models.Model):
             int: number of unanswered questions
 
         """
-        unanswered = self.get_unanswered_questions()
-        return len(unanswered)
+        return len(self.state) - self.state.nb_answered()
 
     def get_score_list(self) -> list:
         """Return a list of 0,1,? based on the fact that
         user answers are correct or not"""
-        answers = json.loads(self.user_answers)
-        return [(i, answer) for i, answer in answers.items()]
+        return self.state.score_list()
 
 
 class UserAnswer(models.Model):
@@ -331,3 +839,10 @@ class UserAnswer(models.Model):
     is_correct = models.BooleanField(
         verbose_name=_("Is correct"), null=True, default=None
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sitting", "order"], name="unique_sitting_answer_order"
+            )
+        ]
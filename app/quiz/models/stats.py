@@ -0,0 +1,47 @@
+import json
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from .question import Question
+
+
+class QuestionStats(models.Model):
+    """
+    Item analysis of a question, computed from the answers of the users by
+    the analyse_questions management command.
+
+    The p-value is the proportion of correct answers, the discrimination the
+    point-biserial correlation between the result of the users at the
+    question and at the other questions they answered.
+    Selection rates are stored as JSON: the proportion of the answers to the
+    question that selected each answer choice, indexed by answer id.
+    """
+
+    question = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name=_("Question"),
+    )
+
+    responses = models.PositiveIntegerField(default=0, verbose_name=_("Responses"))
+
+    p_value = models.FloatField(null=True, verbose_name=_("P-value"))
+
+    discrimination = models.FloatField(null=True, verbose_name=_("Discrimination"))
+
+    selection_rates = models.TextField(default="{}", verbose_name=_("Selection rates"))
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated"))
+
+    class Meta:
+        verbose_name = _("Question statistics")
+        verbose_name_plural = _("Question statistics")
+
+    def get_selection_rates(self) -> dict:
+        return {
+            int(answer_id): rate
+            for answer_id, rate in json.loads(self.selection_rates).items()
+        }
@@ -27,13 +27,13 @@ class TFQuestion(Question):
         else:
             return False
 
-    def get_answers(self):
+    def get_answers(self, seed=None):
         return [
             {"correct": self.check_if_correct("True"), "content": "True"},
             {"correct": self.check_if_correct("False"), "content": "False"},
         ]
 
-    def get_answers_list(self):
+    def get_answers_list(self, seed=None):
         return [(True, True), (False, False)]
 
     def answer_choice_to_string(self, guess):
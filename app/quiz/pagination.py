@@ -0,0 +1,108 @@
+"""
+Keyset pagination of completed sittings, newest first.
+
+Pages are ordered by (end, id) descending and located with a cursor made of
+the end time and the id of a sitting, so that reading any page is a single
+indexed range query instead of an OFFSET over all the previous sittings.
+A page is requested with the ``after`` cursor of the last sitting of the
+previous page, or the ``before`` cursor of the first sitting of the next one.
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+PAGE_SIZE = 20
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(sitting) -> str:
+    microseconds = (sitting.end - EPOCH) // timedelta(microseconds=1)
+    return "%d_%d" % (microseconds, sitting.pk)
+
+
+def decode_cursor(cursor: str):
+    """Return the (end, id) of a cursor, or None if it is invalid"""
+    try:
+        microseconds, pk = (int(value) for value in cursor.split("_"))
+        return EPOCH + timedelta(microseconds=microseconds), pk
+    except (ValueError, OverflowError):
+        return None
+
+
+class SittingPage:
+    """Page of sittings, with the cursors of the previous and next pages"""
+
+    def __init__(self, object_list, has_previous, has_next):
+        self.object_list = object_list
+        self.has_previous = has_previous
+        self.has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_previous or self.has_next
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return encode_cursor(self.object_list[0])
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return encode_cursor(self.object_list[-1])
+
+
+def paginate_sittings(queryset, after=None, before=None, page_size=PAGE_SIZE):
+    """Read one page of completed sittings, newest first.
+
+    Args:
+        queryset (QuerySet): completed sittings to paginate
+        after (str): cursor of the sitting preceding the page
+        before (str): cursor of the sitting following the page, ignored
+            when after is given
+
+    Returns:
+        SittingPage: the sittings of the page, read with a single query
+
+    """
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before and not after else None
+    queryset = queryset.filter(end__isnull=False)
+
+    if before is not None:
+        end, pk = before
+        rows = list(
+            queryset.filter(Q(end__gt=end) | Q(end=end, pk__gt=pk)).order_by(
+                "end", "pk"
+            )[: page_size + 1]
+        )
+        has_previous = len(rows) > page_size
+        return SittingPage(rows[:page_size][::-1], has_previous, True)
+
+    if after is not None:
+        end, pk = after
+        queryset = queryset.filter(Q(end__lt=end) | Q(end=end, pk__lt=pk))
+    rows = list(queryset.order_by("-end", "-pk")[: page_size + 1])
+    return SittingPage(rows[:page_size], after is not None, len(rows) > page_size)
+
+
+class SittingPaginationMixin:
+    """Paginate the sittings of a ListView with paginate_sittings, the page
+    is in the ``page_obj`` context variable"""
+
+    paginate_by = PAGE_SIZE
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate_sittings(
+            queryset,
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+            page_size=page_size,
+        )
+        return None, page, page.object_list, page.has_other_pages()
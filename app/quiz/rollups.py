@@ -0,0 +1,48 @@
+"""
+Rollups of the results of the users, updated when a sitting is completed.
+
+The results of a completed sitting are added once to the totals of the user
+on its Progress record, to its CategoryScore rows and to its QuizScore row
+for the quiz, so that the progress pages only read precomputed rows.
+The leaderboards of app.quiz.leaderboards are updated at the same time.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+
+from . import leaderboards
+from .models.progress import CategoryScore, Progress, QuizScore
+
+
+def add_sitting(sitting):
+    """Add the results of a completed sitting to the rollups of its user.
+
+    The answers of the sitting are aggregated by category in one query, and
+    every rollup row is incremented in the database.
+    """
+    categories = (
+        sitting.answers.values_list("question__category")
+        .annotate(score=Count("pk", filter=Q(is_correct=True)), possible=Count("pk"))
+        .order_by()
+    )
+    category_scores = {}
+    for category_id, score, possible in categories:
+        if category_id is not None:
+            CategoryScore.objects.increment(
+                {"user_id": sitting.user_id, "category_id": category_id},
+                score=score,
+                possible=possible,
+            )
+            category_scores[category_id] = score
+
+    totals = {
+        "sittings": 1,
+        "score": sitting.current_score,
+        "possible": sitting.get_max_score,
+    }
+    QuizScore.objects.increment(
+        {"user_id": sitting.user_id, "quiz_id": sitting.quiz_id}, **totals
+    )
+    Progress.objects.increment({"user_id": sitting.user_id}, **totals)
+
+    if settings.QUIZ_LEADERBOARDS:
+        leaderboards.add_sitting(sitting, category_scores)
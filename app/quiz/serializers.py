@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 
 from app.quiz.models import (
@@ -16,90 +17,132 @@ from app.quiz.models import (
 # ---------------------------------------------------
 
 
+def prefetch_questions(questions: list):
+    """Prefetch the categories, quizzes and answers of a list of question
+    subclasses, in one query per relation, into the lists read by the
+    question serializers.
+
+    Lists are cheaper than the prefetch cache of the related managers, which
+    builds a queryset per question. Questions that already have their lists
+    are skipped.
+    """
+    questions = [
+        question for question in questions if not hasattr(question, "category_list")
+    ]
+    prefetch_related_objects(
+        questions,
+        Prefetch("category", to_attr="category_list"),
+        Prefetch("quiz", queryset=Quiz.objects.only("pk"), to_attr="quiz_list"),
+    )
+    prefetch_related_objects(
+        [question for question in questions if isinstance(question, MCQuestion)],
+        Prefetch("answer_set", to_attr="answer_list"),
+    )
+
+
 class AnswerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Answer
         fields = ("id", "content", "correct")
 
 
-class MCQuestionSerializer(serializers.ModelSerializer):
+class BaseQuestionSerializer(serializers.ModelSerializer):
+    """Fields common to all the question types, read from the lists set by
+    prefetch_questions"""
 
-    category = serializers.CharField(source="category.name")
+    category = serializers.SlugRelatedField(
+        slug_field="name", many=True, read_only=True, source="category_list"
+    )
 
-    answers = AnswerSerializer(source="answer_set", many=True)
+    quiz = serializers.PrimaryKeyRelatedField(
+        many=True, read_only=True, source="quiz_list"
+    )
 
     type = serializers.ReadOnlyField()
 
-    class Meta:
-        model = MCQuestion
-        fields = "__all__"
+    def to_representation(self, instance):
+        prefetch_questions([instance])
+        return super().to_representation(instance)
 
 
-class OpenQuestionSerializer(serializers.ModelSerializer):
+class MCQuestionSerializer(BaseQuestionSerializer):
 
-    category = serializers.CharField(source="category.name")
-
-    type = serializers.ReadOnlyField()
+    answers = AnswerSerializer(source="answer_list", many=True, read_only=True)
 
     class Meta:
-        model = OpenQuestion
+        model = MCQuestion
         fields = "__all__"
 
 
-class TFQuestionSerializer(serializers.ModelSerializer):
-
-    category = serializers.CharField(source="category.name")
+class OpenQuestionSerializer(BaseQuestionSerializer):
+    class Meta:
+        model = OpenQuestion
+        fields = "__all__"
 
-    type = serializers.ReadOnlyField()
 
+class TFQuestionSerializer(BaseQuestionSerializer):
     class Meta:
         model = TFQuestion
         fields = "__all__"
 
 
 class QuestionListSerializer(serializers.ListSerializer):
-
-    category = serializers.CharField(source="category.name")
-
-    type = serializers.ReadOnlyField()
-
     def to_representation(self, data):
         """
         List of object instances -> List of dicts of primitive datatypes.
 
 
-        Overwrite default function to select question subclasses
+        Overwrite default function to select question subclasses, unless
+        they were prefetched with the instance, and to prefetch the
+        relations of all the questions at once
         """
         # Dealing with nested relationships, data can be a Manager,
         # so, first get a queryset from the Manager if needed
-        iterable = (
-            data.all().select_subclasses() if isinstance(data, models.Manager) else data
-        )
-
-        return [self.child.to_representation(item) for item in iterable]
-
-
-class QuestionSerializer(serializers.ModelSerializer):
-    """Generic question serializer"""
-
-    category = serializers.CharField(source="category.name")
-
-    type = serializers.ReadOnlyField()
+        iterable = data
+        if isinstance(data, models.Manager):
+            prefetched = getattr(data.instance, "_prefetched_objects_cache", {})
+            if data.prefetch_cache_name in prefetched:
+                iterable = data.all()
+            else:
+                iterable = data.all().select_subclasses()
+
+        questions = list(iterable)
+        prefetch_questions(questions)
+        return [self.child.to_representation(item) for item in questions]
+
+
+class QuestionSerializer(BaseQuestionSerializer):
+    """Generic question serializer, serializing each question with the
+    serializer of its type"""
+
+    # serializers of the question subclasses
+    serializer_classes = {
+        MCQuestion: MCQuestionSerializer,
+        OpenQuestion: OpenQuestionSerializer,
+        TFQuestion: TFQuestionSerializer,
+    }
 
     class Meta:
         model = Question
         fields = "__all__"
         list_serializer_class = QuestionListSerializer
 
+    def get_child_serializer(self, model):
+        """Serializer of a question subclass, built once: building the
+        fields of a serializer costs more than serializing a question"""
+        if not hasattr(self, "_child_serializers"):
+            self._child_serializers = {}
+        if model not in self._child_serializers:
+            self._child_serializers[model] = self.serializer_classes[model](
+                context=self.context
+            )
+        return self._child_serializers[model]
+
     def to_representation(self, instance):
-        if isinstance(instance, MCQuestion):
-            return MCQuestionSerializer(instance=instance).data
-        elif isinstance(instance, OpenQuestion):
-            return OpenQuestionSerializer(instance=instance).data
-        elif isinstance(instance, TFQuestion):
-            return TFQuestionSerializer(instance=instance).data
-        else:
-            return super().to_representation(instance)
+        if type(instance) in self.serializer_classes:
+            serializer = self.get_child_serializer(type(instance))
+            return serializer.to_representation(instance)
+        return super().to_representation(instance)
 
 
 # ---------------------------------------------------
@@ -109,7 +152,7 @@ class QuestionSerializer(serializers.ModelSerializer):
 
 class QuizSerializer(serializers.ModelSerializer):
 
-    category = serializers.CharField(source="category.name")
+    category = serializers.SlugRelatedField(slug_field="name", read_only=True)
 
     questions = QuestionSerializer(source="question_set", many=True)
 
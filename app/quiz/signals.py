@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from . import bundles
+from .models import Answer, Question, Quiz
+
+
+def invalidate_question_ids(quiz_ids):
+    """Drop the cached question ids of the given quizzes, now and once the
+    current transaction is committed so that no stale list survives it"""
+    quiz_ids = list(quiz_ids)
+    if not quiz_ids:
+        return
+    Quiz.invalidate_question_ids(quiz_ids)
+    transaction.on_commit(lambda: Quiz.invalidate_question_ids(quiz_ids))
+
+
+def invalidate_question_bundles(question_ids):
+    """Drop the cached bundles of the given questions, now and on commit"""
+    question_ids = list(question_ids)
+    bundles.invalidate_questions(question_ids)
+    transaction.on_commit(lambda: bundles.invalidate_questions(question_ids))
+
+
+@receiver(m2m_changed, sender=Question.quiz.through)
+def question_quiz_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Questions were added to or removed from a quiz"""
+    if action not in ("post_add", "post_remove", "pre_clear", "post_clear"):
+        return
+
+    if reverse:
+        # quiz.question_set was modified
+        invalidate_question_ids([instance.pk])
+    elif action == "pre_clear":
+        invalidate_question_ids(instance.quiz.values_list("id", flat=True))
+    elif pk_set:
+        invalidate_question_ids(pk_set)
+
+
+def question_saved(sender, instance, created, **kwargs):
+    invalidate_question_bundles([instance.pk])
+    if not created:
+        # question order follows the question content, so an update can change it
+        invalidate_question_ids(instance.quiz.values_list("id", flat=True))
+
+
+def question_deleted(sender, instance, **kwargs):
+    invalidate_question_ids(instance.quiz.values_list("id", flat=True))
+
+
+def question_removed(sender, instance, **kwargs):
+    invalidate_question_bundles([instance.pk])
+
+
+# connected to each question model rather than to every sender, so that the
+# other models, such as UserAnswer, keep fast bulk deletes
+for question_model in bundles.QUESTION_TYPES.values():
+    post_save.connect(question_saved, sender=question_model)
+    pre_delete.connect(question_deleted, sender=question_model)
+    post_delete.connect(question_removed, sender=question_model)
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    """Answers are part of the question bundle: move the updated_at date of
+    the question forward so that its bundle gets a new key"""
+    Question.objects.filter(pk=instance.question_id).update(updated_at=now())
+    invalidate_question_bundles([instance.question_id])
+
+
+def get_byte(value, offset):
+    return value[offset]
+
+
+def set_byte(value, offset, new_value):
+    value = bytearray(value)
+    value[offset] = new_value
+    return bytes(value)
+
+
+@receiver(connection_created)
+def register_byte_functions(sender, connection, **kwargs):
+    """Provide the PostgreSQL get_byte and set_byte functions on SQLite, used
+    to update the results of sittings in place"""
+    if connection.vendor == "sqlite":
+        connection.connection.create_function("get_byte", 2, get_byte)
+        connection.connection.create_function("set_byte", 3, set_byte)
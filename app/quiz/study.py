@@ -0,0 +1,75 @@
+"""
+Spaced repetition selection of the questions of study sittings.
+
+When settings.QUIZ_ADAPTIVE_STUDY is set, the answers of the users update
+their QuestionHistory, and new study sittings are filled, in this order,
+with:
+
+- the questions of the quiz that are due, the ones last answered
+  incorrectly and the hardest ones first
+- the questions of the quiz the user never answered, in the order of the
+  quiz
+- the questions of the quiz that are due the soonest
+
+The due questions are read with a range query on the (user, due) index and
+ranked with a heap bounded by the number of questions of the sitting, and
+the new questions are looked up by chunks of the quiz, in the database, so
+the selection does not read the whole answer history of the user.
+"""
+import heapq
+
+from django.utils.timezone import now
+
+from .models.history import QuestionHistory
+from .models.question import Question
+
+# number of questions of the quiz looked up at once for the new questions
+CHUNK_SIZE = 500
+
+
+def select_questions(user, question_ids: list, nb_questions: int) -> list:
+    """Pick the questions of a study sitting.
+
+    Args:
+        user (User): user sitting the quiz
+        question_ids (list): ids of the questions of the quiz
+        nb_questions (int): number of questions of the sitting
+
+    Returns:
+        list: ids of the selected questions
+
+    """
+    current_time = now()
+    history = QuestionHistory.objects.filter(user=user, question_id__in=question_ids)
+
+    due = history.filter(due__lte=current_time).values_list(
+        "question_id", "streak", "ease", "due"
+    )
+    selected = [
+        question_id
+        for question_id, *_ in heapq.nsmallest(
+            nb_questions, due.iterator(), key=lambda row: row[1:]
+        )
+    ]
+    if len(selected) == nb_questions:
+        return selected
+
+    for start in range(0, len(question_ids), CHUNK_SIZE):
+        chunk = question_ids[start : start + CHUNK_SIZE]
+        new = set(
+            Question.objects.filter(pk__in=chunk)
+            .exclude(history__user=user)
+            .values_list("pk", flat=True)
+        )
+        new_ids = [question_id for question_id in chunk if question_id in new]
+        selected += new_ids[: nb_questions - len(selected)]
+        if len(selected) == nb_questions:
+            return selected
+
+    upcoming = (
+        history.filter(due__gt=current_time)
+        .order_by("due")
+        .values_list("question_id", flat=True)
+    )
+    selected += upcoming[: nb_questions - len(selected)]
+    return selected
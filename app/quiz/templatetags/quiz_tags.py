@@ -1,5 +1,7 @@
 from django import template
 
+from app.quiz.bundles import get_question
+
 register = template.Library()
 
 
@@ -8,8 +10,11 @@ def correct_answer_for_all(context, question):
     """
     processes the correct answer based on a given question object
     if the answer is incorrect, informs the user
+    answers are shown in the order of the sitting of the context, if any
     """
-    answers = question.get_answers()
+    sitting = context.get('sitting')
+    seed = sitting.get_answer_seed(question.pk) if sitting else None
+    answers = get_question(question.pk).get_answers(seed)
     incorrect_list = context.get('incorrect_questions', [])
     if question.id in incorrect_list:
         user_was_incorrect = True
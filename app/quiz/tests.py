@@ -1,28 +1,64 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
+
+import numpy as np
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
+from django.contrib.sites.models import Site
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Q, QuerySet
 
-from django.urls import resolve
+from django.urls import resolve, reverse
 from django.http import HttpRequest
 from django.template import Template, Context
-from django.test import TestCase
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
+from . import bank, buffer, bundles, grading, item_analysis, leaderboards, study
 from .models import (
     Answer,
     Category,
+    CategoryScore,
     EssayQuestion,
     MCQuestion,
+    OpenQuestion,
     Progress,
+    Question,
+    QuestionHistory,
+    QuestionStats,
     Quiz,
+    QuizScore,
     Sitting,
+    SittingArchive,
+    SittingMode,
+    SittingState,
+    SlotStatus,
     SubCategory,
     TFQuestion,
+    UserAnswer,
 )
+from .pagination import paginate_sittings
+from .serializers import QuestionSerializer, QuizSerializer
+from .templatetags import quiz_tags
 from .views import QuizListView, CategoriesListView, QuizDetailView
 
 
@@ -120,19 +156,15 @@ class TestProgress(TestCase):
         self.p1 = Progress.objects.new_progress(self.user)
 
     def test_list_all_empty(self):
-        self.assertEqual(self.p1.score, "")
+        self.assertFalse(CategoryScore.objects.exists())
 
         category_dict = self.p1.list_all_cat_scores
 
-        self.assertIn(str(list(category_dict.keys())[0]), self.p1.score)
-
-        self.assertIn(self.c1.category, self.p1.score)
+        self.assertEqual(category_dict, {self.c1.name: [0, 0, 0]})
 
         Category.objects.new_category(name="cheese")
 
-        self.p1.list_all_cat_scores
-
-        self.assertIn("cheese", self.p1.score)
+        self.assertIn("cheese", self.p1.list_all_cat_scores)
 
     def test_subcategory_all_empty(self):
         SubCategory.objects.create(category=self.c1)
@@ -765,6 +797,23 @@ class TestTemplateTags(TestCase):
         self.assertIn("bing", template.render(context))
         self.assertIn("incorrectly", template.render(context))
 
+    def test_correct_answer_order(self):
+        self.question1.answer_order = "random"
+        self.question1.save()
+        for answer_id in range(10, 20):
+            Answer.objects.create(id=answer_id, question=self.question1, content="a")
+        # answers are in the order shown while the sitting was taken
+        seed = self.sitting.get_answer_seed(self.question1.id)
+        expected = [
+            answer.id
+            for answer in bundles.get_question(self.question1.id).get_answers(seed)
+        ]
+        context = Context({"question": self.question1, "sitting": self.sitting})
+        result = quiz_tags.correct_answer_for_all(context, self.question1)
+        self.assertEqual(
+            [answer.id for answer in result["previous"]["answers"]], expected
+        )
+
     def test_answer_to_string(self):
         template = Template(
             "{% load quiz_tags %}" + "{{ question|answer_choice_to_string:answer }}"
@@ -779,3 +828,2113 @@ class TestTemplateTags(TestCase):
         )
 
         self.assertIn("bing", template.render(context))
+
+
+class TestSittingState(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.question1 = MCQuestion.objects.create(id=1, content="squawk")
+        self.question1.quiz.add(self.quiz1)
+        self.question2 = TFQuestion.objects.create(id=2, content="squeek")
+        self.question2.quiz.add(self.quiz1)
+
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        self.sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+
+    def test_encode_decode(self):
+        state = SittingState(range(100000, 103000))
+        state.set_result(2, True)
+        state.set_result(3000, False)
+
+        question_ids, results = state.encode()
+        self.assertEqual(len(question_ids), 4 * 3000)
+        self.assertEqual(len(results), 3000)
+
+        decoded = SittingState.decode(memoryview(question_ids), results)
+        self.assertEqual(len(decoded), 3000)
+        self.assertEqual(decoded.question_id(3000), 102999)
+        self.assertEqual(decoded.status(2), SlotStatus.CORRECT)
+        self.assertEqual(decoded.status(3000), SlotStatus.INCORRECT)
+        self.assertEqual(decoded.nb_answered(), 2)
+
+    def test_progress_from_state(self):
+        self.assertEqual(self.sitting.progress(), (0, 2))
+        self.assertEqual(self.sitting.get_score_list(), [(1, "?"), (2, "?")])
+
+        self.sitting.add_user_progress(2, False)
+
+        self.assertEqual(self.sitting.progress(), (1, 2))
+        self.assertEqual(self.sitting.get_unanswered_questions(), [1])
+        self.assertEqual(self.sitting.get_nb_unanswered_questions(), 1)
+        self.assertEqual(self.sitting.get_score_list(), [(1, "?"), (2, 0)])
+
+    def test_state_written_back_on_save(self):
+        self.sitting.add_user_progress(1, True)
+        self.sitting.save()
+
+        sitting = Sitting.objects.get(pk=self.sitting.pk)
+        self.assertEqual(sitting.get_score_list(), [(1, 1), (2, "?")])
+        self.assertEqual(sitting.get_nb_questions(), 2)
+
+
+class TestSittingCreation(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1", random_order=True
+        )
+        self.questions = [
+            MCQuestion.objects.create(id=i, content="question %d" % i)
+            for i in range(1, 11)
+        ]
+        self.quiz1.question_set.set(self.questions)
+
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+
+    def test_question_ids_cached(self):
+        self.assertCountEqual(self.quiz1.get_question_ids(), range(1, 11))
+
+        with self.assertNumQueries(0):
+            self.quiz1.get_question_ids()
+
+    def test_question_ids_invalidated(self):
+        self.quiz1.get_question_ids()
+
+        question = TFQuestion.objects.create(id=11, content="question 11")
+        question.quiz.add(self.quiz1)
+        self.assertIn(11, self.quiz1.get_question_ids())
+
+        self.quiz1.question_set.remove(self.questions[0])
+        self.assertNotIn(1, self.quiz1.get_question_ids())
+
+        question.delete()
+        self.assertNotIn(11, self.quiz1.get_question_ids())
+
+    def test_seeded_shuffle(self):
+        self.quiz1.max_questions = 4
+        self.quiz1.save()
+
+        sitting1 = Sitting.objects.new_sitting(self.user, self.quiz1, seed=42)
+        sitting2 = Sitting.objects.new_sitting(
+            self.user, self.quiz1, SittingMode.EXAM, seed=42
+        )
+
+        self.assertEqual(len(sitting1.state), 4)
+        self.assertEqual(sitting1.get_question_ids(), sitting2.get_question_ids())
+        self.assertEqual(sitting1.answers.count(), 4)
+
+    def test_new_sitting_queries(self):
+        self.quiz1.get_question_ids()
+
+        # sitting insert and bulk insert of the user answers
+        with self.assertNumQueries(2):
+            Sitting.objects.new_sitting(self.user, self.quiz1)
+
+    def test_user_sitting_queries(self):
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+
+        with self.assertNumQueries(1):
+            via_manager = Sitting.objects.user_sitting(self.user, self.quiz1)
+            self.assertEqual(via_manager, sitting)
+
+        self.quiz1.single_attempt = True
+        self.quiz1.save()
+        with self.assertNumQueries(1):
+            via_manager = Sitting.objects.user_sitting(self.user, self.quiz1)
+            self.assertEqual(via_manager, sitting)
+
+        sitting.mark_quiz_complete()
+        sitting.save()
+        with self.assertNumQueries(1):
+            self.assertIs(Sitting.objects.user_sitting(self.user, self.quiz1), False)
+
+    def test_single_open_sitting(self):
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Sitting.objects.new_sitting(self.user, self.quiz1)
+
+        # a sitting started by a concurrent request between the lookup and
+        # the insert is returned
+        with mock.patch.object(QuerySet, "first", return_value=None):
+            via_manager = Sitting.objects.user_sitting(self.user, self.quiz1)
+            self.assertEqual(via_manager, sitting)
+        self.assertEqual(Sitting.objects.count(), 1)
+
+        # completed sittings don't count
+        sitting.mark_quiz_complete()
+        sitting.save()
+        new_sitting = Sitting.objects.user_sitting(self.user, self.quiz1)
+        self.assertNotEqual(new_sitting, sitting)
+        self.assertEqual(Sitting.objects.filter(complete=False).get(), new_sitting)
+
+
+@override_settings(QUIZ_LAZY_USER_ANSWERS=True)
+class TestLazyUserAnswers(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.question1 = MCQuestion.objects.create(id=1, content="squawk")
+        self.question1.quiz.add(self.quiz1)
+        self.answer1 = Answer.objects.create(
+            id=123, question=self.question1, content="bing", correct=True
+        )
+        self.question2 = TFQuestion.objects.create(id=2, content="squeek")
+        self.question2.quiz.add(self.quiz1)
+
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        self.sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        self.client.force_login(self.user)
+
+    def test_no_answer_rows_on_start(self):
+        self.assertEqual(self.sitting.answers.count(), 0)
+        self.assertEqual(self.sitting.get_unanswered_questions(), [1, 2])
+
+    def test_question_page_without_answer_row(self):
+        order = self.sitting.get_question_ids().index(self.question1.id) + 1
+        response = self.client.get(
+            reverse("quiz:sitting_question", args=[self.sitting.id, order])
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["question"], self.question1)
+        self.assertIsNone(response.context["user_answer"].pk)
+
+        response = self.client.get(
+            reverse("quiz:sitting_question", args=[self.sitting.id, 3])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_answer_row_created_on_first_answer(self):
+        order = self.sitting.get_question_ids().index(self.question1.id) + 1
+        self.client.post(
+            reverse("quiz:sitting_question", args=[self.sitting.id, order]),
+            {"answers": "123"},
+        )
+
+        user_answer = self.sitting.answers.get()
+        self.assertEqual(user_answer.order, order)
+        self.assertEqual(user_answer.question_id, self.question1.id)
+        self.assertTrue(user_answer.is_correct)
+
+        self.sitting.refresh_from_db()
+        self.assertEqual(self.sitting.current_score, 1)
+        self.assertEqual(self.sitting.get_unanswered_questions(), [3 - order])
+
+
+class TestSittingQuestionQueries(TestCase):
+    """Lock in the number of queries of the question pages.
+
+    Every request also loads the session and the user, inside the savepoint
+    of the request transaction.
+    """
+
+    REQUEST_QUERIES = 4
+
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.question1 = MCQuestion.objects.create(
+            id=1, content="a squawk", answer_order="content"
+        )
+        self.question2 = TFQuestion.objects.create(
+            id=2, content="b squeek", correct=True
+        )
+        self.question3 = OpenQuestion.objects.create(
+            id=3, content="c oink", answer="42"
+        )
+        for question in (self.question1, self.question2, self.question3):
+            question.quiz.add(self.quiz1)
+        self.answer1 = Answer.objects.create(
+            id=123, question=self.question1, content="bing", correct=False
+        )
+        self.answer2 = Answer.objects.create(
+            id=456, question=self.question1, content="bong", correct=True
+        )
+
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        self.sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        self.client.force_login(self.user)
+        # the current site is cached after the first lookup
+        Site.objects.get_current()
+
+    def url(self, order, name="quiz:sitting_question"):
+        return reverse(name, args=[self.sitting.id, order])
+
+    def test_get_question_queries(self):
+        # sitting with its quiz, question with the user answer, answer choices
+        with self.assertNumQueries(self.REQUEST_QUERIES + 3):
+            response = self.client.get(self.url(1))
+        self.assertContains(response, "bong")
+
+        # the question is now read from the cache
+        with self.assertNumQueries(self.REQUEST_QUERIES + 2):
+            response = self.client.get(self.url(1))
+        self.assertContains(response, "bong")
+
+        # no answer choices to load for the other question types
+        for order in (2, 3):
+            with self.assertNumQueries(self.REQUEST_QUERIES + 2):
+                self.client.get(self.url(order))
+
+    def test_explanation_queries(self):
+        self.sitting.add_user_progress(1, True)
+        self.sitting.save()
+
+        url = self.url(1, "quiz:sitting_question_explanation")
+        with self.assertNumQueries(self.REQUEST_QUERIES + 3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(self.REQUEST_QUERIES + 2):
+            response = self.client.get(url)
+        self.assertEqual(response.context["question"].content, "a squawk")
+
+    def test_post_answer_queries(self):
+        # reads as for a GET, the user answer and sitting updates, and the
+        # reload of the sitting results
+        with self.assertNumQueries(self.REQUEST_QUERIES + 3 + 3):
+            response = self.client.post(self.url(1), {"answers": "456"})
+        self.assertEqual(response.status_code, 200)
+
+        user_answer = self.sitting.answers.get(order=1)
+        self.assertEqual(user_answer.answer, "456")
+        self.assertTrue(user_answer.is_correct)
+        self.sitting.refresh_from_db()
+        self.assertEqual(self.sitting.current_score, 1)
+        self.assertEqual(self.sitting.get_score_list()[0], (1, 1))
+
+
+class TestQuestionBundles(TestCase):
+    def setUp(self):
+        self.question1 = MCQuestion.objects.create(
+            id=1, content="squawk", explanation="because", answer_order="content"
+        )
+        self.answer1 = Answer.objects.create(
+            id=123, question=self.question1, content="bing", correct=False
+        )
+        self.answer2 = Answer.objects.create(
+            id=456, question=self.question1, content="bong", correct=True
+        )
+        self.question2 = OpenQuestion.objects.create(id=2, content="oink", answer="42")
+
+    def test_bundle_round_trip(self):
+        question = bundles.get_question(self.question1.id)
+
+        with self.assertNumQueries(0):
+            cached = bundles.get_question(self.question1.id)
+            self.assertIsInstance(cached, MCQuestion)
+            self.assertEqual(cached.pk, self.question1.pk)
+            self.assertEqual(cached.explanation, "because")
+            self.assertEqual(cached.get_answers_list(), [(123, "bing"), (456, "bong")])
+            self.assertTrue(cached.check_if_correct("456"))
+            self.assertEqual(cached.answer_choice_to_string(123), "bing")
+        self.assertEqual(cached.updated_at, question.updated_at)
+
+        bundles.get_question(self.question2.id)
+        with self.assertNumQueries(0):
+            cached = bundles.get_question(self.question2.id)
+            self.assertTrue(cached.check_if_correct("42"))
+
+    def test_invalidated_on_answer_change(self):
+        bundles.get_question(self.question1.id)
+
+        self.answer1.correct = True
+        self.answer1.save()
+
+        question = bundles.get_question(self.question1.id)
+        self.assertTrue(question.check_if_correct("123"))
+        self.assertGreater(question.updated_at, self.question1.updated_at)
+
+        self.answer2.delete()
+        question = bundles.get_question(self.question1.id)
+        self.assertEqual(question.get_answers_list(), [(123, "bing")])
+
+    def test_invalidated_on_question_change(self):
+        bundles.get_question(self.question2.id)
+
+        self.question2.answer = "43"
+        self.question2.save()
+
+        self.assertTrue(bundles.get_question(self.question2.id).check_if_correct("43"))
+
+
+class TestGrading(TestCase):
+    def setUp(self):
+        self.question1 = MCQuestion.objects.create(
+            id=1, content="squawk", allow_multiple_answers=True
+        )
+        for answer_id, correct in ((11, True), (12, True), (13, False)):
+            Answer.objects.create(
+                id=answer_id, question=self.question1, content="a", correct=correct
+            )
+        self.question2 = MCQuestion.objects.create(id=2, content="squeek")
+        Answer.objects.create(id=21, question=self.question2, content="b", correct=True)
+        Answer.objects.create(id=22, question=self.question2, content="c")
+        self.question3 = TFQuestion.objects.create(id=3, content="oink", correct=True)
+
+    def test_all_correct_answers_required(self):
+        question = bundles.get_question(self.question1.id)
+
+        self.assertTrue(question.check_if_correct(["11", "12"]))
+        self.assertFalse(question.check_if_correct(["11"]))
+        self.assertFalse(question.check_if_correct(["11", "12", "13"]))
+
+    def test_check_many(self):
+        guesses = {1: ["12", "11"], 2: "22", 3: "True", 99: "True"}
+        self.assertEqual(
+            grading.check_many(guesses), {1: True, 2: False, 3: True, 99: False}
+        )
+
+        # everything is now read from the question bundle cache
+        with self.assertNumQueries(0):
+            grading.check_many({1: ["11"], 2: "21", 3: "False"})
+
+
+class TestSittingSubmit(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1", pass_mark=50
+        )
+        self.question1 = MCQuestion.objects.create(
+            id=1, content="a squawk", allow_multiple_answers=True
+        )
+        self.question2 = TFQuestion.objects.create(
+            id=2, content="b squeek", correct=True
+        )
+        self.question3 = OpenQuestion.objects.create(
+            id=3, content="c oink", answer="42"
+        )
+        for question in (self.question1, self.question2, self.question3):
+            question.quiz.add(self.quiz1)
+        for answer_id, correct in ((11, True), (12, True), (13, False)):
+            Answer.objects.create(
+                id=answer_id, question=self.question1, content="a", correct=correct
+            )
+
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        self.sitting = Sitting.objects.new_sitting(
+            self.user, self.quiz1, SittingMode.EXAM
+        )
+        self.url = reverse("quiz:sitting_submit", args=[self.sitting.id])
+        self.client.force_login(self.user)
+
+    def submit(self, answers):
+        return self.client.post(
+            self.url, json.dumps({"answers": answers}), content_type="application/json"
+        )
+
+    def test_submit_all_answers(self):
+        response = self.submit({"1": ["11", "12"], "2": "False", "3": "42"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["complete"])
+
+        self.sitting.refresh_from_db()
+        self.assertTrue(self.sitting.complete)
+        self.assertEqual(self.sitting.current_score, 2)
+        self.assertEqual(self.sitting.get_score_list(), [(1, 1), (2, 0), (3, 1)])
+        self.assertEqual(
+            list(self.sitting.answers.values_list("order", "is_correct")),
+            [(1, True), (2, False), (3, True)],
+        )
+
+        # the sitting can't be submitted twice
+        self.assertEqual(self.submit({"3": "42"}).status_code, 404)
+
+    def test_partial_submit(self):
+        response = self.submit({"2": "True"})
+        self.assertEqual(response.json()["unanswered"], [1, 3])
+
+        self.sitting.refresh_from_db()
+        self.assertFalse(self.sitting.complete)
+        self.assertEqual(self.sitting.current_score, 1)
+
+    def test_invalid_answers(self):
+        self.assertEqual(self.submit({"4": "True"}).status_code, 400)
+
+        response = self.submit({"1": ["99"], "2": "True"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()["errors"]), ["1"])
+        self.sitting.refresh_from_db()
+        self.assertEqual(self.sitting.get_nb_unanswered_questions(), 3)
+
+    def test_concurrent_answer(self):
+        sitting = Sitting.objects.get(pk=self.sitting.pk)
+        # answered by another request after the sitting was read
+        question, user_answer = self.sitting.get_question(2)
+        user_answer.answer = "True"
+        self.sitting.answer_question(user_answer, True)
+
+        sitting.submit_answers({1: ["11", "12"]})
+        sitting.refresh_from_db()
+        self.assertEqual(sitting.get_score_list(), [(1, 1), (2, 1), (3, "?")])
+        self.assertEqual(sitting.current_score, 2)
+
+    @override_settings(QUIZ_LAZY_USER_ANSWERS=True)
+    def test_submit_lazy_user_answers(self):
+        # replace the open sitting with one without user answers
+        self.sitting.delete()
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz1, SittingMode.EXAM)
+        url = reverse("quiz:sitting_submit", args=[sitting.id])
+        self.client.post(
+            url,
+            json.dumps({"answers": {"1": ["11"], "2": "True", "3": "42"}}),
+            content_type="application/json",
+        )
+
+        sitting.refresh_from_db()
+        self.assertTrue(sitting.complete)
+        self.assertEqual(sitting.current_score, 2)
+        self.assertEqual(sitting.answers.count(), 3)
+
+
+class TestAnswerShuffle(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.question1 = MCQuestion.objects.create(
+            id=1, content="squawk", answer_order="random"
+        )
+        self.question1.quiz.add(self.quiz1)
+        for answer_id in range(10, 20):
+            Answer.objects.create(
+                id=answer_id, question=self.question1, content=str(answer_id)
+            )
+
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        self.sitting = Sitting.objects.new_sitting(self.user, self.quiz1, seed=42)
+        self.client.force_login(self.user)
+
+    def test_seeded_answer_order(self):
+        self.assertEqual(self.sitting.seed, 42)
+        seed = self.sitting.get_answer_seed(self.question1.id)
+        question = bundles.get_question(self.question1.id)
+        answers = question.get_answers_list(seed)
+        self.assertEqual(question.get_answers_list(seed), answers)
+        self.assertNotEqual(
+            question.get_answers_list(self.sitting.get_answer_seed(2)), answers
+        )
+
+    def test_answer_order_stable_across_requests(self):
+        url = reverse("quiz:sitting_question", args=[self.sitting.id, 1])
+        orders = []
+        for unused in range(2):
+            response = self.client.get(url)
+            actual_answers = [a.id for a in response.context["actual_answers"]]
+            choices = response.context["form"].fields["answers"].choices
+            self.assertEqual(actual_answers, [choice[0] for choice in choices])
+            orders.append(actual_answers)
+        self.assertEqual(orders[0], orders[1])
+
+
+@skipUnless(os.environ.get("REDIS_URL"), "requires a Redis server")
+@override_settings(
+    QUIZ_ANSWER_BUFFER=True,
+    CACHES={
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }
+    },
+)
+class TestAnswerBuffer(TransactionTestCase):
+    def setUp(self):
+        buffer.get_connection().flushdb()
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.question1 = TFQuestion.objects.create(id=1, content="a", correct=True)
+        self.question2 = TFQuestion.objects.create(id=2, content="b", correct=False)
+        for question in (self.question1, self.question2):
+            question.quiz.add(self.quiz1)
+
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        self.sitting = Sitting.objects.new_sitting(
+            self.user, self.quiz1, SittingMode.EXAM
+        )
+        self.client.force_login(self.user)
+
+    def answer(self, order, answer):
+        url = reverse("quiz:sitting_question", args=[self.sitting.id, order])
+        return self.client.post(url, {"answers": answer})
+
+    def test_reads_see_buffered_answers(self):
+        self.answer(1, "True")
+
+        # nothing is written to the database
+        self.assertIsNone(self.sitting.answers.get(order=1).answer)
+        results = Sitting.objects.values_list("results", flat=True)
+        self.assertEqual(bytes(results.get(pk=self.sitting.pk)), self.sitting.results)
+
+        sitting = Sitting.objects.get(pk=self.sitting.pk)
+        self.assertEqual(sitting.get_unanswered_questions(), [2])
+        self.assertEqual(sitting.current_score, 1)
+        question, user_answer = sitting.get_question(1)
+        self.assertEqual(user_answer.answer, "True")
+        self.assertTrue(user_answer.is_correct)
+
+    def test_flush_on_finish(self):
+        self.answer(1, "True")
+        self.answer(2, "True")
+        self.client.post(reverse("quiz:sitting_finish", args=[self.sitting.id]))
+
+        self.sitting.refresh_from_db()
+        self.assertTrue(self.sitting.complete)
+        self.assertEqual(self.sitting.current_score, 1)
+        self.assertEqual(
+            list(self.sitting.answers.values_list("answer", "is_correct")),
+            [("True", True), ("True", False)],
+        )
+        self.assertEqual(buffer.get_answers(self.sitting.pk), {})
+        self.assertEqual(buffer.get_buffered_sittings(), [])
+
+    def test_flush_command(self):
+        self.answer(2, "False")
+        call_command("flush_sitting_buffers", stdout=StringIO())
+
+        self.sitting.refresh_from_db()
+        self.assertFalse(self.sitting.complete)
+        self.assertEqual(self.sitting.current_score, 1)
+        self.assertEqual(self.sitting.get_unanswered_questions(), [1])
+        self.assertEqual(self.sitting.answers.get(order=2).answer, "False")
+        self.assertEqual(buffer.get_buffered_sittings(), [])
+
+    def test_flush_stale_sitting(self):
+        self.answer(1, "True")
+        self.answer(2, "True")
+        sitting = Sitting.objects.get(pk=self.sitting.pk)
+        self.assertEqual(len(sitting.buffered_answers), 2)
+        # the answer is changed and flushed after the sitting was read
+        self.answer(1, "False")
+        call_command("flush_sitting_buffers", stdout=StringIO())
+
+        sitting.mark_quiz_complete()
+        sitting.save()
+        sitting.refresh_from_db()
+        self.assertEqual(sitting.current_score, 0)
+        self.assertEqual(
+            list(sitting.answers.values_list("answer", "is_correct")),
+            [("False", False), ("True", False)],
+        )
+
+    def test_flush_command_completed_sitting(self):
+        self.answer(1, "True")
+        self.answer(2, "True")
+        iterator = QuerySet.iterator
+
+        def stale_iterator(queryset, *args, **kwargs):
+            if queryset.model is not Sitting:
+                return iterator(queryset, *args, **kwargs)
+            sittings = list(iterator(queryset, *args, **kwargs))
+            # the user finishes the sitting after it was read by the command
+            with mock.patch.object(QuerySet, "iterator", iterator):
+                url = reverse("quiz:sitting_finish", args=[self.sitting.id])
+                self.client.post(url)
+            return iter(sittings)
+
+        with mock.patch.object(QuerySet, "iterator", stale_iterator):
+            call_command("flush_sitting_buffers", stdout=StringIO())
+
+        self.sitting.refresh_from_db()
+        self.assertTrue(self.sitting.complete)
+        self.assertIsNotNone(self.sitting.end)
+        self.assertEqual(self.sitting.current_score, 1)
+        self.assertEqual(self.sitting.percent, 50)
+        self.assertEqual(self.sitting.get_unanswered_questions(), [])
+        self.assertEqual(buffer.get_buffered_sittings(), [])
+
+
+@skipUnless(connection.vendor == "postgresql", "requires row-level locking")
+class TestConcurrentAnswers(TransactionTestCase):
+    NB_QUESTIONS = 20
+    # queries of an answer, the last one also completes the sitting
+    MAX_QUERIES = 20
+
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        for i in range(self.NB_QUESTIONS):
+            question = TFQuestion.objects.create(content="q%02d" % i, correct=True)
+            question.quiz.add(self.quiz1)
+
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        self.sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        client = Client()
+        client.force_login(self.user)
+        self.session_cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def submit(self, order):
+        client = Client()
+        client.cookies[settings.SESSION_COOKIE_NAME] = self.session_cookie
+        url = reverse("quiz:sitting_question", args=[self.sitting.id, order])
+        try:
+            with CaptureQueriesContext(connection) as context:
+                status_code = client.post(url, {"answers": "True"}).status_code
+            return status_code, len(context)
+        finally:
+            connections.close_all()
+
+    def test_parallel_answers(self):
+        # every question answered twice at the same time, as with a double click
+        orders = list(range(1, self.NB_QUESTIONS + 1)) * 2
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            status_codes, nb_queries = zip(*executor.map(self.submit, orders))
+
+        self.assertEqual(set(status_codes), {200})
+        self.assertLessEqual(max(nb_queries), self.MAX_QUERIES)
+
+        self.sitting.refresh_from_db()
+        self.assertEqual(self.sitting.current_score, self.NB_QUESTIONS)
+        self.assertEqual(self.sitting.state.nb_correct(), self.NB_QUESTIONS)
+        self.assertEqual(self.sitting.get_unanswered_questions(), [])
+        self.assertTrue(self.sitting.complete)
+        self.assertEqual(
+            self.sitting.answers.filter(is_correct=True).count(), self.NB_QUESTIONS
+        )
+
+    def test_concurrent_first_answers_history(self):
+        question_id = self.sitting.get_question_ids()[0]
+        recorded = threading.Event()
+
+        def record(wait):
+            try:
+                with transaction.atomic():
+                    if wait:
+                        recorded.wait(5)
+                    QuestionHistory.objects.record(self.user.pk, {question_id: True})
+                    if not wait:
+                        recorded.set()
+                        # the other answer waits for this one to be committed
+                        time.sleep(0.2)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(record, [False, True]))
+
+        history = QuestionHistory.objects.get(user=self.user, question_id=question_id)
+        self.assertEqual(history.attempts, 2)
+        self.assertEqual(history.streak, 2)
+
+
+class TestSittingData(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.question1 = MCQuestion.objects.create(
+            id=1, content="a squawk", answer_order="content"
+        )
+        self.question2 = TFQuestion.objects.create(
+            id=2, content="b squeek", correct=True
+        )
+        self.question3 = OpenQuestion.objects.create(
+            id=3, content="c oink", answer="42"
+        )
+        for question in (self.question1, self.question2, self.question3):
+            question.quiz.add(self.quiz1)
+        Answer.objects.create(id=123, question=self.question1, content="bing")
+        Answer.objects.create(
+            id=456, question=self.question1, content="bong", correct=True
+        )
+
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        self.sitting = Sitting.objects.new_sitting(
+            self.user, self.quiz1, SittingMode.EXAM
+        )
+        self.client.force_login(self.user)
+        Site.objects.get_current()
+
+    def save_answer(self, order, answer):
+        return self.client.post(
+            reverse("quiz:sitting_answer", args=[self.sitting.id]),
+            json.dumps({"order": order, "answer": answer}),
+            content_type="application/json",
+        )
+
+    def test_sitting_payload(self):
+        self.save_answer(1, "456")
+
+        url = reverse("quiz:sitting_data", args=[self.sitting.id])
+        response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(data["unanswered"], [2, 3])
+        self.assertEqual(
+            [(q["order"], q["type"], q["answer"]) for q in data["questions"]],
+            [
+                (1, "MCQuestion", "456"),
+                (2, "TFQuestion", None),
+                (3, "OpenQuestion", None),
+            ],
+        )
+        self.assertEqual(
+            data["questions"][0]["choices"], [["123", "bing"], ["456", "bong"]]
+        )
+        self.assertNotIn("correct", response.content.decode())
+
+        # the questions are cached, only the sitting and the answers are read
+        with self.assertNumQueries(TestSittingQuestionQueries.REQUEST_QUERIES + 2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_save_answer(self):
+        response = self.save_answer(2, "False")
+        self.assertEqual(
+            response.json(), {"order": 2, "complete": False, "unanswered": [1, 3]}
+        )
+
+        user_answer = self.sitting.answers.get(order=2)
+        self.assertEqual(user_answer.answer, "False")
+        self.assertFalse(user_answer.is_correct)
+
+        self.assertEqual(self.save_answer(2, "Maybe").status_code, 400)
+        self.assertEqual(self.save_answer(4, "True").status_code, 400)
+
+
+class TestSittingArchive(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.question1 = TFQuestion.objects.create(id=1, content="a", correct=True)
+        self.question2 = TFQuestion.objects.create(id=2, content="b", correct=True)
+        for question in (self.question1, self.question2):
+            question.quiz.add(self.quiz1)
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+
+        self.old_sitting = self.complete_sitting(days_ago=400)
+        self.recent_sitting = self.complete_sitting(days_ago=10)
+
+    def complete_sitting(self, days_ago):
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        sitting.submit_answers({1: "True", 2: "False"})
+        sitting.end = now() - timedelta(days=days_ago)
+        sitting.save()
+        return sitting
+
+    def test_archive(self):
+        before = now() - timedelta(days=365)
+        # select the sittings and their answers, insert the archives, delete
+        # the answers in one statement and flag the sittings, in a savepoint,
+        # then an empty batch
+        with self.assertNumQueries(7 + 3):
+            self.assertEqual(SittingArchive.objects.archive(before), 1)
+
+        self.assertFalse(self.old_sitting.answers.exists())
+        self.assertEqual(self.recent_sitting.answers.count(), 2)
+
+        sitting = Sitting.objects.get(pk=self.old_sitting.pk)
+        self.assertTrue(sitting.archived)
+        self.assertEqual(sitting.get_score_list(), [(1, 1), (2, 0)])
+        self.assertEqual(sitting.archive.unpack()["end"], self.old_sitting.end)
+
+        # answers are rebuilt from the archive
+        user_answer = sitting.get_user_answer(2)
+        self.assertEqual(user_answer.answer, "False")
+        self.assertFalse(user_answer.is_correct)
+        with self.assertNumQueries(0):
+            question, user_answer = sitting.get_question(1)
+        self.assertEqual(user_answer.answer, "True")
+        self.assertTrue(user_answer.is_correct)
+
+    def test_restore(self):
+        call_command("archive_sittings", days=365, stdout=StringIO())
+        call_command(
+            "archive_sittings", restore=[self.old_sitting.pk], stdout=StringIO()
+        )
+
+        self.old_sitting.refresh_from_db()
+        self.assertFalse(self.old_sitting.archived)
+        self.assertFalse(SittingArchive.objects.exists())
+        answers = self.old_sitting.answers.values_list("order", "answer", "is_correct")
+        self.assertEqual(list(answers), [(1, "True", True), (2, "False", False)])
+
+
+@skipUnless(connection.vendor == "postgresql", "requires PostgreSQL query plans")
+class TestQueryPlans(TestCase):
+    """The hot lookups of the quiz views must use an index on a large table"""
+
+    NB_CATEGORIES = 2000
+    NB_USERS = 500
+    NB_QUIZZES = 2000
+    SITTINGS_PER_USER = 40
+    ANSWERS_PER_SITTING = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = Category.objects.bulk_create(
+            [Category(name="category %d" % i) for i in range(cls.NB_CATEGORIES)]
+        )
+        quizzes = Quiz.objects.bulk_create(
+            [
+                Quiz(
+                    title="quiz %d" % i,
+                    description="d%d" % i,
+                    url="quiz-%d" % i,
+                    category=categories[i % len(categories)],
+                )
+                for i in range(cls.NB_QUIZZES)
+            ]
+        )
+        users = User.objects.bulk_create(
+            [User(email="user%d@example.com" % i) for i in range(cls.NB_USERS)]
+        )
+        sittings = Sitting.objects.bulk_create(
+            [
+                Sitting(
+                    user=user,
+                    quiz=quizzes[(i * cls.SITTINGS_PER_USER + j) % len(quizzes)],
+                    mode=SittingMode.EXAM if j % 2 else SittingMode.STUDY,
+                    complete=j > 0,
+                    current_score=0,
+                    end=now() - timedelta(minutes=j) if j > 0 else None,
+                )
+                for i, user in enumerate(users)
+                for j in range(cls.SITTINGS_PER_USER)
+            ],
+            batch_size=5000,
+        )
+        question = TFQuestion.objects.create(content="q", correct=True)
+        UserAnswer.objects.bulk_create(
+            [
+                UserAnswer(
+                    sitting=sitting,
+                    user_id=sitting.user_id,
+                    order=order,
+                    question=question,
+                    answer="True",
+                    is_correct=True,
+                )
+                for sitting in sittings
+                for order in range(1, cls.ANSWERS_PER_SITTING + 1)
+            ],
+            batch_size=5000,
+        )
+        with connection.cursor() as cursor:
+            for model in (Category, Quiz, Sitting, UserAnswer):
+                cursor.execute("ANALYZE %s" % model._meta.db_table)
+
+        cls.user = users[7]
+        cls.quiz = quizzes[7 * cls.SITTINGS_PER_USER]
+        cls.sitting = sittings[7 * cls.SITTINGS_PER_USER]
+
+    def assertIndexScan(self, queryset, index_name=None):
+        plan = queryset.explain()
+        self.assertNotIn("Seq Scan", plan)
+        self.assertIn("Index", plan)
+        if index_name is not None:
+            self.assertIn(index_name, plan)
+
+    def test_user_sitting(self):
+        sittings = Sitting.objects.filter(
+            user=self.user, quiz=self.quiz, mode=SittingMode.STUDY
+        )
+        queryset = sittings.filter(complete=False)
+        self.assertIndexScan(queryset, "unique_open_sitting")
+        self.assertEqual(queryset.get(), self.sitting)
+
+        # lookup of single attempt quizzes
+        queryset = sittings.order_by("-complete")[:1]
+        self.assertIndexScan(queryset, "quiz_sitting_user_quiz_idx")
+
+    def test_sitting_page(self):
+        # completed sittings of a user, and of all the users for marking
+        for sittings in (
+            Sitting.objects.filter(user=self.user, complete=True),
+            Sitting.objects.filter(complete=True),
+        ):
+            sittings = sittings.filter(end__isnull=False)
+            queryset = sittings.order_by("-end", "-pk")[:21]
+            self.assertIndexScan(queryset)
+            last = list(queryset)[-1]
+            queryset = sittings.filter(
+                Q(end__lt=last.end) | Q(end=last.end, pk__lt=last.pk)
+            ).order_by("-end", "-pk")[:21]
+            self.assertIndexScan(queryset)
+        self.assertIndexScan(queryset, "quiz_sitting_end_idx")
+
+    def test_user_answer(self):
+        queryset = UserAnswer.objects.filter(sitting=self.sitting, order=3)
+        self.assertIndexScan(queryset, "unique_sitting_answer_order")
+
+    def test_quiz_url(self):
+        queryset = Quiz.objects.filter(url=self.quiz.url)
+        self.assertIndexScan(queryset)
+
+    def test_category_name(self):
+        queryset = Category.objects.filter(name="category 7")
+        self.assertIndexScan(queryset)
+
+
+class TestCategoryScore(TestCase):
+    def setUp(self):
+        self.c1 = Category.objects.create(name="elderberries")
+        self.c2 = Category.objects.create(name="straw.berries")
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        self.other_user = User.objects.create_user(
+            email="sam@sam.com", password="top_secret"
+        )
+
+    def test_add(self):
+        # update, then insert of the missing row in a savepoint
+        with self.assertNumQueries(4):
+            CategoryScore.objects.add(self.user, self.c1.id, score=1, possible=2)
+        with self.assertNumQueries(1):
+            CategoryScore.objects.add(self.user, self.c1.id, score=2, possible=2)
+        CategoryScore.objects.add(self.other_user, self.c1.id, score=0, possible=1)
+
+        score = CategoryScore.objects.get(user=self.user, category=self.c1)
+        self.assertEqual((score.score, score.possible), (3, 4))
+
+    def test_add_concurrent_insert(self):
+        CategoryScore.objects.create(user=self.user, category=self.c1, possible=1)
+        # the row is created between the update and the insert
+        with mock.patch.object(QuerySet, "update", side_effect=[0, 1]) as update:
+            CategoryScore.objects.add(self.user, self.c1.id, score=1, possible=1)
+        self.assertEqual(update.call_count, 2)
+
+    def test_user_scores(self):
+        CategoryScore.objects.add(self.user, self.c1.id, score=1, possible=3)
+        CategoryScore.objects.add(self.other_user, self.c2.id, score=1, possible=1)
+
+        with self.assertNumQueries(1):
+            scores = CategoryScore.objects.user_scores(self.user)
+        self.assertEqual(
+            scores, {"elderberries": [1, 3, 33], "straw.berries": [0, 0, 0]}
+        )
+
+    def test_update_score(self):
+        question = MCQuestion.objects.create(content="squawk")
+        question.category.set([self.c1, self.c2])
+        progress = Progress.objects.new_progress(self.user)
+        progress.update_score(question, 1, 2)
+        progress.update_score(question, -1, 1)
+        scores = progress.list_all_cat_scores
+        self.assertEqual(scores["elderberries"], [2, 3, 67])
+        self.assertEqual(scores["straw.berries"], [2, 3, 67])
+
+        question.category.clear()
+        self.assertIn(_("error"), progress.update_score(question, 1, 1))
+
+    def test_progress_view(self):
+        question = MCQuestion.objects.create(content="squawk")
+        question.quiz.add(self.quiz1)
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        sitting.submit_answers({1: "123"})
+        CategoryScore.objects.add(self.user, self.c1.id, score=1, possible=2)
+        self.client.force_login(self.user)
+        # the current site is cached after the first lookup
+        Site.objects.get_current()
+
+        # progress record, category scores, quiz scores with their quiz,
+        # then completed sittings with their quiz
+        with self.assertNumQueries(TestSittingQuestionQueries.REQUEST_QUERIES + 4):
+            response = self.client.get(reverse("quiz:quiz_progress"))
+        self.assertEqual(response.context["cat_scores"]["elderberries"], [1, 2, 50])
+        self.assertEqual(response.context["totals"].sittings, 1)
+        self.assertEqual(list(response.context["exams"]), [sitting])
+        self.assertContains(response, "test quiz 1")
+
+
+class TestRollups(TestCase):
+    def setUp(self):
+        self.c1 = Category.objects.create(name="elderberries")
+        self.c2 = Category.objects.create(name="straw.berries")
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.question1 = TFQuestion.objects.create(id=1, content="q1", correct=True)
+        self.question1.category.set([self.c1, self.c2])
+        self.question2 = TFQuestion.objects.create(id=2, content="q2", correct=True)
+        self.question2.category.set([self.c1])
+        self.question3 = TFQuestion.objects.create(id=3, content="q3", correct=True)
+        for question in (self.question1, self.question2, self.question3):
+            question.quiz.add(self.quiz1)
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+
+    def complete_sitting(self, answers):
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        sitting.submit_answers(answers)
+        return sitting
+
+    def test_rollups(self):
+        self.complete_sitting({1: "True", 2: "False", 3: "True"})
+        self.complete_sitting({1: "False", 2: "True", 3: "True"})
+
+        scores = CategoryScore.objects.user_scores(self.user)
+        self.assertEqual(scores["elderberries"], [2, 4, 50])
+        self.assertEqual(scores["straw.berries"], [1, 2, 50])
+
+        quiz_score = QuizScore.objects.get(user=self.user, quiz=self.quiz1)
+        self.assertEqual(
+            (quiz_score.sittings, quiz_score.score, quiz_score.possible), (2, 4, 6)
+        )
+        progress = Progress.objects.get(user=self.user)
+        self.assertEqual(
+            (progress.sittings, progress.score, progress.percent), (2, 4, 67)
+        )
+
+    def test_rollup_queries(self):
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        sitting.submit_answers({1: "True", 2: "True"})
+        CategoryScore.objects.add(self.user, self.c1.id, score=1, possible=1)
+        Progress.objects.new_progress(self.user)
+        QuizScore.objects.create(user=self.user, quiz=self.quiz1)
+
+        # completion and answers by category, one update per category plus
+        # the insert of the missing category row in a savepoint, then one
+        # update for the quiz and one for the user
+        sitting.write_answers({3: ("True", True)})
+        with self.assertNumQueries(2 + 2 + 3 + 2):
+            sitting.mark_quiz_complete()
+
+    def test_completed_once(self):
+        sitting = self.complete_sitting({1: "True", 2: "True", 3: "True"})
+        sitting.mark_quiz_complete()
+        sitting.save()
+
+        progress = Progress.objects.get(user=self.user)
+        self.assertEqual((progress.sittings, progress.score), (1, 3))
+
+
+@override_settings(QUIZ_LAZY_USER_ANSWERS=True)
+class TestItemAnalysis(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.question1 = MCQuestion.objects.create(id=1, content="q1")
+        self.answer1 = Answer.objects.create(
+            id=11, question=self.question1, content="a", correct=True
+        )
+        self.answer2 = Answer.objects.create(
+            id=12, question=self.question1, content="b", correct=False
+        )
+        self.answer3 = Answer.objects.create(
+            id=13, question=self.question1, content="c", correct=False
+        )
+        self.question2 = TFQuestion.objects.create(id=2, content="q2", correct=True)
+        self.question3 = TFQuestion.objects.create(id=3, content="q3", correct=True)
+        for question in (self.question1, self.question2, self.question3):
+            question.quiz.add(self.quiz1)
+
+        # correct answers to the three questions, by user
+        self.results = [(1, 1, 1), (1, 1, 0), (0, 1, 0), (0, 0, 0)]
+        for i, results in enumerate(self.results):
+            user = User.objects.create_user(
+                email="user%d@example.com" % i, password="top_secret"
+            )
+            if i == 3:
+                # answered again in a later sitting
+                self.answer(user, [("11", True), ("True", True), ("True", True)])
+            mc_answer = "11" if results[0] else "12"
+            self.answer(
+                user,
+                [(mc_answer, bool(results[0]))]
+                + [(str(bool(result)), bool(result)) for result in results[1:]],
+            )
+
+    def answer(self, user, answers):
+        sitting = Sitting.objects.new_sitting(user, self.quiz1)
+        for order, (answer, is_correct) in enumerate(answers, 1):
+            UserAnswer.objects.create(
+                sitting=sitting,
+                user=user,
+                order=order,
+                question_id=sitting.state.question_id(order),
+                answer=answer,
+                is_correct=is_correct,
+            )
+        sitting.mark_quiz_complete()
+        sitting.save()
+
+    def expected_discrimination(self, index):
+        scores = [results[index] for results in self.results]
+        rest = [(sum(results) - results[index]) / 2 for results in self.results]
+        return np.corrcoef(scores, rest)[0, 1]
+
+    def test_statistics(self):
+        stats, rates = item_analysis.analyse().results()
+
+        self.assertEqual(
+            [row[:3] for row in stats], [(1, 4, 0.5), (2, 4, 0.75), (3, 4, 0.25)]
+        )
+        for index, row in enumerate(stats):
+            self.assertAlmostEqual(row[3], self.expected_discrimination(index))
+        self.assertEqual(rates, {1: {11: 0.5, 12: 0.5, 13: 0.0}})
+
+    def test_chunks(self):
+        # a single user per chunk
+        self.assertEqual(
+            item_analysis.analyse(chunk_cells=1).results(),
+            item_analysis.analyse().results(),
+        )
+
+    def test_constant_results(self):
+        UserAnswer.objects.filter(question=self.question2).update(is_correct=True)
+        stats, rates = item_analysis.analyse().results()
+        self.assertEqual(stats[1], (2, 4, 1.0, None))
+
+    def test_command(self):
+        out = StringIO()
+        call_command("analyse_questions", stdout=out)
+        self.assertIn("Analysed 3 questions", out.getvalue())
+
+        stats = QuestionStats.objects.get(question=self.question1)
+        self.assertEqual(stats.p_value, 0.5)
+        self.assertEqual(stats.get_selection_rates(), {11: 0.5, 12: 0.5, 13: 0.0})
+
+        admin = User.objects.create_superuser(
+            email="admin@example.com", password="top_secret"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(reverse("admin:quiz_mcquestion_changelist"))
+        self.assertContains(response, "0.5")
+        response = self.client.get(
+            reverse("admin:quiz_mcquestion_change", args=[self.question1.id])
+        )
+        self.assertContains(response, "b: 50%")
+
+
+@skipUnless(os.environ.get("REDIS_URL"), "requires a Redis server")
+@override_settings(
+    QUIZ_LEADERBOARDS=True,
+    CACHES={
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }
+    },
+)
+class TestLeaderboards(TransactionTestCase):
+    def setUp(self):
+        leaderboards.get_connection().flushdb()
+        self.c1 = Category.objects.create(name="elderberries")
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.question1 = TFQuestion.objects.create(id=1, content="a", correct=True)
+        self.question1.category.set([self.c1])
+        self.question2 = TFQuestion.objects.create(id=2, content="b", correct=True)
+        for question in (self.question1, self.question2):
+            question.quiz.add(self.quiz1)
+
+        self.users = [
+            User.objects.create_user(
+                email="user%d@example.com" % i, password="top_secret", name="u%d" % i
+            )
+            for i in range(3)
+        ]
+
+    def complete_sitting(self, user, answers):
+        sitting = Sitting.objects.new_sitting(user, self.quiz1)
+        sitting.submit_answers(answers)
+
+    def complete_sittings(self):
+        self.complete_sitting(self.users[0], {1: "True", 2: "False"})
+        self.complete_sitting(self.users[0], {1: "True", 2: "True"})
+        self.complete_sitting(self.users[0], {1: "False", 2: "False"})
+        self.complete_sitting(self.users[1], {1: "True", 2: "False"})
+        self.complete_sitting(self.users[2], {1: "False", 2: "False"})
+
+    def ranking(self, leaderboard):
+        return [(entry["user"], entry["score"]) for entry in leaderboard[0:10]]
+
+    def test_leaderboards(self):
+        self.complete_sittings()
+
+        # best score at the quiz
+        leaderboard = leaderboards.Leaderboard.for_quiz(self.quiz1.id)
+        self.assertEqual(
+            self.ranking(leaderboard),
+            [(self.users[0], 2), (self.users[1], 1), (self.users[2], 0)],
+        )
+        self.assertEqual(
+            leaderboard.get_position(self.users[1].id), {"rank": 2, "score": 1}
+        )
+
+        # correct answers in the category
+        leaderboard = leaderboards.Leaderboard.for_category(self.c1.id)
+        self.assertEqual(
+            self.ranking(leaderboard), [(self.users[0], 2), (self.users[1], 1)]
+        )
+        self.assertIsNone(leaderboard.get_position(self.users[2].id))
+
+    def test_slices(self):
+        self.complete_sittings()
+        leaderboard = leaderboards.Leaderboard.for_quiz(self.quiz1.id)
+        self.assertEqual(leaderboard[0:0], [])
+        self.assertEqual(leaderboard[2:1], [])
+        self.assertEqual([entry["rank"] for entry in leaderboard[1:]], [2, 3])
+        self.assertEqual([entry["rank"] for entry in leaderboard[:-1]], [1, 2])
+        self.assertEqual([entry["rank"] for entry in leaderboard[-1:]], [3])
+        self.assertEqual(leaderboard[:-3], [])
+
+    def test_rebuild(self):
+        self.complete_sittings()
+        connection = leaderboards.get_connection()
+        expected = {
+            key: connection.zrange(key, 0, -1, withscores=True)
+            for key in connection.keys("quiz:leaderboard:*")
+        }
+        connection.zadd(leaderboards.QUIZ_KEY % 99, {1: 1})
+        connection.zadd(leaderboards.QUIZ_KEY % self.quiz1.id, {1: 10})
+
+        out = StringIO()
+        call_command("rebuild_leaderboards", chunk_size=2, stdout=out)
+        self.assertIn("Rebuilt 2 leaderboards", out.getvalue())
+        self.assertEqual(
+            {
+                key: connection.zrange(key, 0, -1, withscores=True)
+                for key in connection.keys("quiz:leaderboard:*")
+            },
+            expected,
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "requires concurrent writes")
+    def test_rebuild_concurrent_sittings(self):
+        self.complete_sittings()
+        old_sitting = Sitting.objects.filter(user=self.users[1]).get()
+        finish_rebuild = leaderboards.finish_rebuild
+
+        def complete_sittings():
+            try:
+                # completed during the rebuild
+                self.complete_sitting(self.users[1], {1: "True", 2: "True"})
+                # completed before, but added to the leaderboards late
+                leaderboards.add_sitting(old_sitting, {self.c1.id: 1})
+            finally:
+                connections.close_all()
+
+        def concurrent_finish(keys, stale_keys):
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                executor.submit(complete_sittings).result()
+            return finish_rebuild(keys, stale_keys)
+
+        with mock.patch.object(leaderboards, "finish_rebuild", concurrent_finish):
+            call_command("rebuild_leaderboards", stdout=StringIO())
+
+        leaderboard = leaderboards.Leaderboard.for_quiz(self.quiz1.id)
+        self.assertEqual(leaderboard.get_position(self.users[1].id)["score"], 2)
+        # the late sitting of user 1 is not counted twice
+        leaderboard = leaderboards.Leaderboard.for_category(self.c1.id)
+        self.assertEqual(
+            dict(self.ranking(leaderboard)), {self.users[0]: 2, self.users[1]: 2}
+        )
+        self.assertFalse(
+            leaderboards.get_connection().exists(
+                leaderboards.REBUILD_KEY, leaderboards.PENDING_KEY
+            )
+        )
+
+    def test_views(self):
+        self.complete_sittings()
+        self.client.force_login(self.users[2])
+
+        url = reverse("quiz:quiz_leaderboard", args=[self.quiz1.url])
+        with mock.patch("app.quiz.views.LeaderboardView.paginate_by", 2):
+            response = self.client.get(url, {"page": 2})
+        self.assertEqual(response.context["position"], {"rank": 3, "score": 0})
+        self.assertEqual(
+            [entry["rank"] for entry in response.context["object_list"]], [3]
+        )
+        self.assertContains(response, "u2")
+
+        url = reverse("quiz:category_leaderboard", args=[self.c1.name])
+        response = self.client.get(url)
+        self.assertEqual(response.context["title"], self.c1.name)
+        self.assertIsNone(response.context["position"])
+        self.assertContains(response, "u1")
+
+        with override_settings(QUIZ_LEADERBOARDS=False):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(QUIZ_ADAPTIVE_STUDY=True)
+class TestAdaptiveStudy(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        for question_id in range(1, 6):
+            question = TFQuestion.objects.create(
+                id=question_id, content="q%d" % question_id, correct=True
+            )
+            question.quiz.add(self.quiz1)
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+
+    def submit(self, sitting, results):
+        """Answer the questions of the sitting, given the results by question id"""
+        sitting.submit_answers(
+            {
+                order: str(results[sitting.state.question_id(order)])
+                for order in range(1, len(sitting.state) + 1)
+                if sitting.state.question_id(order) in results
+            }
+        )
+
+    def test_schedule(self):
+        when = now()
+        history = QuestionHistory(user=self.user, question_id=1)
+        history.add_result(True, when)
+        self.assertEqual(history.due, when + timedelta(days=1))
+        history.add_result(True, when)
+        self.assertEqual(history.due, when + timedelta(days=6))
+        history.add_result(True, when)
+        self.assertEqual(history.interval, timedelta(days=6) * 2.7)
+        self.assertEqual((history.streak, history.attempts), (3, 3))
+
+        history.add_result(False, when)
+        self.assertEqual(history.streak, 0)
+        self.assertAlmostEqual(history.ease, 2.6)
+        self.assertEqual(history.due, when + timedelta(minutes=10))
+
+    def test_record_answers(self):
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        self.submit(sitting, {1: True, 2: False})
+        # answering again does not count twice
+        self.submit(sitting, {1: True, 2: True, 3: True})
+
+        histories = {
+            history.question_id: history
+            for history in QuestionHistory.objects.filter(user=self.user).order_by(
+                "question_id"
+            )
+        }
+        self.assertEqual(sorted(histories), [1, 2, 3])
+        self.assertEqual(
+            [(history.attempts, history.streak) for history in histories.values()],
+            [(1, 1), (1, 0), (1, 1)],
+        )
+
+        user_answer = sitting.get_user_answer(sitting.state.unanswered()[0])
+        user_answer.answer = "True"
+        sitting.answer_question(user_answer, True)
+        self.assertEqual(QuestionHistory.objects.filter(user=self.user).count(), 4)
+
+    def test_select_questions(self):
+        self.quiz1.max_questions = 3
+        self.quiz1.save()
+        when = now()
+        QuestionHistory.objects.record(
+            self.user.id, {1: True, 2: False, 3: True}, when - timedelta(days=2)
+        )
+        QuestionHistory.objects.record(self.user.id, {3: True}, when)
+
+        # due questions first, then the new ones
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        self.assertEqual(sitting.get_question_ids(), [2, 1, 4])
+
+        # then the ones due the soonest
+        QuestionHistory.objects.record(self.user.id, {1: True, 2: True}, when)
+        QuestionHistory.objects.record(
+            self.user.id, {5: True}, when - timedelta(hours=1)
+        )
+        QuestionHistory.objects.record(
+            self.user.id, {4: True}, when - timedelta(hours=2)
+        )
+        self.assertEqual(
+            study.select_questions(self.user, [1, 2, 3, 4, 5], 3), [4, 5, 2]
+        )
+
+        # exam sittings are not adaptive
+        sitting = Sitting.objects.new_sitting(
+            self.user, self.quiz1, mode=SittingMode.EXAM
+        )
+        self.assertEqual(sitting.get_question_ids(), [1, 2, 3])
+
+    def test_select_due_questions_query(self):
+        QuestionHistory.objects.record(
+            self.user.id,
+            {question_id: False for question_id in range(1, 6)},
+            now() - timedelta(days=1),
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(len(study.select_questions(self.user, [1, 2, 3], 2)), 2)
+
+    def test_select_new_questions_query(self):
+        QuestionHistory.objects.record(self.user.id, {1: True, 2: False, 4: True})
+        # the new questions are looked up in the chunks of the quiz, until
+        # enough are found
+        with mock.patch.object(study, "CHUNK_SIZE", 2), self.assertNumQueries(3):
+            self.assertEqual(study.select_questions(self.user, [2, 1, 4, 3, 5], 1), [3])
+
+
+class TestSittingPagination(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        question = TFQuestion.objects.create(id=1, content="q1", correct=True)
+        question.quiz.add(self.quiz1)
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        when = now()
+        self.sittings = []
+        for i in range(7):
+            sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+            sitting.submit_answers({1: str(i % 2 == 0)})
+            # two sittings completed at the same time
+            end = when - timedelta(hours=min(i, 5))
+            Sitting.objects.filter(pk=sitting.pk).update(end=end)
+            self.sittings.append(sitting.pk)
+        self.open_sitting = Sitting.objects.new_sitting(self.user, self.quiz1)
+        # newest first, the most recent id first when completed at the same time
+        self.expected = self.sittings[:5] + self.sittings[6:4:-1]
+
+    def test_percent_stored(self):
+        sitting = Sitting.objects.get(pk=self.sittings[0])
+        self.assertEqual(sitting.percent, 100)
+        sitting.current_score = 0
+        self.assertEqual(sitting.get_percent_correct, 100)
+        self.assertIsNone(self.open_sitting.percent)
+
+    def test_paginate(self):
+        queryset = Sitting.objects.filter(user=self.user, complete=True)
+        pages, after = [], None
+        while True:
+            with self.assertNumQueries(1):
+                page = paginate_sittings(queryset, after=after, page_size=3)
+            pages.append([sitting.pk for sitting in page])
+            if not page.has_next:
+                break
+            after = page.next_cursor
+        self.assertEqual(
+            pages, [self.expected[:3], self.expected[3:6], [self.expected[6]]]
+        )
+        self.assertTrue(page.has_previous)
+
+        page = paginate_sittings(queryset, before=page.previous_cursor, page_size=3)
+        self.assertEqual([sitting.pk for sitting in page], self.expected[3:6])
+        page = paginate_sittings(queryset, before=page.previous_cursor, page_size=3)
+        self.assertEqual([sitting.pk for sitting in page], self.expected[:3])
+        self.assertFalse(page.has_previous)
+
+        # invalid cursors show the first page
+        page = paginate_sittings(queryset, after="invalid", page_size=3)
+        self.assertEqual([sitting.pk for sitting in page], self.expected[:3])
+
+    def test_sitting_list(self):
+        self.client.force_login(self.user)
+        Site.objects.get_current()
+        url = reverse("quiz:sitting_list")
+        # sittings of the page with their quiz
+        with self.assertNumQueries(TestSittingQuestionQueries.REQUEST_QUERIES + 1):
+            response = self.client.get(url)
+        self.assertEqual(
+            [sitting.pk for sitting in response.context["sitting_list"]],
+            self.expected,
+        )
+        self.assertFalse(response.context["is_paginated"])
+
+        with mock.patch("app.quiz.views.SittingList.paginate_by", 2):
+            response = self.client.get(url)
+            self.assertContains(
+                response, "?after=%s" % response.context["page_obj"].next_cursor
+            )
+            response = self.client.get(
+                url, {"after": response.context["page_obj"].next_cursor}
+            )
+        self.assertEqual(
+            [sitting.pk for sitting in response.context["sitting_list"]],
+            self.expected[2:4],
+        )
+
+
+class TestSittingExport(TestCase):
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1"
+        )
+        self.quiz2 = Quiz.objects.create(
+            id=2, title="test quiz 2", description="d2", url="tq2"
+        )
+        self.question1 = TFQuestion.objects.create(id=1, content="a", correct=True)
+        self.question2 = TFQuestion.objects.create(id=2, content="b", correct=True)
+        for question in (self.question1, self.question2):
+            question.quiz.add(self.quiz1)
+        self.question2.quiz.add(self.quiz2)
+        self.user = User.objects.create_user(
+            email="jacob@jacob.com", password="top_secret"
+        )
+        self.staff = User.objects.create_user(
+            email="staff@jacob.com", password="top_secret", is_staff=True
+        )
+
+        self.old_sitting = self.complete_sitting(self.quiz1, {1: "True"}, days_ago=400)
+        SittingArchive.objects.archive(now() - timedelta(days=365))
+        self.exam = self.complete_sitting(
+            self.quiz1, {1: "False"}, days_ago=10, mode=SittingMode.EXAM
+        )
+        self.sitting = self.complete_sitting(self.quiz2, {1: "True"}, days_ago=1)
+        # open sittings are not exported
+        Sitting.objects.new_sitting(self.user, self.quiz1)
+
+    def complete_sitting(self, quiz, answers, days_ago, mode=SittingMode.STUDY):
+        sitting = Sitting.objects.new_sitting(self.user, quiz, mode=mode)
+        answers = {
+            order: answers.get(order, "True")
+            for order in range(1, sitting.get_nb_questions() + 1)
+        }
+        sitting.submit_answers(answers)
+        Sitting.objects.filter(pk=sitting.pk).update(
+            end=now() - timedelta(days=days_ago)
+        )
+        return sitting
+
+    def export(self, **options):
+        out = StringIO()
+        call_command("export_sittings", stdout=out, **options)
+        return out.getvalue()
+
+    def test_csv(self):
+        rows = list(csv.DictReader(StringIO(self.export(chunk_size=1))))
+        self.assertEqual(
+            [(int(row["sitting_id"]), int(row["order"])) for row in rows],
+            [
+                (self.exam.pk, 1),
+                (self.exam.pk, 2),
+                (self.sitting.pk, 1),
+                (self.old_sitting.pk, 1),
+                (self.old_sitting.pk, 2),
+            ],
+        )
+        self.assertEqual(rows[0]["user_email"], "jacob@jacob.com")
+        self.assertEqual(rows[0]["quiz"], "tq1")
+        self.assertEqual(rows[0]["mode"], SittingMode.EXAM)
+        self.assertEqual(
+            (rows[0]["question_id"], rows[0]["answer"], rows[0]["is_correct"]),
+            ("1", "False", "False"),
+        )
+        self.assertEqual(rows[2]["question_id"], "2")
+        # from the archive
+        self.assertEqual(
+            (rows[3]["question_id"], rows[3]["is_correct"], rows[3]["percent"]),
+            ("1", "True", "100"),
+        )
+
+    def test_filters(self):
+        rows = [
+            json.loads(line)
+            for line in self.export(format="ndjson", quiz="tq1").splitlines()
+        ]
+        self.assertEqual(
+            {row["sitting_id"] for row in rows}, {self.exam.pk, self.old_sitting.pk}
+        )
+        self.assertEqual(rows[0]["is_correct"], False)
+
+        since = (now() - timedelta(days=20)).strftime("%Y-%m-%d")
+        until = (now() - timedelta(days=5)).strftime("%Y-%m-%d")
+        output = self.export(format="ndjson", since=since, until=until, mode="exam")
+        self.assertEqual(
+            {json.loads(line)["sitting_id"] for line in output.splitlines()},
+            {self.exam.pk},
+        )
+
+        with self.assertRaises(CommandError):
+            self.export(quiz="missing")
+
+    def test_view(self):
+        url = reverse("quiz:sitting_export")
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {"quiz": "tq2", "format": "ndjson"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)["sitting_id"] for line in lines], [self.sitting.pk]
+        )
+
+        response = self.client.get(url, {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("since", response.json()["errors"])
+
+
+class TestDownloadQuiz(TestCase):
+    def setUp(self):
+        self.c1 = Category.objects.create(name="elderberries")
+        self.quiz1 = Quiz.objects.create(
+            id=1, title="test quiz 1", description="d1", url="tq1", category=self.c1
+        )
+        self.quiz2 = Quiz.objects.create(
+            id=2, title="test quiz 2", description="d2", url="tq2"
+        )
+        self.add_questions(self.quiz1, 2)
+        self.add_questions(self.quiz2, 1)
+        # questions of no quiz are in the bank
+        EssayQuestion.objects.create(content="orphan")
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def add_questions(self, quiz, count):
+        for i in range(count):
+            question = MCQuestion.objects.create(content="mc %s %d" % (quiz.url, i))
+            question.quiz.add(quiz)
+            question.category.add(self.c1)
+            Answer.objects.create(question=question, content="yes", correct=True)
+            Answer.objects.create(question=question, content="no", correct=False)
+            question = TFQuestion.objects.create(
+                content="tf %s %d" % (quiz.url, i), correct=True
+            )
+            question.quiz.add(quiz)
+            question = OpenQuestion.objects.create(
+                content="open %s %d" % (quiz.url, i), answer="42"
+            )
+            question.quiz.add(quiz)
+
+    def download(self, *args, filename="quiz.json", **options):
+        filepath = os.path.join(self.tmpdir.name, filename)
+        call_command(
+            "download_quiz", *args, filepath=filepath, stdout=StringIO(), **options
+        )
+        return filepath
+
+    def test_single_quiz(self):
+        with open(self.download("1")) as file:
+            data = json.load(file)
+        self.assertEqual(data["url"], "tq1")
+        self.assertEqual(data["category"], "elderberries")
+        questions = {question["content"]: question for question in data["questions"]}
+        self.assertEqual(len(questions), 6)
+        self.assertEqual(questions["mc tq1 0"]["category"], ["elderberries"])
+        self.assertEqual(
+            [answer["content"] for answer in questions["mc tq1 0"]["answers"]],
+            ["yes", "no"],
+        )
+        self.assertEqual(questions["tf tq1 1"]["correct"], True)
+        self.assertEqual(questions["open tq1 1"]["answer"], "42")
+
+        with self.assertRaisesMessage(CommandError, 'Quiz "3" does not exist'):
+            self.download("1", "3")
+
+    def test_several_quizzes(self):
+        with open(self.download("1", "2")) as file:
+            data = json.load(file)
+        self.assertEqual([quiz["url"] for quiz in data], ["tq1", "tq2"])
+        self.assertEqual([len(quiz["questions"]) for quiz in data], [6, 3])
+
+    def test_whole_bank_json(self):
+        with open(self.download(all=True)) as file:
+            data = json.load(file)
+        self.assertEqual([quiz["url"] for quiz in data["quizzes"]], ["tq1", "tq2"])
+        self.assertNotIn("questions", data["quizzes"][0])
+        # same questions as the NDJSON export, including the ones of no quiz
+        self.assertEqual(len(data["questions"]), 10)
+        self.assertEqual(data["questions"][-1]["content"], "orphan")
+        self.assertNotIn("model", data["questions"][-1])
+
+    def test_whole_bank(self):
+        filepath = self.download(filename="bank.ndjson.gz", format="ndjson", all=True)
+        with gzip.open(filepath, "rt") as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(
+            [record["url"] for record in records if record["model"] == "quiz"],
+            ["tq1", "tq2"],
+        )
+        self.assertNotIn("questions", records[0])
+        questions = [record for record in records if record["model"] == "question"]
+        self.assertEqual(len(questions), 10)
+        self.assertEqual(questions[0]["quiz"], [1])
+        self.assertEqual(len(questions[0]["answers"]), 2)
+        self.assertEqual(questions[-1]["content"], "orphan")
+
+    def test_queries(self):
+        def count_queries(*args, **options):
+            with CaptureQueriesContext(connection) as context:
+                self.download(*args, **options)
+            return len(context)
+
+        queries = count_queries("1", "2"), count_queries(format="ndjson", all=True)
+        self.add_questions(self.quiz1, 5)
+        self.add_questions(self.quiz2, 5)
+        self.assertEqual(
+            (count_queries("1", "2"), count_queries(format="ndjson", all=True)),
+            queries,
+        )
+
+
+class TestUploadQuiz(TestCase):
+    def setUp(self):
+        self.c1 = Category.objects.create(name="elderberries")
+        self.quiz1 = Quiz.objects.create(
+            title="test quiz 1", description="d1", url="tq1", category=self.c1
+        )
+        self.quiz2 = Quiz.objects.create(title="test quiz 2", url="tq2")
+        for i in range(2):
+            question = MCQuestion.objects.create(
+                content="mc %d" % i, allow_multiple_answers=True
+            )
+            question.quiz.add(self.quiz1, self.quiz2)
+            question.category.add(self.c1)
+            Answer.objects.create(question=question, content="yes", correct=True)
+            Answer.objects.create(question=question, content="no", correct=False)
+            question = TFQuestion.objects.create(content="tf %d" % i, correct=True)
+            question.quiz.add(self.quiz1)
+            question = OpenQuestion.objects.create(content="open %d" % i, answer="42")
+            question.quiz.add(self.quiz2)
+        # questions of no quiz are in the bank
+        EssayQuestion.objects.create(content="orphan")
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, filename, content):
+        filepath = os.path.join(self.tmpdir.name, filename)
+        with open(filepath, "w") as file:
+            file.write(content)
+        return filepath
+
+    def upload(self, filepath, **options):
+        out = StringIO()
+        call_command("upload_quiz", filepath, stdout=out, **options)
+        return out.getvalue()
+
+    def download_and_clear(self, filename, quiz_ids=None, **options):
+        filepath = os.path.join(self.tmpdir.name, filename)
+        args = [str(quiz_id) for quiz_id in quiz_ids or []]
+        if quiz_ids is None:
+            options["all"] = True
+        call_command(
+            "download_quiz", *args, filepath=filepath, stdout=StringIO(), **options
+        )
+        Question.objects.all().delete()
+        Quiz.objects.all().delete()
+        Category.objects.all().delete()
+        return filepath
+
+    def assertBank(self):
+        quiz1, quiz2 = Quiz.objects.get(url="tq1"), Quiz.objects.get(url="tq2")
+        self.assertEqual(quiz1.title, "test quiz 1")
+        self.assertEqual(quiz1.category.name, "elderberries")
+        self.assertEqual(
+            sorted(question.content for question in quiz1.get_questions()),
+            ["mc 0", "mc 1", "tf 0", "tf 1"],
+        )
+        self.assertEqual(len(quiz2.get_question_ids()), 4)
+        question = MCQuestion.objects.get(content="mc 0")
+        self.assertTrue(question.allow_multiple_answers)
+        self.assertEqual(
+            list(question.answer_set.order_by("pk").values_list("content", "correct")),
+            [("yes", True), ("no", False)],
+        )
+        self.assertEqual(
+            list(question.category.values_list("name", flat=True)), ["elderberries"]
+        )
+        self.assertTrue(TFQuestion.objects.get(content="tf 1").correct)
+        self.assertEqual(OpenQuestion.objects.get(content="open 1").answer, "42")
+        self.assertFalse(EssayQuestion.objects.get(content="orphan").quiz.exists())
+
+    def test_round_trip(self):
+        for filename, options in (
+            ("bank.json", {}),
+            ("bank.ndjson.gz", {"format": "ndjson"}),
+        ):
+            with self.subTest(filename):
+                filepath = self.download_and_clear(filename, **options)
+                out = self.upload(filepath, chunk_size=2)
+                self.assertIn("Created 7 questions and 2 quizzes", out)
+                self.assertBank()
+
+    def test_round_trip_one_quiz(self):
+        # the questions shared with quiz 2 are not added to it
+        filepath = self.download_and_clear(
+            "quiz.ndjson", format="ndjson", quiz_ids=[self.quiz1.pk]
+        )
+        out = self.upload(filepath)
+        self.assertIn("Created 4 questions and 1 quizzes", out)
+        self.assertFalse(Quiz.objects.filter(url="tq2").exists())
+        question = MCQuestion.objects.get(content="mc 0")
+        self.assertEqual(list(question.quiz.values_list("url", flat=True)), ["tq1"])
+        self.assertEqual(len(Quiz.objects.get(url="tq1").get_question_ids()), 4)
+
+    def test_idempotent(self):
+        filepath = self.download_and_clear("bank.ndjson", format="ndjson")
+        self.upload(filepath)
+        # quizzes are matched on their url and questions on their key
+        out = self.upload(filepath)
+        self.assertIn("Created 0 questions and 0 quizzes, 7 questions", out)
+        self.assertEqual(Question.objects.count(), 7)
+        self.assertEqual(Answer.objects.count(), 4)
+        self.assertBank()
+
+    def test_keyless_questions(self):
+        # questions created in the admin have no key, they are matched on
+        # their content
+        filepath = os.path.join(self.tmpdir.name, "bank.ndjson")
+        call_command(
+            "download_quiz",
+            filepath=filepath,
+            all=True,
+            format="ndjson",
+            stdout=StringIO(),
+        )
+        out = self.upload(filepath, chunk_size=2)
+        self.assertIn("Created 0 questions and 0 quizzes, 7 questions", out)
+        self.assertEqual(Question.objects.count(), 7)
+        self.assertFalse(Question.objects.filter(key=None).exists())
+        self.assertIn("Created 0 questions", self.upload(filepath))
+        self.assertEqual(Answer.objects.count(), 4)
+
+    def test_csv(self):
+        filepath = self.write(
+            "questions.csv",
+            "type,quiz,category,content,answer\n"
+            'MCQuestion,tq1;new quiz,elderberries;swallows,"Colour?","*Blue;Red;*Sky"\n'
+            "TFQuestion,tq1,,Airspeed?,false\n"
+            "OpenQuestion,new quiz,swallows,Answer?,42\n",
+        )
+        self.assertEqual(len(self.quiz1.get_question_ids()), 4)
+        self.assertIn("Created 3 questions and 1 quizzes", self.upload(filepath))
+
+        question = MCQuestion.objects.get(content="Colour?")
+        self.assertTrue(question.allow_multiple_answers)
+        self.assertEqual(
+            list(question.answer_set.order_by("pk").values_list("content", "correct")),
+            [("Blue", True), ("Red", False), ("Sky", True)],
+        )
+        self.assertEqual(
+            set(question.category.values_list("name", flat=True)),
+            {"elderberries", "swallows"},
+        )
+        self.assertFalse(TFQuestion.objects.get(content="Airspeed?").correct)
+        self.assertEqual(
+            OpenQuestion.objects.get(content="Answer?").answer_type, "number"
+        )
+        # the cached question ids of the quizzes are invalidated
+        self.assertEqual(len(self.quiz1.get_question_ids()), 6)
+        questions = Quiz.objects.get(url="new-quiz").question_set
+        self.assertEqual(
+            sorted(questions.values_list("content", flat=True)),
+            ["Answer?", "Colour?"],
+        )
+
+        self.assertIn("Created 0 questions", self.upload(filepath))
+
+    def test_errors(self):
+        filepath = self.write("questions.csv", "type,content\nPoll,Color?\n")
+        with self.assertRaisesMessage(CommandError, "Unknown question type: Poll"):
+            self.upload(filepath)
+        with self.assertRaisesMessage(CommandError, "Unknown format"):
+            self.upload(self.write("questions.txt", ""))
+
+    def test_queries(self):
+        def count_queries(nb_questions):
+            lines = ["type,quiz,category,content,answer"] + [
+                "MCQuestion,tq1,elderberries,q %d %d,*a;b" % (nb_questions, i)
+                for i in range(nb_questions)
+            ]
+            filepath = self.write("questions.csv", "\n".join(lines))
+            with CaptureQueriesContext(connection) as context:
+                self.upload(filepath, chunk_size=100)
+            return len(context)
+
+        self.assertEqual(count_queries(10), count_queries(90))
+
+
+class TestSerializers(TestCase):
+    NB_QUESTIONS = 500
+
+    def setUp(self):
+        self.quiz1 = Quiz.objects.create(title="test quiz 1", url="tq1")
+        self.add_questions(self.NB_QUESTIONS)
+
+    def add_questions(self, count, quiz="tq1"):
+        types = [
+            "MCQuestion,{quiz},c1;c2,mc {i},*a;b;c",
+            "TFQuestion,{quiz},c1,tf {i},true",
+            "OpenQuestion,{quiz},,open {i},42",
+        ]
+        lines = ["type,quiz,category,content,answer"] + [
+            types[i % 3].format(quiz=quiz, i=i) for i in range(count)
+        ]
+        bank.import_file(StringIO("\n".join(lines)), "csv")
+
+    def test_quiz(self):
+        data = QuizSerializer(self.quiz1).data
+        self.assertEqual(len(data["questions"]), self.NB_QUESTIONS)
+        questions = {question["content"]: question for question in data["questions"]}
+        self.assertEqual(questions["mc 0"]["type"], "MCQuestion")
+        self.assertEqual(questions["mc 0"]["category"], ["c1", "c2"])
+        self.assertEqual(questions["mc 0"]["quiz"], [self.quiz1.pk])
+        self.assertEqual(
+            [answer["content"] for answer in questions["mc 0"]["answers"]],
+            ["a", "b", "c"],
+        )
+        self.assertEqual(questions["tf 1"]["correct"], True)
+        self.assertEqual(questions["open 2"]["answer"], "42")
+        self.assertEqual(questions["open 2"]["category"], [])
+
+        # a single question
+        question = MCQuestion.objects.get(content="mc 3")
+        with self.assertNumQueries(3):
+            data = QuestionSerializer(question).data
+        self.assertEqual(data["category"], ["c1", "c2"])
+        self.assertEqual(len(data["answers"]), 3)
+
+    def test_queries(self):
+        # the questions of the quiz, their categories, quizzes and answers
+        with self.assertNumQueries(4):
+            QuizSerializer(self.quiz1).data
+
+        Quiz.objects.create(title="test quiz 2", url="tq2")
+        self.add_questions(10, quiz="tq2")
+        with self.assertNumQueries(1 + 2 * 4):
+            QuizSerializer(Quiz.objects.all(), many=True).data
+
+    def test_child_serializers_cached(self):
+        questions = list(Question.objects.select_subclasses())
+        serializer_classes = {
+            model: mock.Mock(wraps=serializer_class)
+            for model, serializer_class in QuestionSerializer.serializer_classes.items()
+        }
+        with mock.patch.dict(QuestionSerializer.serializer_classes, serializer_classes):
+            # the categories, quizzes and answers of the questions
+            with self.assertNumQueries(3):
+                data = QuestionSerializer(questions, many=True).data
+
+        self.assertEqual(len(data), self.NB_QUESTIONS)
+        self.assertEqual(data[0]["content"], questions[0].content)
+        # one serializer built per question type
+        for serializer_class in serializer_classes.values():
+            self.assertEqual(serializer_class.call_count, 1)
+
+
+class TestMigrations(TransactionTestCase):
+    def migrate(self, migration):
+        """Migrate the quiz app to the given migration, return its models"""
+        executor = MigrationExecutor(connection)
+        executor.migrate([("quiz", migration)])
+        return executor.loader.project_state([("quiz", migration)]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_sitting_seeds(self):
+        apps = self.migrate("0023_sitting_packed_question_ids")
+        Quiz = apps.get_model("quiz", "Quiz")
+        Sitting = apps.get_model("quiz", "Sitting")
+        # the users app is not migrated back
+        user = User.objects.create_user(email="a@example.com", password="top_secret")
+        quiz = Quiz.objects.create(title="test quiz 1", url="tq1")
+        for i in range(10):
+            Sitting.objects.create(
+                user_id=user.pk,
+                quiz=quiz,
+                current_score=0,
+                question_ids=b"",
+                results=b"",
+            )
+
+        apps = self.migrate("0024_sitting_seed")
+        seeds = apps.get_model("quiz", "Sitting").objects.values_list("seed", flat=True)
+        self.assertEqual(len(set(seeds)), 10)
+
+    def test_duplicate_quiz_urls(self):
+        apps = self.migrate("0025_sitting_archive")
+        Quiz = apps.get_model("quiz", "Quiz")
+        # titles in another order than the ids, as Quiz is ordered by title
+        first = Quiz.objects.create(title="b", url="tq")
+        second = Quiz.objects.create(title="a", url="tq")
+        Quiz.objects.create(title="c", url="tq-%d" % second.pk)
+        Quiz.objects.create(title="d", url="other")
+
+        apps = self.migrate("0026_query_indexes")
+        Quiz = apps.get_model("quiz", "Quiz")
+        self.assertEqual(
+            list(Quiz.objects.order_by("id").values_list("title", "url")),
+            [
+                ("b", "tq"),
+                ("a", "tq-%d-1" % second.pk),
+                ("c", "tq-%d" % second.pk),
+                ("d", "other"),
+            ],
+        )
+        self.assertEqual(Quiz.objects.get(pk=first.pk).url, "tq")
+
+    def test_duplicate_open_sittings(self):
+        apps = self.migrate("0026_query_indexes")
+        Quiz = apps.get_model("quiz", "Quiz")
+        Question = apps.get_model("quiz", "Question")
+        Sitting = apps.get_model("quiz", "Sitting")
+        UserAnswer = apps.get_model("quiz", "UserAnswer")
+        # the users app is not migrated back
+        user = User.objects.create_user(email="a@example.com", password="top_secret")
+        quiz = Quiz.objects.create(title="test quiz 1", url="tq1")
+        question = Question.objects.create(content="q")
+        fields = {
+            "user_id": user.pk,
+            "quiz": quiz,
+            "current_score": 0,
+            "question_ids": b"",
+            "results": b"",
+        }
+        sittings = [Sitting.objects.create(mode="study", **fields) for i in range(3)]
+        # the second sitting has the most answers
+        for sitting, nb_answers in zip(sittings, (1, 2, 0)):
+            for order in range(1, nb_answers + 1):
+                UserAnswer.objects.create(
+                    sitting=sitting,
+                    user_id=user.pk,
+                    question=question,
+                    order=order,
+                    answer="True",
+                )
+        Sitting.objects.create(mode="exam", **fields)
+
+        apps = self.migrate("0027_unique_open_sitting")
+        Sitting = apps.get_model("quiz", "Sitting")
+        self.assertEqual(
+            list(
+                Sitting.objects.filter(complete=False)
+                .order_by("id")
+                .values_list("id", "mode")
+            ),
+            [(sittings[1].pk, "study"), (sittings[2].pk + 1, "exam")],
+        )
+        closed = Sitting.objects.filter(complete=True)
+        self.assertEqual(
+            sorted(closed.values_list("id", flat=True)),
+            [sittings[0].pk, sittings[2].pk],
+        )
+        self.assertFalse(closed.filter(end=None).exists())
+        # no answer is deleted
+        self.assertEqual(apps.get_model("quiz", "UserAnswer").objects.count(), 3)
@@ -2,18 +2,24 @@ from django.urls import path, re_path as url
 
 from app.quiz.views import (
     CategoriesListView,
+    CategoryLeaderboard,
     QuizDetailView,
+    QuizLeaderboard,
     QuizListView,
     # QuizMarkingDetail,
     # QuizMarkingList,
     QuizStart,
     QuizUserProgressView,
+    SittingAnswer,
+    SittingData,
     SittingDelete,
+    SittingExport,
     SittingFinish,
     SittingList,
     SittingQuestion,
     SittingQuestionExplanation,
     SittingResults,
+    SittingSubmit,
     ViewQuizListByCategory,
 )
 
@@ -23,6 +29,11 @@ urlpatterns = [
     url(
         r"^category/$", view=CategoriesListView.as_view(), name="quiz_category_list_all"
     ),
+    url(
+        r"^category/(?P<category_name>[\w|\W-]+)/leaderboard/$",
+        view=CategoryLeaderboard.as_view(),
+        name="category_leaderboard",
+    ),
     url(
         r"^category/(?P<category_name>[\w|\W-]+)/$",
         view=ViewQuizListByCategory.as_view(),
@@ -36,6 +47,7 @@ urlpatterns = [
     #     name="quiz_marking_detail",
     # ),
     url(r"^sitting/$", view=SittingList.as_view(), name="sitting_list"),
+    path("sitting/export/", view=SittingExport.as_view(), name="sitting_export"),
     path(
         "sitting/<int:sitting_id>/",
         view=SittingResults.as_view(),
@@ -51,6 +63,21 @@ urlpatterns = [
         view=SittingFinish.as_view(),
         name="sitting_finish",
     ),
+    path(
+        "sitting/<int:sitting_id>/submit",
+        view=SittingSubmit.as_view(),
+        name="sitting_submit",
+    ),
+    path(
+        "sitting/<int:sitting_id>/data",
+        view=SittingData.as_view(),
+        name="sitting_data",
+    ),
+    path(
+        "sitting/<int:sitting_id>/answer",
+        view=SittingAnswer.as_view(),
+        name="sitting_answer",
+    ),
     path(
         "sitting/<int:sitting_id>/<int:question_order>/",
         view=SittingQuestion.as_view(),
@@ -66,4 +93,9 @@ urlpatterns = [
     url(
         r"^(?P<quiz_name>[\w-]+)/take/$", view=QuizStart.as_view(), name="quiz_question"
     ),
+    url(
+        r"^(?P<quiz_name>[\w-]+)/leaderboard/$",
+        view=QuizLeaderboard.as_view(),
+        name="quiz_leaderboard",
+    ),
 ]
@@ -1,12 +1,22 @@
+import ast
 import json
 
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
-from django.http import Http404, HttpResponseRedirect
+from django.http import (
+    Http404,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
+from django.utils.cache import patch_cache_control
 from django.utils.decorators import method_decorator
+from django.views.decorators.http import conditional_page
 from django.views.generic import (
     DeleteView,
     DetailView,
@@ -18,20 +28,34 @@ from django.views.generic import (
 )
 from django.views.generic.detail import SingleObjectMixin
 
-from .forms import EssayForm, MCQuestionForm, OpenQuestionForm
+from . import bundles, export
+from .forms import SittingExportForm, get_question_form_class
+from .leaderboards import Leaderboard
+from .pagination import SittingPaginationMixin, paginate_sittings
 from .models import (
     Category,
-    EssayQuestion,
-    OpenQuestion,
     Progress,
     Question,
     Quiz,
     Sitting,
     SittingMode,
-    UserAnswer,
 )
 
 
+def clean_answer(question, value):
+    """Validate an answer posted as JSON with the form of the question
+
+    Returns:
+        tuple: (cleaned answer, None) or (None, errors)
+
+    """
+    form_class = get_question_form_class(question)
+    form = form_class(question, data={"answers": value})
+    if form.is_valid():
+        return form.cleaned_data["answers"], None
+    return None, form.errors.get_json_data()["answers"]
+
+
 class QuizMarkerMixin:
     @method_decorator(login_required)
     @method_decorator(permission_required("quiz.view_sittings"))
@@ -94,6 +118,67 @@ class ViewQuizListByCategory(LoginRequiredMixin, ListView):
         return queryset.filter(category=self.category, draft=False)
 
 
+class LeaderboardView(LoginRequiredMixin, ListView):
+    """Paginated ranking of the users on a quiz or a category, with the
+    position of the current user.
+
+    Subclasses set the ranked model, the field it is looked up with from the
+    URL keyword argument, and the factory of its leaderboard.
+    """
+
+    template_name = "leaderboard.html"
+    paginate_by = 20
+    ranked_model = None
+    lookup_field = None
+    lookup_url_kwarg = None
+    leaderboard_factory = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if not settings.QUIZ_LEADERBOARDS:
+            raise Http404
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_ranked_object(self):
+        return get_object_or_404(
+            self.ranked_model,
+            **{self.lookup_field: self.kwargs[self.lookup_url_kwarg]},
+        )
+
+    def get_queryset(self):
+        return self.leaderboard
+
+    def get(self, request, *args, **kwargs):
+        self.ranked_object = self.get_ranked_object()
+        self.leaderboard = self.leaderboard_factory(self.ranked_object.id)
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["title"] = str(self.ranked_object)
+        context["position"] = self.leaderboard.get_position(self.request.user.pk)
+        return context
+
+
+class QuizLeaderboard(LeaderboardView):
+    ranked_model = Quiz
+    lookup_field = "url"
+    lookup_url_kwarg = "quiz_name"
+    leaderboard_factory = Leaderboard.for_quiz
+
+    def get_ranked_object(self):
+        quiz = super().get_ranked_object()
+        if quiz.draft and not self.request.user.has_perm("quiz.change_quiz"):
+            raise PermissionDenied
+        return quiz
+
+
+class CategoryLeaderboard(LeaderboardView):
+    ranked_model = Category
+    lookup_field = "name"
+    lookup_url_kwarg = "category_name"
+    leaderboard_factory = Leaderboard.for_category
+
+
 class QuizUserProgressView(LoginRequiredMixin, TemplateView):
     template_name = "progress.html"
 
@@ -103,14 +188,28 @@ class QuizUserProgressView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super(QuizUserProgressView, self).get_context_data(**kwargs)
-        progress, c = Progress.objects.get_or_create(user=self.request.user)
+        # rollups of the completed sittings, updated when each one completes
+        progress = Progress.objects.filter(user=self.request.user).first()
+        if progress is None:
+            progress = Progress()
+        progress.user = self.request.user
+        context["totals"] = progress
         context["cat_scores"] = progress.list_all_cat_scores
-        context["exams"] = progress.show_exams()
+        context["quiz_scores"] = self.request.user.quiz_scores.select_related("quiz")
+        context["exams"] = paginate_sittings(
+            progress.show_exams(),
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
         return context
 
 
 class QuizMarkingList(
-    LoginRequiredMixin, QuizMarkerMixin, SittingFilterTitleMixin, ListView
+    LoginRequiredMixin,
+    QuizMarkerMixin,
+    SittingFilterTitleMixin,
+    SittingPaginationMixin,
+    ListView,
 ):
     model = Sitting
 
@@ -119,9 +218,9 @@ class QuizMarkingList(
 
         user_filter = self.request.GET.get("user_filter")
         if user_filter:
-            queryset = queryset.filter(user__username__icontains=user_filter)
+            queryset = queryset.filter(user__email__icontains=user_filter)
 
-        return queryset
+        return queryset.select_related("quiz", "user")
 
 
 # class QuizMarkingDetail(LoginRequiredMixin, QuizMarkerMixin, DetailView):
@@ -146,6 +245,32 @@ class QuizMarkingList(
 #         return context
 
 
+@method_decorator(staff_member_required, name="dispatch")
+class SittingExport(View):
+    """Stream the answers of the completed sittings as CSV or NDJSON, for
+    external grading.
+
+    Sittings are filtered with the quiz, mode, since and until parameters,
+    see SittingExportForm, and rows are streamed as they are read from the
+    database, see app.quiz.export.
+    """
+
+    def get(self, request, *args, **kwargs):
+        form = SittingExportForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors.get_json_data()}, status=400)
+
+        output_format = form.get_format()
+        response = StreamingHttpResponse(
+            export.stream(form.get_filters(), output_format),
+            content_type=export.FORMATS[output_format],
+        )
+        response["Content-Disposition"] = (
+            'attachment; filename="sittings.%s"' % output_format
+        )
+        return response
+
+
 class QuizStart(LoginRequiredMixin, RedirectView):
     """Start a new sitting and redirect to the first question"""
 
@@ -183,12 +308,14 @@ class SittingDelete(LoginRequiredMixin, DeleteView):
         return queryset.filter(user=self.request.user)
 
 
-class SittingList(LoginRequiredMixin, ListView):
+class SittingList(LoginRequiredMixin, SittingPaginationMixin, ListView):
     model = Sitting
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        return queryset.filter(user=self.request.user)
+        return queryset.filter(user=self.request.user, complete=True).select_related(
+            "quiz"
+        )
 
 
 class SittingFinish(LoginRequiredMixin, SingleObjectMixin, View):
@@ -223,6 +350,178 @@ class SittingFinish(LoginRequiredMixin, SingleObjectMixin, View):
             return HttpResponseRedirect(url)
 
 
+class SittingSubmit(LoginRequiredMixin, SingleObjectMixin, View):
+    """Submit all the answers of an exam sitting in a single request.
+
+    The request body is a JSON object such as::
+
+        {"answers": {"1": "123", "2": ["456", "789"], "3": "True"}}
+
+    where keys are question orders and values are the answers, in the format
+    of the form of each question. The sitting is marked as complete once all
+    its questions are answered.
+    """
+
+    pk_url_kwarg = "sitting_id"
+    model = Sitting
+
+    def get_queryset(self):
+        """Restrict the list of sittings to the open exams of the current user"""
+        queryset = super().get_queryset()
+        queryset = queryset.filter(
+            user=self.request.user, mode=SittingMode.EXAM, complete=False
+        )
+        return queryset
+
+    def post(self, request, *args, **kwargs):
+        sitting = self.get_object()
+        try:
+            answers = {
+                int(order): value
+                for order, value in json.loads(request.body)["answers"].items()
+            }
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return JsonResponse({"error": "Invalid payload"}, status=400)
+
+        if not all(sitting.has_question(order) for order in answers):
+            return JsonResponse({"error": "Invalid question order"}, status=400)
+
+        questions = bundles.get_questions(
+            sitting.state.question_id(order) for order in answers
+        )
+        cleaned_answers = {}
+        errors = {}
+        for order, value in answers.items():
+            question = questions.get(sitting.state.question_id(order))
+            if question is None:
+                raise Http404
+            cleaned_answers[order], error = clean_answer(question, value)
+            if error:
+                errors[order] = error
+        if errors:
+            return JsonResponse({"errors": errors}, status=400)
+
+        sitting.submit_answers(cleaned_answers)
+        return JsonResponse(
+            {
+                "complete": sitting.complete,
+                "unanswered": sitting.get_unanswered_questions(),
+                "results_url": reverse("quiz:sitting_results", args=[sitting.id]),
+            }
+        )
+
+
+@method_decorator(conditional_page, name="dispatch")
+class SittingData(LoginRequiredMixin, SingleObjectMixin, View):
+    """Whole sitting in a single JSON response, for the client-side navigation
+    between the questions of an exam.
+
+    Questions are read from the question bundle cache, so the response only
+    costs the queries of the sitting and of the saved answers. The response
+    carries an ETag, so an unchanged sitting is answered with a 304.
+    """
+
+    pk_url_kwarg = "sitting_id"
+    model = Sitting
+
+    def get_queryset(self):
+        """Restrict the list of sittings to the ones belonging to the current user"""
+        queryset = super().get_queryset()
+        return queryset.filter(user=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        sitting = self.get_object()
+        question_ids = sitting.get_question_ids()
+        questions = bundles.get_questions(question_ids)
+        saved_answers = sitting.get_saved_answers()
+
+        payload = []
+        for order, question_id in enumerate(question_ids, 1):
+            question = questions.get(question_id)
+            if question is None:
+                continue
+            multiple = getattr(question, "allow_multiple_answers", False)
+            answer = saved_answers.get(order)
+            if multiple and isinstance(answer, str):
+                answer = ast.literal_eval(answer)
+            choices = question.get_answers_list(sitting.get_answer_seed(question_id))
+            payload.append(
+                {
+                    "order": order,
+                    "id": question_id,
+                    "type": question.type(),
+                    "content": question.content,
+                    "choices": [
+                        [str(value), str(label)] for value, label in choices or []
+                    ],
+                    "multiple": multiple,
+                    "answer_type": getattr(question, "answer_type", None),
+                    "answer": answer,
+                }
+            )
+
+        response = JsonResponse(
+            {
+                "id": sitting.id,
+                "mode": sitting.mode,
+                "complete": sitting.complete,
+                "unanswered": sitting.get_unanswered_questions(),
+                "questions": payload,
+            }
+        )
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class SittingAnswer(LoginRequiredMixin, SingleObjectMixin, View):
+    """Save the answer to one question of a sitting.
+
+    The request body is a JSON object such as ``{"order": 2, "answer": "123"}``.
+    The correctness of the answer is only returned in study mode.
+    """
+
+    pk_url_kwarg = "sitting_id"
+    model = Sitting
+
+    def get_queryset(self):
+        """Restrict the list of sittings to the open ones of the current user"""
+        queryset = super().get_queryset()
+        return queryset.filter(user=self.request.user, complete=False)
+
+    def post(self, request, *args, **kwargs):
+        sitting = self.get_object()
+        try:
+            data = json.loads(request.body)
+            order = int(data["order"])
+            value = data["answer"]
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({"error": "Invalid payload"}, status=400)
+
+        if not sitting.has_question(order):
+            return JsonResponse({"error": "Invalid question order"}, status=400)
+        try:
+            question = bundles.get_question(sitting.state.question_id(order))
+        except Question.DoesNotExist:
+            raise Http404
+
+        answer, errors = clean_answer(question, value)
+        if errors:
+            return JsonResponse({"errors": errors}, status=400)
+
+        user_answer = sitting.get_user_answer(order)
+        user_answer.answer = answer
+        sitting.answer_question(user_answer, question.check_if_correct(answer))
+
+        data = {
+            "order": order,
+            "complete": sitting.complete,
+            "unanswered": sitting.get_unanswered_questions(),
+        }
+        if sitting.mode == SittingMode.STUDY:
+            data["is_correct"] = user_answer.is_correct
+        return JsonResponse(data)
+
+
 class SittingResults(LoginRequiredMixin, DetailView):
     """Show the results for a given sitting"""
 
@@ -278,23 +577,21 @@ class SittingQuestion(LoginRequiredMixin, FormView):
             return self.handle_no_permission()
 
         # retrieve the current sitting
-        self.sitting = get_object_or_404(Sitting, user=request.user, pk=sitting_id)
+        self.sitting = get_object_or_404(
+            Sitting.objects.select_related("quiz"), user=request.user, pk=sitting_id
+        )
         self.mode = self.sitting.mode
         # retrieve the current question
-        question_order = self.kwargs.get("question_order")
-        self.user_answer = get_object_or_404(
-            UserAnswer, user=request.user, sitting=sitting_id, order=question_order
-        )
+        if not self.sitting.has_question(question_order):
+            raise Http404
+        try:
+            self.question, self.user_answer = self.sitting.get_question(question_order)
+        except Question.DoesNotExist:
+            raise Http404
         return super().dispatch(request, *args, **kwargs)
 
     def get_form(self, *args, **kwargs):
-        self.question = Question.objects.get_subclass(pk=self.user_answer.question_id)
-        if isinstance(self.question, EssayQuestion):
-            form_class = EssayForm
-        elif isinstance(self.question, OpenQuestion):
-            form_class = OpenQuestionForm
-        else:
-            form_class = MCQuestionForm
+        form_class = get_question_form_class(self.question)
         return form_class(**self.get_form_kwargs())
 
     def get_form_kwargs(self):
@@ -307,6 +604,7 @@ class SittingQuestion(LoginRequiredMixin, FormView):
             kwargs,
             question=self.question,
             selected_answers=selected_answers,
+            answer_seed=self.sitting.get_answer_seed(self.question.id),
         )
 
     def get_context_data(self, **kwargs):
@@ -318,7 +616,9 @@ class SittingQuestion(LoginRequiredMixin, FormView):
         context["quiz"] = self.sitting.quiz
         context["question_type"] = self.question.__class__.__name__
         context["active_tab"] = "question"
-        context["actual_answers"] = self.question.get_answers()
+        context["actual_answers"] = self.question.get_answers(
+            self.sitting.get_answer_seed(self.question.id)
+        )
         context["nb_questions"] = self.sitting.get_nb_questions()
         context["nb_unanswered_questions"] = self.sitting.get_nb_unanswered_questions()
         return context
@@ -350,21 +650,7 @@ class SittingQuestion(LoginRequiredMixin, FormView):
         self.user_answer.answer = form.cleaned_data["answers"]
         is_correct = self.question.check_if_correct(self.user_answer.answer)
 
-        self.sitting.add_user_progress(self.user_answer.order, is_correct)
-
-        if is_correct is True:
-            self.sitting.add_to_score(1)
-            self.user_answer.is_correct = True
-        else:
-            self.user_answer.is_correct = False
-
-        # in study mode, if all questions are answered mark the quiz as completed
-        answered, total = self.sitting.progress()
-        if self.sitting.mode == SittingMode.STUDY and answered == total:
-            self.sitting.mark_quiz_complete()
-
-        self.sitting.save()
-        self.user_answer.save()
+        self.sitting.answer_question(self.user_answer, is_correct)
 
     def get_success_url(self):
         if self.sitting.mode == SittingMode.STUDY:
@@ -389,16 +675,21 @@ class SittingQuestionExplanation(LoginRequiredMixin, TemplateView):
         sitting_id = self.kwargs.get("sitting_id")
         question_order = self.kwargs.get("question_order")
         # retrieve the current sitting
-        self.sitting = get_object_or_404(Sitting, user=self.request.user, pk=sitting_id)
+        self.sitting = get_object_or_404(
+            Sitting.objects.select_related("quiz"),
+            user=self.request.user,
+            pk=sitting_id,
+        )
         self.mode = self.sitting.mode
         if self.mode == SittingMode.EXAM and not self.sitting.complete:
             raise Http404
         # retrieve the current question
-        question_order = self.kwargs.get("question_order")
-        self.user_answer = get_object_or_404(
-            UserAnswer, user=self.request.user, sitting=sitting_id, order=question_order
-        )
-        self.question = Question.objects.get_subclass(pk=self.user_answer.question_id)
+        if not self.sitting.has_question(question_order):
+            raise Http404
+        try:
+            self.question, self.user_answer = self.sitting.get_question(question_order)
+        except Question.DoesNotExist:
+            raise Http404
 
         context = super().get_context_data(**kwargs)
         context["question"] = self.question
@@ -0,0 +1,169 @@
+/*
+ * Client-side navigation between the questions of an exam sitting.
+ *
+ * The whole sitting is loaded once from the sitting data endpoint, then the
+ * questions are rendered in the page and the answers saved with the answer
+ * endpoint, without reloading the page. The server-rendered page keeps
+ * working as is if the sitting can't be loaded.
+ */
+(function ($) {
+  var $root = $("#sitting-exam");
+  if (!$root.length) {
+    return;
+  }
+
+  var csrfToken = $("input[name=csrfmiddlewaretoken]").first().val();
+  var saveLabel = $root.find("input[type=submit]").val();
+  var sitting = null;
+  var current = $root.data("order");
+
+  function getQuestion(order) {
+    for (var i = 0; i < sitting.questions.length; i++) {
+      if (sitting.questions[i].order === order) {
+        return sitting.questions[i];
+      }
+    }
+    return null;
+  }
+
+  function isSelected(question, value) {
+    if (question.answer === null) {
+      return false;
+    }
+    if (question.multiple) {
+      return question.answer.indexOf(value) !== -1;
+    }
+    return String(question.answer) === value;
+  }
+
+  function renderInputs(question) {
+    if (question.type === "EssayQuestion") {
+      return $("<textarea>", {
+        name: "answers",
+        style: "width:100%",
+        required: true,
+      }).val(question.answer || "");
+    }
+    if (question.type === "OpenQuestion") {
+      return $("<div>", { class: "form-group" }).append(
+        $("<input>", {
+          type: question.answer_type === "number" ? "number" : "text",
+          step: "any",
+          name: "answers",
+          class: "form-control",
+          required: true,
+        }).val(question.answer === null ? "" : question.answer)
+      );
+    }
+
+    var $list = $("<ul>", { class: "list-group mb-4" });
+    $.each(question.choices, function (i, choice) {
+      var id = "id_answers_" + i;
+      var $input = $("<input>", {
+        type: question.multiple ? "checkbox" : "radio",
+        name: "answers",
+        value: choice[0],
+        id: id,
+        checked: isSelected(question, choice[0]),
+      });
+      $list.append(
+        $("<li>", { class: "list-group-item" }).append(
+          $("<label>", { for: id }).append($input, " ", $("<span>").text(choice[1]))
+        )
+      );
+    });
+    return $list;
+  }
+
+  function render(order) {
+    var question = getQuestion(order);
+    if (question === null) {
+      return;
+    }
+    current = order;
+
+    var $form = $("<form>", { method: "POST" }).append(
+      renderInputs(question),
+      $("<input>", {
+        type: "submit",
+        value: saveLabel,
+        class: "btn btn-large btn-block btn-outline-info",
+      })
+    );
+    // question contents are stored as HTML
+    var $content = $("<p>", { class: "lead" }).html(question.content);
+    $root.empty().append($content, $form);
+
+    $(".js-question-order").text(order);
+    $(".nav-question").each(function () {
+      var isCurrent = $(this).data("order") === order;
+      $(this).toggleClass("nav-question__current", isCurrent);
+    });
+  }
+
+  function updateProgress(unanswered) {
+    $(".nav-question").each(function () {
+      var answered = unanswered.indexOf($(this).data("order")) === -1;
+      $(this).toggleClass("nav-question__answered", answered);
+    });
+    $(".js-sitting-finish").toggleClass("d-none", unanswered.length > 0);
+    $(".js-sitting-finish-disabled").toggleClass(
+      "d-none",
+      unanswered.length === 0
+    );
+  }
+
+  function readAnswer(question) {
+    var $inputs = $root.find("[name=answers]");
+    if (question.multiple) {
+      return $inputs.filter(":checked").map(function () {
+        return this.value;
+      }).get();
+    }
+    if ($inputs.is(":radio")) {
+      return $inputs.filter(":checked").val() || null;
+    }
+    return $inputs.val();
+  }
+
+  function go(order, url) {
+    render(order);
+    window.history.pushState({ order: order }, "", url);
+  }
+
+  $.getJSON($root.data("data-url"), function (data) {
+    sitting = data;
+
+    $root.on("submit", "form", function (event) {
+      event.preventDefault();
+      var question = getQuestion(current);
+      var answer = readAnswer(question);
+
+      $.ajax({
+        url: $root.data("answer-url"),
+        method: "POST",
+        contentType: "application/json",
+        headers: { "X-CSRFToken": csrfToken },
+        data: JSON.stringify({ order: question.order, answer: answer }),
+      }).done(function (response) {
+        question.answer = answer;
+        updateProgress(response.unanswered);
+        // move to the next question, as the server-side navigation does
+        var $next = $(".nav-question[data-order=" + (question.order + 1) + "]");
+        if ($next.length) {
+          go(question.order + 1, $next.attr("href"));
+        }
+      });
+    });
+
+    $(".nav-question").on("click", function (event) {
+      event.preventDefault();
+      go($(this).data("order"), $(this).attr("href"));
+    });
+
+    $(window).on("popstate", function (event) {
+      var state = event.originalEvent.state;
+      render(state ? state.order : $root.data("order"));
+    });
+  });
+})(jQuery);
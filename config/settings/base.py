@@ -358,3 +358,22 @@ CKEDITOR_CONFIGS = {
         ),
     }
 }
+
+# Quiz
+# ------------------------------------------------------------------------------
+# Only create the UserAnswer rows of a sitting when a question is answered,
+# instead of one row per question when the sitting starts
+QUIZ_LAZY_USER_ANSWERS = env.bool("QUIZ_LAZY_USER_ANSWERS", default=False)
+# Write the answers of in-progress sittings to Redis and flush them to the
+# database in batches, see app.quiz.buffer. Requires the django-redis cache.
+QUIZ_ANSWER_BUFFER = env.bool("QUIZ_ANSWER_BUFFER", default=False)
+# Rank the users per quiz and per category in Redis sorted sets, see
+# app.quiz.leaderboards. Requires the django-redis cache.
+QUIZ_LEADERBOARDS = env.bool("QUIZ_LEADERBOARDS", default=False)
+# Keep the question history of the users and pick the questions of study
+# sittings by spaced repetition, see app.quiz.study
+QUIZ_ADAPTIVE_STUDY = env.bool("QUIZ_ADAPTIVE_STUDY", default=False)
+# Age of the completed sittings archived by the archive_sittings command
+QUIZ_ARCHIVE_SITTINGS_AFTER_DAYS = env.int(
+    "QUIZ_ARCHIVE_SITTINGS_AFTER_DAYS", default=365
+)